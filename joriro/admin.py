@@ -1,4 +1,5 @@
 from django.contrib import admin
-from .models import Joriro
+from .models import Joriro, Background
 
 admin.site.register(Joriro)
+admin.site.register(Background)
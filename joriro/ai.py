@@ -1,31 +1,71 @@
+from PIL import Image
 import numpy as np
 import cv2
 
+from .metrics import span
 
-def predict(model, weights, img):
-    # 전처리
-    preprocess = weights.transforms(antialias=True)
 
-    # 전처리 적용
-    batch = preprocess(img).unsqueeze(0)
+def predict(model, weights, img, max_side=None):
+    return predict_batch(model, weights, [img], max_side)[0]
 
-    # 모델을 사용하여 예측 및 사람 마스크만 추출
-    prediction = model(batch)["out"]
-    normalized_masks = prediction.softmax(dim=1)
-    class_to_idx = {cls: idx for (idx, cls) in enumerate(
-        weights.meta["categories"])}
-    mask = normalized_masks[0, class_to_idx["person"]]
 
-    # numpy array로 변환
-    mask = mask.detach().cpu().numpy()
+def shrink(img, max_side):
+    # 긴 변이 max_side보다 길면 max_side가 되도록 축소 (reduce를 먼저 써서 빠르게 처리)
+    # 작은 이미지는 확대하지 않고 그대로 사용
+    if max(img.size) <= max_side:
+        return img
+    scale = max_side / max(img.size)
+    size = (max(round(img.width * scale), 1), max(round(img.height * scale), 1))
+    return img.resize(size, resample=Image.BILINEAR, reducing_gap=2.0)
 
-    return mask
+
+def predict_batch(model, weights, imgs, max_side=None, timings=None):
+    # timings가 있으면 전처리, 모델 실행, 후처리 시간을 기록
+    with span(timings, "transforms"):
+        # 전처리 (max_side가 있으면 긴 변 기준으로 직접 리사이즈하므로 짧은 변 리사이즈는 생략)
+        if max_side:
+            preprocess = weights.transforms(antialias=True, resize_size=None)
+            imgs = [shrink(img, max_side) for img in imgs]
+        else:
+            preprocess = weights.transforms(antialias=True)
+
+        # 전처리 적용 (이미지마다 크기가 다를 수 있음)
+        tensors = [preprocess(img) for img in imgs]
+
+        # 가장 큰 크기에 맞춰 0으로 패딩한 배치 생성
+        height = max(tensor.shape[1] for tensor in tensors)
+        width = max(tensor.shape[2] for tensor in tensors)
+        batch = tensors[0].new_zeros((len(tensors), 3, height, width))
+        for i, tensor in enumerate(tensors):
+            batch[i, :, :tensor.shape[1], :tensor.shape[2]] = tensor
+
+    # 모델을 사용하여 예측
+    with span(timings, "forward"):
+        prediction = model(batch)["out"]
+
+    with span(timings, "postprocess"):
+        # 사람 마스크만 추출
+        normalized_masks = prediction.softmax(dim=1)
+        class_to_idx = {cls: idx for (idx, cls) in enumerate(
+            weights.meta["categories"])}
+
+        # 패딩을 제외한 영역만 잘라 numpy array로 변환
+        masks = []
+        for i, tensor in enumerate(tensors):
+            mask = normalized_masks[i, class_to_idx["person"], :tensor.shape[1], :tensor.shape[2]]
+            masks.append(mask.detach().cpu().numpy())
+
+    return masks
 
 
 def fit_background(img, background):
     # 이미지 사이즈 추출
     fg_h, fg_w, _ = img.shape
 
+    return resize_background(background, fg_h, fg_w)
+
+
+def resize_background(background, fg_h, fg_w):
     # 배경 사이즈 추출
     bg_h, bg_w, _ = background.shape
 
@@ -50,26 +90,140 @@ def fit_background(img, background):
     return background
 
 
-def blend(img, mask, background):
+def upsample_mask(mask, img, radius=4, eps=1e-3):
+    # 작은 해상도에서 구한 guided filter 계수를 원본 크기로 키워 경계를 따라 마스크를 업샘플링
+    fg_h, fg_w, _ = img.shape
+    mask_h, mask_w = mask.shape
+
+    # 원본 이미지의 밝기를 가이드로 사용
+    guide = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY).astype(np.float32)
+    guide *= 1 / 255
+    small = cv2.resize(guide, (mask_w, mask_h), interpolation=cv2.INTER_AREA)
+
+    # 마스크 크기에서 지역 선형 계수 계산
+    ksize = (2 * radius + 1, 2 * radius + 1)
+    mean_i = cv2.blur(small, ksize)
+    mean_p = cv2.blur(mask, ksize)
+    cov_ip = cv2.blur(small * mask, ksize) - mean_i * mean_p
+    var_i = cv2.blur(small * small, ksize) - mean_i * mean_i
+    a = cov_ip / (var_i + eps)
+    b = mean_p - a * mean_i
+
+    # 계수만 원본 크기로 키워서 가이드에 적용
+    a = cv2.resize(cv2.blur(a, ksize), (fg_w, fg_h))
+    b = cv2.resize(cv2.blur(b, ksize), (fg_w, fg_h))
+    guide *= a
+    guide += b
+    np.clip(guide, 0, 1, out=guide)
+
+    return guide
+
+
+def color_guided_filter(guide, mask, radius, eps, scale):
+    # 컬러 이미지를 가이드로 쓰는 guided filter (계수는 1/scale 크기에서 구해서 키움)
+    height, width = mask.shape
+    small_size = (max(width // scale, 1), max(height // scale, 1))
+    small_i = cv2.resize(guide, small_size, interpolation=cv2.INTER_AREA)
+    small_p = cv2.resize(mask, small_size, interpolation=cv2.INTER_AREA)
+    ksize = (2 * max(radius // scale, 1) + 1,) * 2
+
+    mean_i = cv2.blur(small_i, ksize)
+    mean_p = cv2.blur(small_p, ksize)
+    cov_ip = cv2.blur(small_i * small_p[..., None], ksize) - mean_i * mean_p[..., None]
+
+    # 채널 간 공분산 행렬 (대칭이라 6개 원소만 계산)
+    r, g, b = (small_i[..., c] for c in range(3))
+    mr, mg, mb = (mean_i[..., c] for c in range(3))
+    rr = cv2.blur(r * r, ksize) - mr * mr + eps
+    rg = cv2.blur(r * g, ksize) - mr * mg
+    rb = cv2.blur(r * b, ksize) - mr * mb
+    gg = cv2.blur(g * g, ksize) - mg * mg + eps
+    gb = cv2.blur(g * b, ksize) - mg * mb
+    bb = cv2.blur(b * b, ksize) - mb * mb + eps
+
+    # 3x3 역행렬을 여인수로 계산해서 a = cov_ip * inv(sigma + eps)
+    inv_rr = gg * bb - gb * gb
+    inv_rg = gb * rb - rg * bb
+    inv_rb = rg * gb - gg * rb
+    inv_gg = rr * bb - rb * rb
+    inv_gb = rb * rg - rr * gb
+    inv_bb = rr * gg - rg * rg
+    det = rr * inv_rr + rg * inv_rg + rb * inv_rb
+
+    cr, cg, cb = (cov_ip[..., c] for c in range(3))
+    a = np.stack([
+        cr * inv_rr + cg * inv_rg + cb * inv_rb,
+        cr * inv_rg + cg * inv_gg + cb * inv_gb,
+        cr * inv_rb + cg * inv_gb + cb * inv_bb,
+    ], axis=2) / det[..., None]
+    b = mean_p - np.sum(a * mean_i, axis=2)
+
+    # 계수를 평균내서 원본 크기로 키운 뒤 가이드에 적용
+    a = cv2.resize(cv2.blur(a, ksize), (width, height))
+    b = cv2.resize(cv2.blur(b, ksize), (width, height))
+    return np.sum(a * guide, axis=2) + b
+
+
+def refine_mask(mask, img, band=None, radius=16, eps=1e-3, scale=4):
+    # 사람 경계 주변(trimap의 미정 영역)만 컬러 guided filter로 다시 계산해서 머리카락, 어깨의 후광을 줄임
+    fg_h, fg_w, _ = img.shape
+    if mask.shape != (fg_h, fg_w):
+        mask = upsample_mask(mask, img)
+
+    # 확실한 전경/배경과 경계 띠로 trimap 생성 (띠 두께는 이미지 크기에 비례)
+    if band is None:
+        band = max(max(fg_h, fg_w) // 100, 3)
+    hard = (mask >= 0.5).astype(np.uint8)
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * band + 1, 2 * band + 1))
+    unknown = (cv2.dilate(hard, kernel) != cv2.erode(hard, kernel)).astype(np.uint8)
+
+    refined = hard.astype(np.float32)
+    x, y, w, h = cv2.boundingRect(unknown)
+    if w == 0 or h == 0:
+        return refined
+
+    # 경계 띠를 감싸는 영역만 필터링
+    pad = radius * 2
+    x0, y0 = max(x - pad, 0), max(y - pad, 0)
+    x1, y1 = min(x + w + pad, fg_w), min(y + h + pad, fg_h)
+    guide = img[y0:y1, x0:x1].astype(np.float32)
+    guide *= 1 / 255
+    alpha = color_guided_filter(guide, mask[y0:y1, x0:x1], radius, eps, scale)
+
+    region = unknown[y0:y1, x0:x1].astype(bool)
+    refined[y0:y1, x0:x1][region] = alpha[region]
+    np.clip(refined, 0, 1, out=refined)
+
+    return refined
+
+
+def blend(img, mask, background, out=None):
     # 전경 사이즈 초기화
     fg_h, fg_w, _ = img.shape
 
     # 마스크를 전경 크기에 맞춤
-    mask = cv2.resize(mask, (fg_w, fg_h))
+    if mask.shape != (fg_h, fg_w):
+        mask = cv2.resize(mask, (fg_w, fg_h))
 
-    # 마스크 타입 변환 및 차원 추가
-    alpha = mask.astype(float)
-    alpha = np.repeat(np.expand_dims(alpha, axis=2),
-                      3, axis=2)  # (height, width, 3)
+    # 마스크를 0~256 고정소수점 알파로 변환, 채널 축은 브로드캐스팅
+    alpha = np.multiply(mask, 256, dtype=np.float32)
+    alpha += 0.5
+    np.clip(alpha, 0, 256, out=alpha)
+    alpha = alpha.astype(np.uint16)[..., None]
 
-    # 이미지와 마스크 합성, 배경과 마스크 합성
-    foreground = cv2.multiply(alpha, img.astype(float))
-    background = cv2.multiply(1. - alpha, background.astype(float))
+    # 채널 순서를 뒤집은 뷰로 RGB -> BGR 변환을 합성과 함께 처리
+    foreground = img[..., ::-1]
+    background = background[..., ::-1]
 
-    # 전경과 배경 합성
-    result = cv2.add(foreground, background).astype(np.uint8)
+    # 이미지와 마스크 합성, 배경과 마스크 합성
+    result = np.multiply(foreground, alpha, dtype=np.uint16)
+    scratch = np.multiply(background, 256 - alpha, dtype=np.uint16)
 
-    # 색상 변환
-    result = cv2.cvtColor(result, cv2.COLOR_RGB2BGR)
+    # 전경과 배경 합성 후 반올림해서 uint8로 저장
+    result += scratch
+    result += 128
+    if out is None:
+        out = np.empty((fg_h, fg_w, 3), dtype=np.uint8)
+    np.right_shift(result, 8, out=out, casting="unsafe")
 
-    return result
+    return out
@@ -1,7 +1,4 @@
 from django.apps import AppConfig
-from torchvision.models.segmentation import (fcn_resnet50, FCN_ResNet50_Weights,
-                                             lraspp_mobilenet_v3_large, LRASPP_MobileNet_V3_Large_Weights,
-                                             deeplabv3_mobilenet_v3_large, DeepLabV3_MobileNet_V3_Large_Weights)
 import ssl
 
 ssl._create_default_https_context = ssl._create_unverified_context
@@ -10,20 +7,17 @@ ssl._create_default_https_context = ssl._create_unverified_context
 class JoriroConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "joriro"
-    weights = {
-        1: FCN_ResNet50_Weights.DEFAULT,
-        2: DeepLabV3_MobileNet_V3_Large_Weights.DEFAULT,
-        3: LRASPP_MobileNet_V3_Large_Weights.DEFAULT
-    }
-    models = {
-        1: fcn_resnet50(weights=weights[1]).eval(),
-        2: deeplabv3_mobilenet_v3_large(weights=weights[2]).eval(),
-        3: lraspp_mobilenet_v3_large(weights=weights[3]).eval()
-    }
-    backgrounds = {
-        1: "background_image/625.jpg",
-        2: "background_image/haeundae.jpg",
-        3: "background_image/hanra.png",
-        4: "background_image/panmunjeom.JPG",
-        5: "background_image/seokguram.jpeg"
-    }
+
+    def ready(self):
+        # 배경 업로드 시 크기별 배경 생성, 시작할 때 배경 파일 확인
+        from . import checks, signals  # noqa: F401
+
+        # 설정된 모델만 미리 로드하고 나머지는 첫 요청 때 로드
+        # 워커 풀을 쓰면 추론은 워커 프로세스에서만 하므로 웹 프로세스에서는 로드하지 않음
+        from django.conf import settings
+        import multiprocessing
+
+        from .registry import registry
+
+        if settings.JORIRO_POOL_WORKERS <= 0 or multiprocessing.parent_process() is not None:
+            registry.load_preloaded()
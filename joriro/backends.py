@@ -0,0 +1,169 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+import inspect
+import logging
+import os
+
+
+logger = logging.getLogger(__name__)
+
+
+# 추론 실행 방식: eager(PyTorch 모듈), torchscript(고정된 TorchScript 그래프), onnx(ONNX Runtime CPU)
+BACKENDS = ["eager", "torchscript", "onnx"]
+EXTENSIONS = {"torchscript": ".pt", "onnx": ".onnx", "state": "_state.pt"}
+
+
+def export_path(builder_name, backend):
+    return os.path.join(settings.JORIRO_EXPORT_PATH, builder_name + EXTENSIONS[backend])
+
+
+def quantized_path(builder_name):
+    return os.path.join(settings.JORIRO_EXPORT_PATH, builder_name + "_int8.pt")
+
+
+def output_only(model):
+    import torch
+
+    # 내보낸 그래프는 dict 대신 "out" 텐서 하나만 반환
+    class OutputOnly(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, batch):
+            return self.model(batch)["out"]
+
+    return OutputOnly(model).eval()
+
+
+def export_state(model, path, sample=None):
+    # 워커들이 메모리 매핑으로 같이 쓸 가중치 파일 (임시 파일에 쓴 뒤 교체)
+    import torch
+
+    # 디스크에 반영한 뒤 교체 (쓰기 직후의 dirty 페이지는 공유 여부 확인에서 개인 메모리로 보임)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        torch.save(model.state_dict(), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def supports_mapped_load():
+    # torch.load(mmap=True), load_state_dict(assign=True)는 torch 2.1부터 지원 (requirements.txt는 2.0.1)
+    import torch
+
+    return ("mmap" in inspect.signature(torch.load).parameters
+            and "assign" in inspect.signature(torch.nn.Module.load_state_dict).parameters)
+
+
+def load_mapped(builder_name, weights):
+    # 가중치 파일을 메모리 매핑해서 모델에 그대로 연결 (읽기만 하므로 워커들이 같은 페이지 캐시를 공유)
+    import torch
+    from torchvision.models import segmentation
+
+    path = export_path(builder_name, "state")
+    if not os.path.exists(path):
+        raise ImproperlyConfigured(
+            f"{path} 가 없습니다. python manage.py export_joriro_models --backends state 로 먼저 내보내주세요.")
+
+    mapped = supports_mapped_load()
+    if not mapped:
+        logger.warning("torch %s 는 가중치 메모리 매핑을 지원하지 않아 워커마다 가중치를 읽어 둡니다 (torch 2.1 이상 필요).",
+                       torch.__version__)
+
+    state = torch.load(path, mmap=True, weights_only=True) if mapped else torch.load(
+        path, map_location="cpu", weights_only=True)
+    kwargs = {"num_classes": len(weights.meta["categories"])}
+    if any(key.startswith("aux_classifier.") for key in state):
+        kwargs["aux_loss"] = True
+
+    if not mapped:
+        model = getattr(segmentation, builder_name)(weights=None, weights_backbone=None, **kwargs)
+        model.load_state_dict(state)
+        return model.eval()
+
+    # meta 장치에서 빈 모델을 만들어 초기화 비용 없이 매핑된 텐서를 연결
+    with torch.device("meta"):
+        model = getattr(segmentation, builder_name)(weights=None, weights_backbone=None, **kwargs)
+    model.load_state_dict(state, assign=True)
+    return model.eval()
+
+
+def export_torchscript(model, path, sample):
+    import torch
+
+    with torch.no_grad():
+        traced = torch.jit.trace(output_only(model), sample).eval()
+        torch.jit.freeze(traced).save(path)
+
+
+def export_onnx(model, path, sample):
+    import torch
+
+    # 배치, 높이, 너비는 입력마다 달라질 수 있음
+    axes = {0: "batch", 2: "height", 3: "width"}
+    options = {}
+    # torch 2.5 이후 기본값인 dynamo 내보내기는 onnxscript가 필요하므로 기존 방식 사용
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        options["dynamo"] = False
+
+    with torch.no_grad():
+        torch.onnx.export(output_only(model), (sample,), path, input_names=["input"], output_names=["out"],
+                          dynamic_axes={"input": axes, "out": axes}, opset_version=17, **options)
+
+
+class TorchScriptModel:
+    def __init__(self, path):
+        import torch
+
+        self.torch = torch
+        self.module = torch.jit.load(path).eval()
+
+    def __call__(self, batch):
+        with self.torch.no_grad():
+            return {"out": self.module(batch)}
+
+
+class OnnxModel:
+    def __init__(self, path):
+        import torch
+
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImproperlyConfigured("JORIRO_BACKEND=onnx 를 사용하려면 onnxruntime을 설치해야 합니다.")
+
+        from .runtime import inter_op_threads, intra_op_threads
+
+        # torch와 같은 스레드 설정 사용
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads()
+        options.inter_op_num_threads = inter_op_threads()
+
+        self.torch = torch
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def __call__(self, batch):
+        out = self.session.run(["out"], {"input": batch.detach().cpu().numpy()})[0]
+        return {"out": self.torch.from_numpy(out)}
+
+
+def load_quantized(builder_name):
+    path = quantized_path(builder_name)
+    if not os.path.exists(path):
+        raise ImproperlyConfigured(
+            f"{path} 가 없습니다. python manage.py quantize_joriro_models 로 먼저 양자화해주세요.")
+    return TorchScriptModel(path)
+
+
+def load_exported(builder_name, backend):
+    path = export_path(builder_name, backend)
+    if not os.path.exists(path):
+        raise ImproperlyConfigured(
+            f"{path} 가 없습니다. python manage.py export_joriro_models 로 먼저 내보내주세요.")
+
+    if backend == "torchscript":
+        return TorchScriptModel(path)
+    return OnnxModel(path)
@@ -0,0 +1,168 @@
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from PIL import Image
+from collections import OrderedDict
+from io import BytesIO
+from uuid import uuid4
+import hashlib
+import numpy as np
+import threading
+import time
+import cv2
+
+from .ai import resize_background
+from .models import Background
+
+
+# 크기별 배경 저장 경로
+VARIANT_PATH = "joriro/background/variants/"
+
+
+def generate_variants(background):
+    # 원본 배경을 긴 변 기준 여러 크기로 미리 줄여 numpy 파일로 저장 (요청마다 원본을 디코딩하지 않도록)
+    with background.image.open("rb") as f:
+        source = np.array(Image.open(f).convert("RGB"))
+    height, width, _ = source.shape
+
+    arrays = []
+    for side in sorted(settings.JORIRO_BACKGROUND_VARIANT_SIDES):
+        if side >= max(height, width):
+            break
+        scale = side / max(height, width)
+        size = (max(round(width * scale), 1), max(round(height * scale), 1))
+        arrays.append(cv2.resize(source, size, interpolation=cv2.INTER_AREA))
+    arrays.append(source)
+
+    # 다시 생성하면 경로가 바뀌어서 다른 프로세스의 캐시도 새 파일을 읽음
+    token = uuid4().hex[:8]
+    items = []
+    for array in arrays:
+        buffer = BytesIO()
+        np.save(buffer, array)
+        name = f"{VARIANT_PATH}{background.id}_{array.shape[1]}x{array.shape[0]}_{token}.npy"
+        path = default_storage.save(name, ContentFile(buffer.getvalue()))
+        items.append({"width": array.shape[1], "height": array.shape[0], "path": path})
+
+    # 이전에 만든 파일 삭제
+    for item in background.variants.get("items", []):
+        default_storage.delete(item["path"])
+
+    return {"source": background.image.name, "items": items}
+
+
+class BackgroundCache:
+    def __init__(self):
+        # 여행지별 (조회 시각, 높이순 크기별 배경 목록)
+        self.meta = {}
+        # 경로별 크기별 배경 (로컬 파일 저장소면 메모리 매핑, 아니면 내려받은 배열)
+        self.sources = {}
+        # (경로, 높이, 너비)별 크기를 맞춘 배경, 오래 안 쓴 순서로 정렬
+        self.plates = OrderedDict()
+        self.lock = threading.Lock()
+
+    @property
+    def max_size(self):
+        return getattr(settings, "JORIRO_BACKGROUND_CACHE_SIZE", 32)
+
+    @property
+    def refresh(self):
+        return getattr(settings, "JORIRO_BACKGROUND_REFRESH", 60)
+
+    def variants(self, place):
+        # 관리자가 배경을 바꾸면 refresh 초 안에 반영
+        now = time.monotonic()
+        with self.lock:
+            cached = self.meta.get(place)
+            if cached and now - cached[0] < self.refresh:
+                return cached[1]
+
+        background = Background.objects.filter(id=place, is_active=True).first()
+        if background is None or not background.variants.get("items"):
+            raise ValueError(f"사용할 수 없는 여행지입니다: {place}")
+        items = sorted(background.variants["items"], key=lambda item: item["height"])
+
+        with self.lock:
+            # 바뀐 배경의 이전 파일은 캐시에서 제거
+            if cached:
+                paths = {item["path"] for item in items}
+                for item in cached[1]:
+                    if item["path"] not in paths:
+                        self.sources.pop(item["path"], None)
+            self.meta[place] = (now, items)
+        return items
+
+    def version(self, place):
+        # 배경을 다시 생성하면 파일 경로(토큰)가 바뀌므로 경로로 버전을 만듦 (합성 결과 캐시 키에 사용)
+        paths = "\n".join(item["path"] for item in self.variants(place))
+        return hashlib.sha256(paths.encode()).hexdigest()[:8]
+
+    def forget(self, place):
+        # 이 프로세스에서 배경을 바꿨거나 파일이 지워졌으면 다음 조회 때 다시 읽음
+        with self.lock:
+            self.meta.pop(place, None)
+
+    def pick(self, place, height):
+        # 배경을 높이에 맞춰 키우지 않고 줄이기만 하도록 가장 가까운 큰 배경 선택 (없으면 가장 큰 배경)
+        items = self.variants(place)
+        for item in items:
+            if item["height"] >= height:
+                return item
+        return items[-1]
+
+    def source(self, path):
+        with self.lock:
+            if path in self.sources:
+                return self.sources[path]
+
+        try:
+            # 로컬 파일 저장소면 읽기 전용 메모리 매핑 (여러 요청, 워커가 같은 페이지 캐시를 공유)
+            array = np.load(default_storage.path(path), mmap_mode="r")
+        except (NotImplementedError, FileNotFoundError):
+            # S3 같은 원격 저장소는 로컬 경로가 없으므로 한 번 내려받아 메모리에 보관
+            # (저장소에서도 지워진 파일이면 open에서 FileNotFoundError)
+            with default_storage.open(path, "rb") as f:
+                array = np.load(BytesIO(f.read()))
+            array.flags.writeable = False
+
+        with self.lock:
+            return self.sources.setdefault(path, array)
+
+    def get(self, place, height, width):
+        try:
+            return self.plate(place, height, width)
+        except FileNotFoundError:
+            # 다른 프로세스가 배경을 다시 생성해서 이전 파일이 지워진 경우
+            self.forget(place)
+            return self.plate(place, height, width)
+
+    def plate(self, place, height, width):
+        path = self.pick(place, height)["path"]
+        key = (path, height, width)
+
+        with self.lock:
+            if key in self.plates:
+                self.plates.move_to_end(key)
+                return self.plates[key]
+
+        # 처음 보는 크기면 크기별 배경에서 크기를 맞춤 (여러 요청에서 재사용하므로 읽기 전용)
+        plate = resize_background(self.source(path), height, width)
+        plate.flags.writeable = False
+
+        with self.lock:
+            self.plates[key] = plate
+            self.plates.move_to_end(key)
+            while len(self.plates) > self.max_size:
+                self.plates.popitem(last=False)
+
+        return plate
+
+    def clear(self):
+        with self.lock:
+            self.meta.clear()
+            self.sources.clear()
+            self.plates.clear()
+
+
+backgrounds = BackgroundCache()
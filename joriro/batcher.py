@@ -0,0 +1,213 @@
+from django.conf import settings
+
+from concurrent.futures import Future
+import threading
+import time
+
+from .cache import result_cache
+from .metrics import span
+from .outputs import variants
+from .pipeline import composite, composite_batch, composite_places, composite_version, mark_started, result_file
+from .pool import BrokenProcessPool, PoolBusy, PoolUnavailable, get_pool
+
+
+class MicroBatcher:
+    # 같은 웹 프로세스에 동시에 들어온 요청만 묶을 수 있음
+    # (gunicorn sync 워커처럼 프로세스마다 요청을 하나씩 처리하면 거의 묶이지 않으므로
+    #  gthread 워커(--threads)나 비동기 작업(?async=1, JORIRO_JOB_THREADS)으로 동시 요청을 받아야 함)
+    def __init__(self, max_size, max_wait, max_pending):
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+
+        # 모델 번호별 대기 중인 작업 [(작업, future, 등록 시각)]
+        self.pending = {}
+        self.condition = threading.Condition()
+
+        # 워커 풀에 제출한 작업의 {future: (배치 future, 배치의 future 목록)}, 응답을 포기한 작업
+        self.running = {}
+        self.abandoned = set()
+
+        self.thread = threading.Thread(target=self.loop, name="joriro-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, data, name, model_choice, place, image_hash=None, block=False):
+        future = Future()
+
+        with self.condition:
+            # 대기열이 가득 차면 거절 (block이면 기다리는 작업이 이미 자리를 확보한 상태)
+            if not block and sum(len(items) for items in self.pending.values()) >= self.max_pending:
+                raise PoolBusy()
+
+            self.pending.setdefault(model_choice, []).append(
+                ((data, name, model_choice, place, image_hash), future, time.monotonic()))
+            self.condition.notify()
+
+        return future
+
+    def cancel(self, future):
+        # 시간 초과로 응답을 포기한 작업은 배치에서 빼고, 제출한 배치의 작업을 모두 포기하면 아직 시작 전인 배치도 취소
+        with self.condition:
+            if future.cancel():
+                for model_choice, items in list(self.pending.items()):
+                    items[:] = [item for item in items if item[1] is not future]
+                    if not items:
+                        del self.pending[model_choice]
+                return
+
+            self.abandoned.add(future)
+            pool_future, futures = self.running.get(future, (None, []))
+            if pool_future is None or not all(item in self.abandoned for item in futures):
+                return
+        pool_future.cancel()
+
+    def next_batch(self, now):
+        # 최대 크기만큼 모였거나 가장 오래된 작업이 최대 대기 시간을 넘긴 모델의 배치를 꺼냄
+        for model_choice, items in self.pending.items():
+            if len(items) >= self.max_size or now - items[0][2] >= self.max_wait:
+                batch = items[:self.max_size]
+                del items[:self.max_size]
+                if not items:
+                    del self.pending[model_choice]
+                return batch
+        return None
+
+    def next_deadline(self):
+        if not self.pending:
+            return None
+        return min(items[0][2] for items in self.pending.values()) + self.max_wait
+
+    def loop(self):
+        while True:
+            with self.condition:
+                batch = self.next_batch(time.monotonic())
+                while batch is None:
+                    deadline = self.next_deadline()
+                    timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                    self.condition.wait(timeout)
+                    batch = self.next_batch(time.monotonic())
+
+            self.dispatch(batch)
+
+    def dispatch(self, batch):
+        # 그 사이 취소된 작업은 빼고 제출
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        jobs = [job for job, _, _ in batch]
+        futures = [future for _, future, _ in batch]
+
+        # 워커 풀에 자리가 날 때까지 기다렸다가 배치 하나를 작업 하나로 제출
+        try:
+            pool_future = get_pool().submit(composite_batch, jobs, block=True)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        # 워커 풀 자리를 기다리는 사이 모든 요청이 포기했으면 배치 취소
+        with self.condition:
+            for future in futures:
+                self.running[future] = (pool_future, futures)
+            abandoned = all(future in self.abandoned for future in futures)
+        if abandoned:
+            pool_future.cancel()
+
+        # 배치 결과를 각 요청에 나눠줌
+        def scatter(pool_future):
+            with self.condition:
+                for future in futures:
+                    self.running.pop(future, None)
+                    self.abandoned.discard(future)
+
+            try:
+                results = pool_future.result()
+            except Exception as e:
+                # 작업 도중 워커가 종료되면 워커 풀은 다음 제출 때 다시 만듦
+                if isinstance(e, BrokenProcessPool):
+                    e = PoolUnavailable()
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                # 결과물을 저장하지 못한 작업만 실패
+                for future, result in zip(futures, results):
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+
+        pool_future.add_done_callback(scatter)
+
+
+batcher = None
+batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    global batcher
+
+    with batcher_lock:
+        if batcher is None:
+            batcher = MicroBatcher(
+                max_size=settings.JORIRO_BATCH_MAX_SIZE,
+                max_wait=settings.JORIRO_BATCH_MAX_WAIT_MS / 1000,
+                max_pending=settings.JORIRO_BATCH_MAX_SIZE * (
+                    max(settings.JORIRO_POOL_WORKERS, 1) + settings.JORIRO_POOL_MAX_QUEUE),
+            )
+        return batcher
+
+
+def cached_composite(name, model_choice, place, image_hash):
+    # 같은 이미지, 모델, 여행지의 결과물이 모두 캐시에 있으면 추론 없이 복사
+    if not image_hash or not result_cache.enabled:
+        return None
+
+    outputs = {variant: result_file(name, variant) for variant in variants()}
+    timings = {}
+    with span(timings, "result_cache"):
+        hit = all(result_cache.get_composite(image_hash, model_choice, place, path, variant,
+                                             composite_version(place, variant))
+                  for variant, path in outputs.items())
+    if hit:
+        return {variant: "/" + path for variant, path in outputs.items()}, timings
+    return None
+
+
+def run_composite(data, name, model_choice, place, image_hash=None, block=False):
+    # data는 업로드한 그대로의 이미지 (워커로 보내는 크기를 줄이기 위해 디코딩은 워커에서)
+    # ({결과물 종류: 경로}, 단계별 처리 시간) 반환
+    cached = cached_composite(name, model_choice, place, image_hash)
+    if cached:
+        mark_started([name])
+        return cached
+
+    pool = get_pool()
+
+    # 배치 크기가 1 이하이면 묶지 않고 바로 워커 풀에서 실행
+    if settings.JORIRO_BATCH_MAX_SIZE <= 1:
+        return pool.run(composite, data, name, model_choice, place, image_hash, block=block)
+
+    batcher = get_batcher()
+    future = batcher.submit(data, name, model_choice, place, image_hash, block=block)
+    try:
+        return future.result(timeout=pool.timeout)
+    except TimeoutError:
+        # 아무도 읽지 않을 결과를 위해 워커 풀 자리를 쓰지 않도록 취소
+        batcher.cancel(future)
+        raise
+
+
+def run_composite_places(data, names, model_choice, places, image_hash=None, block=False):
+    # 여행지마다 ({결과물 종류: 경로}, 단계별 처리 시간) 반환
+    results = [cached_composite(name, model_choice, place, image_hash) for name, place in zip(names, places)]
+    missing = [i for i, result in enumerate(results) if result is None]
+
+    # 캐시에 없는 여행지만 워커 하나에서 한꺼번에 합성
+    if missing:
+        composited = get_pool().run(
+            composite_places, data, [names[i] for i in missing], model_choice,
+            [places[i] for i in missing], image_hash, block=block)
+        for i, result in zip(missing, composited):
+            results[i] = result
+
+    return results
@@ -0,0 +1,131 @@
+from django.conf import settings
+
+import numpy as np
+import hashlib
+import os
+import shutil
+import tempfile
+
+from .outputs import extension
+
+
+def hash_image(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache:
+    # 웹 프로세스와 워커 프로세스가 같은 디렉터리를 공유하는 디스크 캐시
+    def __init__(self, path=None, max_bytes=None):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    @property
+    def cache_path(self):
+        return self.path or settings.JORIRO_RESULT_CACHE_PATH
+
+    @property
+    def cache_max_bytes(self):
+        if self.max_bytes is not None:
+            return self.max_bytes
+        return settings.JORIRO_RESULT_CACHE_MAX_BYTES
+
+    @property
+    def enabled(self):
+        return self.cache_max_bytes > 0
+
+    def mask_path(self, image_hash, model_choice):
+        return os.path.join(self.cache_path, f"{image_hash}_{model_choice}.npy")
+
+    def composite_path(self, image_hash, model_choice, place, variant="result", version=""):
+        # version은 배경과 결과물 설정의 버전 (pipeline.composite_version)
+        return os.path.join(self.cache_path, f"{image_hash}_{model_choice}_{place}_{version}_{variant}{extension()}")
+
+    def touch(self, path):
+        # 최근에 쓴 파일이 늦게 지워지도록 수정 시각 갱신
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def write(self, path, save):
+        # 임시 파일에 쓴 뒤 교체해서 다른 프로세스가 쓰다 만 파일을 읽지 않게 함
+        os.makedirs(self.cache_path, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                save(f)
+            os.replace(temp_path, path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        self.evict()
+
+    def get_mask(self, image_hash, model_choice):
+        if not self.enabled or not image_hash:
+            return None
+
+        path = self.mask_path(image_hash, model_choice)
+        if not self.touch(path):
+            return None
+        try:
+            return np.load(path).astype(np.float32)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put_mask(self, image_hash, model_choice, mask):
+        if not self.enabled or not image_hash:
+            return
+
+        # 저장 공간을 줄이기 위해 float16으로 저장
+        self.write(self.mask_path(image_hash, model_choice),
+                   lambda f: np.save(f, mask.astype(np.float16)))
+
+    def get_composite(self, image_hash, model_choice, place, dest, variant="result", version=""):
+        # 캐시에 합성 결과가 있으면 dest로 복사
+        if not self.enabled or not image_hash:
+            return False
+
+        path = self.composite_path(image_hash, model_choice, place, variant, version)
+        if not self.touch(path):
+            return False
+        try:
+            shutil.copyfile(path, dest)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def put_composite(self, image_hash, model_choice, place, data, variant="result", version=""):
+        # 인코딩한 결과물 그대로 저장
+        if not self.enabled or not image_hash:
+            return
+
+        self.write(self.composite_path(image_hash, model_choice, place, variant, version), lambda f: f.write(data))
+
+    def evict(self):
+        # 전체 크기가 한도를 넘으면 가장 오래 안 쓴 파일부터 삭제
+        entries = []
+        total = 0
+        with os.scandir(self.cache_path) as it:
+            for entry in it:
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.cache_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+result_cache = ResultCache()
@@ -0,0 +1,42 @@
+from django.core.checks import Tags, Warning, register
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, router
+
+
+@register(Tags.database)
+def check_backgrounds(app_configs, databases=None, **kwargs):
+    # 사용 중인 배경마다 크기별 배경 파일이 모두 있는지 확인
+    # DB를 조회하므로 migrate, check --database 때만 실행 (다른 관리 명령어마다 조회하지 않음)
+    from .models import Background
+
+    database = router.db_for_read(Background)
+    if database not in (databases or []):
+        return []
+
+    try:
+        backgrounds = list(Background.objects.using(database).filter(is_active=True))
+    except DatabaseError:
+        # 아직 마이그레이션 전
+        return []
+
+    errors = []
+    for background in backgrounds:
+        items = background.variants.get("items", [])
+        if not items:
+            errors.append(Warning(
+                f"{background} 배경의 크기별 배경이 없습니다.",
+                hint="python manage.py load_backgrounds --regenerate 로 다시 생성해주세요.",
+                obj=background,
+                id="joriro.W001",
+            ))
+            continue
+
+        missing = [item["path"] for item in items if not default_storage.exists(item["path"])]
+        if missing:
+            errors.append(Warning(
+                f"{background} 배경 파일이 없습니다: {', '.join(missing)}",
+                hint="python manage.py load_backgrounds --regenerate 로 다시 생성해주세요.",
+                obj=background,
+                id="joriro.W002",
+            ))
+    return errors
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+
+from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import numpy as np
+import threading
+
+from .ai import shrink
+from .models import Joriro
+from .pool import BoundedExecutor
+
+
+def decode_image(data, max_side=0):
+    # 요청 버퍼에서 바로 디코딩
+    img = Image.open(BytesIO(data))
+
+    # 필요한 크기보다 크면 JPEG는 축소 디코딩 (다른 형식은 무시됨)
+    if max_side and max(img.size) > max_side:
+        scale = max_side / max(img.size)
+        img.draft("RGB", (int(img.width * scale), int(img.height * scale)))
+
+    # 3 채널로 변환
+    img = img.convert("RGB")
+    if max_side and max(img.size) > max_side:
+        img = shrink(img, max_side)
+
+    # 파이프라인에 넘길 연속된 numpy array
+    return np.ascontiguousarray(np.asarray(img))
+
+
+def save_original(joriro_ids, name, data):
+    # 원본은 저장소에 한 번만 쓰고 같은 사진으로 만든 행들의 경로만 갱신 (작업 상태를 덮어쓰지 않도록 update 사용)
+    joriro = Joriro(id=joriro_ids[0])
+    joriro.image.save(name, ContentFile(data), save=False)
+    if not Joriro.objects.filter(id__in=joriro_ids).update(image=joriro.image.name):
+        # 그 사이 요청이 취소되어 삭제된 경우
+        joriro.image.delete(save=False)
+
+
+def save_original_in_thread(joriro_ids, name, data):
+    # 백그라운드 스레드에서 연 DB 연결은 작업이 끝나면 닫음
+    try:
+        save_original(joriro_ids, name, data)
+    finally:
+        connections.close_all()
+
+
+class StorageWriter(BoundedExecutor):
+    def __init__(self, threads, max_pending):
+        self.threads = threads
+
+        # 스레드가 0이면 요청 스레드에서 바로 저장
+        executor = None
+        if threads > 0:
+            executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="joriro-io")
+
+        super().__init__(executor, max(threads, 1) + max_pending)
+
+    def save_original(self, joriro_ids, name, data):
+        # 쓰기 대기열이 가득 차면 자리가 날 때까지 요청 스레드가 기다림
+        if self.executor is None:
+            return self.submit(save_original, joriro_ids, name, data, block=True)
+        return self.submit(save_original_in_thread, joriro_ids, name, data, block=True)
+
+
+writer = None
+writer_lock = threading.Lock()
+
+
+def get_writer():
+    global writer
+
+    with writer_lock:
+        if writer is None:
+            writer = StorageWriter(
+                threads=settings.JORIRO_IO_THREADS,
+                max_pending=settings.JORIRO_IO_MAX_PENDING,
+            )
+        return writer
@@ -0,0 +1,128 @@
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import threading
+import time
+
+from .models import Joriro
+from .batcher import run_composite
+from .metrics import stage_metrics
+from .pool import BoundedExecutor
+
+
+def mark_done(joriro, outputs, timings=None):
+    # outputs는 {결과물 종류: 경로}
+    joriro.status = "done"
+    joriro.result = outputs["result"]
+    joriro.thumbnail = outputs.get("thumbnail")
+    joriro.finished_at = timezone.now()
+    update_fields = ["status", "result", "thumbnail", "finished_at", "updated_at"]
+
+    # 단계별 처리 시간은 히스토그램에 모으고, 설정하면 행에도 저장
+    if timings:
+        stage_metrics.record(joriro.model, joriro.place_id, timings)
+        if settings.JORIRO_STORE_TIMINGS:
+            joriro.timings = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+            update_fields.append("timings")
+
+    joriro.save(update_fields=update_fields)
+
+
+def mark_failed(joriro, error):
+    joriro.status = "failed"
+    joriro.error = error
+    joriro.finished_at = timezone.now()
+    joriro.save(update_fields=["status", "error", "finished_at", "updated_at"])
+
+
+STALE_ERROR = "서버가 다시 시작되어 작업이 중단되었습니다. 다시 요청해주세요."
+
+# 이 프로세스에서 마지막으로 끝나지 않은 작업을 정리한 시각
+sweep_state = {"at": None}
+sweep_lock = threading.Lock()
+
+
+def fail_stale_jobs(stale_after=None, now=None):
+    # 대기열은 웹 프로세스 메모리에 있어서 배포, 재시작 때 사라지므로
+    # 오래 갱신되지 않은 대기 중, 처리 중 작업은 실패로 표시 (조회하는 클라이언트가 끝없이 기다리지 않도록)
+    if stale_after is None:
+        stale_after = settings.JORIRO_JOB_STALE_AFTER
+    now = now or timezone.now()
+    return Joriro.objects.filter(
+        status__in=["queued", "running"], updated_at__lt=now - timedelta(seconds=stale_after),
+    ).update(status="failed", error=STALE_ERROR, finished_at=now, updated_at=now)
+
+
+def sweep_stale_jobs():
+    # 프로세스가 시작된 뒤 처음 호출할 때와 이후 JORIRO_JOB_SWEEP_INTERVAL마다 한 번씩 정리
+    with sweep_lock:
+        if sweep_state["at"] is not None and time.monotonic() - sweep_state["at"] < settings.JORIRO_JOB_SWEEP_INTERVAL:
+            return 0
+        sweep_state["at"] = time.monotonic()
+    return fail_stale_jobs()
+
+
+def run_job(joriro_id, data, timings=None):
+    # timings에는 요청을 받을 때 잰 처리 시간이 들어 있음
+    timings = dict(timings or {})
+    joriro = Joriro.objects.get(id=joriro_id)
+
+    # 워커 풀에 자리가 날 때까지 기다렸다가 실행 (처리 중 표시는 워커가 작업을 꺼낼 때)
+    start = time.perf_counter()
+    try:
+        outputs, composite_timings = run_composite(
+            data, joriro.id, joriro.model, joriro.place_id, joriro.image_hash, block=True)
+    except TimeoutError:
+        mark_failed(joriro, "처리 시간이 초과되었습니다.")
+    except Exception as e:
+        mark_failed(joriro, str(e) or e.__class__.__name__)
+    else:
+        timings.update(composite_timings)
+        timings["composite"] = time.perf_counter() - start
+        mark_done(joriro, outputs, timings)
+
+
+def run_job_in_thread(joriro_id, data, timings=None):
+    # 백그라운드 스레드에서 연 DB 연결은 작업이 끝나면 닫음
+    try:
+        run_job(joriro_id, data, timings)
+    finally:
+        connections.close_all()
+
+
+class JobQueue(BoundedExecutor):
+    def __init__(self, threads, max_pending):
+        self.threads = threads
+
+        # 스레드가 0이면 요청 스레드에서 바로 실행
+        executor = None
+        if threads > 0:
+            executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="joriro-job")
+
+        super().__init__(executor, max(threads, 1) + max_pending)
+
+    def enqueue(self, joriro_id, data, timings=None):
+        # data는 업로드한 그대로의 이미지
+        sweep_stale_jobs()
+        if self.executor is None:
+            return self.submit(run_job, joriro_id, data, timings)
+        return self.submit(run_job_in_thread, joriro_id, data, timings)
+
+
+queue = None
+queue_lock = threading.Lock()
+
+
+def get_queue():
+    global queue
+
+    with queue_lock:
+        if queue is None:
+            queue = JobQueue(
+                threads=settings.JORIRO_JOB_THREADS,
+                max_pending=settings.JORIRO_JOB_MAX_PENDING,
+            )
+        return queue
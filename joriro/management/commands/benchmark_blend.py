@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+
+import numpy as np
+import cv2
+import time
+import tracemalloc
+
+from joriro.ai import blend
+
+
+def blend_float64(img, mask, background):
+    # 비교용 이전 합성 방식 (float64 변환, np.repeat, cvtColor)
+    fg_h, fg_w, _ = img.shape
+    mask = cv2.resize(mask, (fg_w, fg_h))
+    alpha = mask.astype(float)
+    alpha = np.repeat(np.expand_dims(alpha, axis=2), 3, axis=2)
+    foreground = cv2.multiply(alpha, img.astype(float))
+    background = cv2.multiply(1. - alpha, background.astype(float))
+    result = cv2.add(foreground, background).astype(np.uint8)
+    return cv2.cvtColor(result, cv2.COLOR_RGB2BGR)
+
+
+class Command(BaseCommand):
+    help = "조리로 합성(blend) 방식별 메가픽셀당 시간과 메모리를 측정합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1024x768,1920x1080,4032x3024",
+                            help="측정할 이미지 크기 목록 (너비x높이, 쉼표로 구분)")
+        parser.add_argument("--repeat", type=int, default=5, help="크기별 반복 횟수")
+
+    def measure(self, fn, img, mask, background, repeat):
+        # 최대 메모리 사용량 측정 (numpy 버퍼는 tracemalloc으로 추적됨)
+        tracemalloc.start()
+        fn(img, mask.copy(), background)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # 평균 실행 시간 측정
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn(img, mask.copy(), background)
+        elapsed = (time.perf_counter() - start) / repeat
+
+        return elapsed, peak
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        methods = [("float64", blend_float64), ("fixed-point", blend)]
+
+        for size in options["sizes"].split(","):
+            width, height = map(int, size.split("x"))
+            megapixels = width * height / 1e6
+
+            img = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+            background = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+            # 모델 출력처럼 더 작은 크기의 float32 마스크
+            mask = rng.random((520, 520 * width // height), dtype=np.float32)
+
+            for name, fn in methods:
+                elapsed, peak = self.measure(fn, img, mask, background, options["repeat"])
+                self.stdout.write(
+                    f"{size:>10} {name:>12}: {elapsed * 1000 / megapixels:8.2f} ms/MP, "
+                    f"{peak / 1e6 / megapixels:7.2f} MB/MP")
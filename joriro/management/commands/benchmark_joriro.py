@@ -0,0 +1,226 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from PIL import Image, ImageDraw
+from datetime import datetime
+import json
+import numpy as np
+import os
+import platform
+import resource
+import subprocess
+import time
+import cv2
+
+from joriro.ai import predict_batch, shrink, upsample_mask, blend
+from joriro.backgrounds import backgrounds
+from joriro.metrics import span
+from joriro.outputs import encode, variants
+from joriro.quantization import IMAGE_EXTENSIONS, mask_iou
+from joriro.registry import MODEL_SPECS, registry
+
+
+def synthetic_corpus(count, seed=0):
+    # 사람 크기의 도형을 그린 임의 사진 (긴 변 2048)
+    rng = np.random.default_rng(seed)
+    imgs = []
+    for _ in range(count):
+        width, height = (2048, 1536) if rng.random() < 0.5 else (1536, 2048)
+        img = Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+        draw = ImageDraw.Draw(img)
+        x, y = int(rng.integers(width // 4, width * 3 // 4)), int(rng.integers(height // 3, height * 2 // 3))
+        draw.ellipse((x - width // 10, y - height // 3, x + width // 10, y + height // 3),
+                     fill=tuple(int(c) for c in rng.integers(0, 256, 3)))
+        imgs.append(("synthetic", img, None))
+    return imgs
+
+
+def photo_corpus(path, mask_path=None, limit=None):
+    # 사진 폴더 (mask_path에 같은 이름의 정답 마스크가 있으면 함께 사용)
+    names = sorted(name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+    if limit:
+        names = names[:limit]
+
+    imgs = []
+    for name in names:
+        truth = None
+        if mask_path:
+            truth_file = os.path.join(mask_path, os.path.splitext(name)[0] + ".png")
+            if os.path.exists(truth_file):
+                truth = Image.open(truth_file).convert("L")
+        imgs.append((name, Image.open(os.path.join(path, name)).convert("RGB"), truth))
+    return imgs
+
+
+def reset_peak_rss():
+    # Linux는 /proc/self/clear_refs에 5를 쓰면 최대 RSS(VmHWM)를 현재 RSS로 초기화
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def rss_mb(field="VmRSS"):
+    # 현재 RSS(VmRSS) 또는 마지막 초기화 이후 최대 RSS(VmHWM)
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1e3
+    except OSError:
+        pass
+    # /proc이 없으면 프로세스 시작부터의 최대 RSS (Linux는 KB, macOS는 byte 단위)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if platform.system() == "Darwin" else peak / 1e3
+
+
+def source_reference(model, weights, img):
+    # 줄이지 않은 원본 해상도로 예측한 마스크 (정답 마스크가 없을 때 품질 기준)
+    return predict_batch(model, weights, [img], max(img.size))[0]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_pipeline(model, weights, img, max_side, place, timings):
+    # 요청 하나의 예측, 배경 맞춤, 합성, 인코딩 (predict_batch가 단계별 시간을 timings에 기록)
+    mask = predict_batch(model, weights, [img], max_side, timings)[0]
+    image = np.asarray(img)
+    if settings.JORIRO_EDGE_AWARE_UPSAMPLE:
+        with span(timings, "upsample"):
+            mask = upsample_mask(mask, image)
+    with span(timings, "background"):
+        background = backgrounds.get(place, image.shape[0], image.shape[1])
+    with span(timings, "blend"):
+        result = blend(image, mask, background)
+    with span(timings, "encode"):
+        for max_side in variants().values():
+            encode(result, max_side)
+    return mask
+
+
+class Command(BaseCommand):
+    help = "조리로 전체 파이프라인을 모델, 해상도별로 실행해 처리량, 지연 시간 분위수, 설정별 최대 RSS, 마스크 품질(정답 또는 원본 해상도 예측 대비 IoU)을 측정하고 JSON으로 저장합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--images", help="측정용 사람 사진 폴더 (없으면 임의 이미지 사용)")
+        parser.add_argument("--masks", help="사진과 같은 이름의 정답 마스크(.png) 폴더")
+        parser.add_argument("--count", type=int, default=8, help="사용할 사진 수")
+        parser.add_argument("--sizes", nargs="+", type=int, default=[640, 1280, 2048],
+                            help="입력 사진의 긴 변 길이 목록")
+        parser.add_argument("--models", nargs="+", type=int, choices=list(MODEL_SPECS), default=list(MODEL_SPECS),
+                            help="측정할 모델 번호 (Joriro.MODEL_CHOICE)")
+        parser.add_argument("--place", type=int, default=3, help="합성할 여행지 번호 (Background id)")
+        parser.add_argument("--repeat", type=int, default=1, help="사진별 반복 횟수")
+        parser.add_argument("--output", help="결과를 저장할 JSON 파일")
+        parser.add_argument("--compare", help="비교할 이전 결과 JSON 파일")
+
+    def measure(self, choice, size, corpus, references, options):
+        model, weights = registry.get(choice)
+        max_side = settings.JORIRO_INFERENCE_MAX_SIDE.get(choice)
+        # 원본이 더 작으면 키우지 않고 그대로 사용
+        imgs = [(name, shrink(img, size), truth) for name, img, truth in corpus]
+
+        # 첫 실행 비용은 제외
+        run_pipeline(model, weights, imgs[0][1], max_side, options["place"], None)
+
+        # 이 설정에서의 최대 RSS만 재도록 초기화 (초기화할 수 없으면 프로세스 전체의 최대 RSS)
+        per_config = reset_peak_rss()
+        start_rss = rss_mb()
+
+        latencies = []
+        stages = {}
+        ious = []
+        for (name, img, truth), reference in zip(imgs, references):
+            for _ in range(options["repeat"]):
+                timings = {}
+                start = time.perf_counter()
+                mask = run_pipeline(model, weights, img, max_side, options["place"], timings)
+                latencies.append(time.perf_counter() - start)
+                for stage, seconds in timings.items():
+                    stages.setdefault(stage, []).append(seconds)
+
+            # 기준 마스크를 측정한 사진 크기로 맞춰 비교
+            if truth is not None:
+                reference = np.asarray(truth.resize(img.size), dtype=np.float32) / 255
+            else:
+                reference = cv2.resize(reference, img.size)
+            if mask.shape != reference.shape:
+                mask = cv2.resize(mask, (reference.shape[1], reference.shape[0]))
+            ious.append(mask_iou(mask, reference))
+        peak_rss = rss_mb("VmHWM")
+
+        return {
+            "model": choice,
+            "builder": MODEL_SPECS[choice][0],
+            "size": size,
+            "images": len(latencies),
+            "throughput": len(latencies) / sum(latencies),
+            "p50_ms": np.percentile(latencies, 50) * 1000,
+            "p95_ms": np.percentile(latencies, 95) * 1000,
+            "p99_ms": np.percentile(latencies, 99) * 1000,
+            "stages_ms": {stage: np.mean(seconds) * 1000 for stage, seconds in stages.items()},
+            "peak_rss_mb": peak_rss,
+            "rss_delta_mb": peak_rss - start_rss,
+            "rss_scope": "config" if per_config else "process",
+            "iou": float(np.mean(ious)),
+            "iou_reference": "truth" if any(truth is not None for _, _, truth in imgs) else "source_resolution",
+        }
+
+    def handle(self, *args, **options):
+        if options["images"]:
+            corpus = photo_corpus(options["images"], options["masks"], options["count"])
+            if not corpus:
+                raise CommandError(f"{options['images']} 에 사진이 없습니다.")
+        else:
+            corpus = synthetic_corpus(options["count"])
+
+        previous = {}
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                previous = {(row["model"], row["size"]): row for row in json.load(f)["results"]}
+
+        self.stdout.write("model                          size  img/s   p50 ms   p95 ms   p99 ms  RSS MB    IoU")
+        results = []
+        for choice in options["models"]:
+            # 정답 마스크가 없는 사진은 원본 해상도 예측을 기준으로 사용 (해상도마다 다시 예측하지 않음)
+            model, weights = registry.get(choice)
+            references = [None if truth is not None else source_reference(model, weights, img)
+                          for _, img, truth in corpus]
+            for size in options["sizes"]:
+                row = self.measure(choice, size, corpus, references, options)
+                results.append(row)
+
+                line = (f"{row['builder']:<29} {size:5d} {row['throughput']:6.2f} {row['p50_ms']:8.1f} "
+                        f"{row['p95_ms']:8.1f} {row['p99_ms']:8.1f} {row['peak_rss_mb']:7.0f} {row['iou']:6.3f}")
+                # 이전 결과가 있으면 p95 변화율 표시
+                before = previous.get((choice, size))
+                if before:
+                    line += f"  p95 {(row['p95_ms'] / before['p95_ms'] - 1) * 100:+.1f}%"
+                self.stdout.write(line)
+
+        if options["output"]:
+            report = {
+                "commit": git_commit(),
+                "created_at": datetime.now().isoformat(),
+                "corpus": options["images"] or "synthetic",
+                "settings": {
+                    "backend": settings.JORIRO_BACKEND,
+                    "quantized_models": settings.JORIRO_QUANTIZED_MODELS,
+                    "inference_max_side": settings.JORIRO_INFERENCE_MAX_SIDE,
+                    "edge_aware_upsample": settings.JORIRO_EDGE_AWARE_UPSAMPLE,
+                    "intra_op_threads": settings.JORIRO_INTRA_OP_THREADS,
+                    "inter_op_threads": settings.JORIRO_INTER_OP_THREADS,
+                },
+                "results": results,
+            }
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"결과 저장: {options['output']}")
@@ -0,0 +1,102 @@
+from django.core.management.base import BaseCommand
+
+from PIL import Image
+from concurrent.futures import ProcessPoolExecutor, wait
+import multiprocessing
+import numpy as np
+import time
+
+from joriro.quantization import load_images
+from joriro.registry import MODEL_SPECS
+
+
+# 벤치마크 워커 프로세스마다 로드한 모델
+worker_state = {}
+
+
+def init_bench_worker(counter, workers, choice, threads, inter_threads, pin):
+    import torch
+
+    from joriro.registry import load_eager_model
+    from joriro.runtime import assign_worker, available_cpus
+
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    # 벤치마크는 이 명령어의 워커 풀 하나만 측정
+    assign_worker(index, workers, pin, web_processes=1)
+
+    # 0이면 서버와 같이 쓸 수 있는 CPU를 워커 수로 나눔
+    if threads <= 0:
+        threads = max(len(available_cpus()) // (1 if pin else workers), 1)
+    torch.set_num_threads(threads)
+    if inter_threads > 0:
+        torch.set_interop_threads(inter_threads)
+
+    worker_state["model"], worker_state["weights"] = load_eager_model(choice)
+
+
+def run_bench(img, max_side):
+    from joriro.ai import predict_batch
+
+    start = time.perf_counter()
+    predict_batch(worker_state["model"], worker_state["weights"], [img], max_side)
+    return time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = "조리로 추론 스레드 수, 워커 수, CPU 고정 설정을 바꿔가며 모델별 처리량과 p95 지연 시간을 측정합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--images", help="측정용 사진 폴더 (없으면 임의 이미지 사용)")
+        parser.add_argument("--size", type=int, nargs=2, default=[1280, 960], metavar=("WIDTH", "HEIGHT"),
+                            help="임의 이미지 크기")
+        parser.add_argument("--models", nargs="+", type=int, choices=list(MODEL_SPECS), default=list(MODEL_SPECS),
+                            help="측정할 모델 번호 (Joriro.MODEL_CHOICE)")
+        parser.add_argument("--threads", nargs="+", type=int, default=[0, 1, 2, 4],
+                            help="추론 하나가 쓰는 intra-op 스레드 수 (0은 자동)")
+        parser.add_argument("--inter-threads", type=int, default=0, help="inter-op 스레드 수 (0은 torch 기본값)")
+        parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4], help="동시에 추론하는 워커 수")
+        parser.add_argument("--affinity", action="store_true", help="워커마다 CPU를 나눠서 고정")
+        parser.add_argument("--requests", type=int, default=32, help="설정마다 보낼 요청 수")
+
+    def measure(self, choice, threads, workers, options, imgs, max_side):
+        context = multiprocessing.get_context("spawn")
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=init_bench_worker,
+            initargs=(context.Value("i", 0), workers, choice, threads, options["inter_threads"], options["affinity"]),
+        )
+        try:
+            # 모든 워커가 모델을 로드하고 한 번씩 실행한 뒤부터 측정
+            wait([executor.submit(run_bench, imgs[0], max_side) for _ in range(workers)])
+
+            # 워커들이 동시에 추론할 때 요청 하나의 추론 시간과 전체 처리량 측정
+            start = time.perf_counter()
+            futures = [executor.submit(run_bench, imgs[i % len(imgs)], max_side) for i in range(options["requests"])]
+            latencies = [future.result() for future in futures]
+            elapsed = time.perf_counter() - start
+        finally:
+            executor.shutdown()
+
+        return options["requests"] / elapsed, np.percentile(latencies, 95)
+
+    def handle(self, *args, **options):
+        from django.conf import settings
+
+        if options["images"]:
+            imgs = load_images(options["images"], options["requests"])
+        else:
+            width, height = options["size"]
+            imgs = [Image.fromarray(np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8))]
+
+        for choice in options["models"]:
+            max_side = settings.JORIRO_INFERENCE_MAX_SIDE.get(choice)
+            self.stdout.write(f"{MODEL_SPECS[choice][0]} (최대 변 {max_side or '원본'})")
+            self.stdout.write("  workers threads   req/s    p95 ms")
+
+            for workers in options["workers"]:
+                for threads in options["threads"]:
+                    throughput, p95 = self.measure(choice, threads, workers, options, imgs, max_side)
+                    self.stdout.write(f"  {workers:7d} {threads or '자동':>7} {throughput:7.2f} {p95 * 1000:9.1f}")
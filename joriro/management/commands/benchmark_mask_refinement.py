@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+import numpy as np
+import time
+import cv2
+
+from joriro.ai import predict_batch, refine_mask, upsample_mask
+from joriro.quantization import mask_iou
+from joriro.registry import MODEL_SPECS, registry
+from joriro.management.commands.benchmark_joriro import photo_corpus, source_reference, synthetic_corpus
+
+
+# 비교할 마스크 후처리 방식
+METHODS = {
+    "bilinear": lambda mask, img: cv2.resize(mask, (img.shape[1], img.shape[0])),
+    "guided": upsample_mask,
+    "refine": refine_mask,
+}
+
+
+class Command(BaseCommand):
+    help = "모델과 마스크 후처리 방식(bilinear, guided, refine)별 처리 시간과 마스크 품질(IoU, 평균 알파 오차)을 비교합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--images", help="측정용 사람 사진 폴더 (없으면 임의 이미지 사용)")
+        parser.add_argument("--masks", help="사진과 같은 이름의 정답 마스크(.png) 폴더 (없으면 품질 모델 결과와 비교)")
+        parser.add_argument("--count", type=int, default=8, help="사용할 사진 수")
+        parser.add_argument("--models", nargs="+", type=int, choices=list(MODEL_SPECS), default=list(MODEL_SPECS),
+                            help="측정할 모델 번호 (Joriro.MODEL_CHOICE)")
+        parser.add_argument("--reference-model", type=int, choices=list(MODEL_SPECS), default=1,
+                            help="정답 마스크가 없을 때 기준으로 쓸 모델 번호")
+
+    def predict(self, choice, img):
+        model, weights = registry.get(choice)
+        max_side = settings.JORIRO_INFERENCE_MAX_SIDE.get(choice)
+        start = time.perf_counter()
+        mask = predict_batch(model, weights, [img], max_side)[0]
+        return mask, time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        if options["images"]:
+            corpus = photo_corpus(options["images"], options["masks"], options["count"])
+            if not corpus:
+                raise CommandError(f"{options['images']} 에 사진이 없습니다.")
+        else:
+            corpus = synthetic_corpus(options["count"])
+
+        # 정답 마스크가 없는 사진은 품질 모델을 원본 해상도로 예측하고 refine한 결과를 기준으로 사용
+        references = []
+        for _, img, truth in corpus:
+            image = np.asarray(img)
+            if truth is not None:
+                references.append(np.asarray(truth.resize(img.size), dtype=np.float32) / 255)
+            else:
+                model, weights = registry.get(options["reference_model"])
+                references.append(refine_mask(source_reference(model, weights, img), image))
+
+        self.stdout.write("model                          method    infer ms   post ms  total ms     IoU     MAE")
+        for choice in options["models"]:
+            # 첫 실행 비용은 제외
+            self.predict(choice, corpus[0][1])
+
+            rows = {method: {"infer": [], "post": [], "iou": [], "mae": []} for method in METHODS}
+            for (_, img, _), reference in zip(corpus, references):
+                image = np.asarray(img)
+                mask, infer = self.predict(choice, img)
+
+                for method, fn in METHODS.items():
+                    start = time.perf_counter()
+                    alpha = fn(mask, image)
+                    post = time.perf_counter() - start
+
+                    row = rows[method]
+                    row["infer"].append(infer)
+                    row["post"].append(post)
+                    row["iou"].append(mask_iou(alpha, reference))
+                    row["mae"].append(float(np.abs(alpha - reference).mean()))
+
+            for method, row in rows.items():
+                infer = np.mean(row["infer"]) * 1000
+                post = np.mean(row["post"]) * 1000
+                self.stdout.write(
+                    f"{MODEL_SPECS[choice][0]:<30} {method:<8} {infer:9.1f} {post:9.1f} {infer + post:9.1f} "
+                    f"{np.mean(row['iou']):7.3f} {np.mean(row['mae']):7.4f}")
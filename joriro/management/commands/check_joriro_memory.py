@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+import multiprocessing
+import time
+
+from joriro.backends import export_path, supports_mapped_load
+from joriro.memory import exercise, read_rollup, read_smaps
+from joriro.pool import get_pool
+from joriro.registry import MODEL_SPECS
+
+
+class Command(BaseCommand):
+    help = "조리로 추론 워커를 띄워 모델을 실행한 뒤 워커별 메모리와 가중치 파일 페이지가 공유되는지 확인합니다 (Linux)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--models", nargs="+", type=int, choices=list(MODEL_SPECS), default=list(MODEL_SPECS),
+                            help="실행할 모델 번호 (Joriro.MODEL_CHOICE)")
+        parser.add_argument("--requests", type=int, default=2, help="워커당 실행할 추론 수")
+        parser.add_argument("--timeout", type=float, default=300, help="워커 준비를 기다릴 최대 시간 (초)")
+
+    def handle(self, *args, **options):
+        pool = get_pool()
+        if pool.executor is None:
+            raise CommandError("JORIRO_POOL_WORKERS 가 0이면 워커 프로세스가 없습니다.")
+
+        # 워커가 모두 준비될 때까지 대기
+        pool.start()
+        deadline = time.monotonic() + options["timeout"]
+        while pool.ready_workers() < pool.workers:
+            if time.monotonic() > deadline:
+                raise CommandError("워커가 준비되지 않았습니다.")
+            time.sleep(0.5)
+
+        for choice in options["models"]:
+            for _ in range(options["requests"] * pool.workers):
+                pool.run(exercise, choice, block=True)
+
+        paths = [export_path(MODEL_SPECS[choice][0], "state") for choice in options["models"]]
+        if not settings.JORIRO_MMAP_WEIGHTS:
+            self.stdout.write("JORIRO_MMAP_WEIGHTS 가 꺼져 있어 워커마다 가중치를 따로 가지고 있습니다.")
+        elif not supports_mapped_load():
+            self.stdout.write("설치된 torch가 메모리 매핑을 지원하지 않아 (torch 2.1 이상 필요) 워커마다 가중치를 따로 가지고 있습니다.")
+
+        faulted = False
+        self.stdout.write("     pid    RSS MB    PSS MB  weights shared MB  weights private MB")
+        for process in multiprocessing.active_children():
+            total = read_rollup(process.pid)
+            weights = read_smaps(process.pid, paths).values()
+            shared = sum(usage["Shared_Clean"] + usage["Shared_Dirty"] for usage in weights)
+            private = sum(usage["Private_Clean"] + usage["Private_Dirty"] for usage in weights)
+            dirty = sum(usage["Private_Dirty"] for usage in weights)
+            faulted = faulted or dirty > 0
+
+            self.stdout.write(
+                f"{process.pid:8d} {total['Rss'] / 1024:9.1f} {total['Pss'] / 1024:9.1f} "
+                f"{shared / 1024:18.1f} {private / 1024:19.1f}")
+
+        pool.shutdown()
+
+        # 가중치 페이지에 쓰기가 일어나면 워커 개인 메모리로 복사됨
+        if faulted:
+            raise CommandError("가중치 파일 페이지가 워커 개인 메모리로 복사되었습니다 (Private_Dirty > 0).")
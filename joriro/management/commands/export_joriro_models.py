@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+import os
+
+from joriro.backends import EXTENSIONS, export_path, export_onnx, export_state, export_torchscript
+from joriro.registry import MODEL_SPECS, load_eager_model
+
+
+class Command(BaseCommand):
+    help = "조리로 세그멘테이션 모델을 TorchScript, ONNX, 메모리 매핑용 가중치 파일로 내보냅니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backends", nargs="+", choices=list(EXTENSIONS), default=list(EXTENSIONS),
+                            help="내보낼 형식")
+        parser.add_argument("--models", nargs="+", type=int, choices=list(MODEL_SPECS), default=list(MODEL_SPECS),
+                            help="내보낼 모델 번호 (Joriro.MODEL_CHOICE)")
+
+    def handle(self, *args, **options):
+        import torch
+
+        exporters = {"torchscript": export_torchscript, "onnx": export_onnx, "state": export_state}
+        # 추적용 예시 입력 (가중치 기본 전처리 크기)
+        sample = torch.randn(1, 3, 520, 693)
+
+        for choice in options["models"]:
+            model, _ = load_eager_model(choice)
+            builder_name = MODEL_SPECS[choice][0]
+
+            for backend in options["backends"]:
+                path = export_path(builder_name, backend)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                exporters[backend](model, path, sample)
+                self.stdout.write(f"{builder_name} -> {path}")
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from joriro.jobs import fail_stale_jobs
+
+
+class Command(BaseCommand):
+    help = "배포, 재시작으로 사라져 끝나지 않은 조리로 작업을 실패로 표시합니다 (cron 등으로 주기적으로 실행)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stale-after", type=int, default=settings.JORIRO_JOB_STALE_AFTER,
+                            help="이 시간(초) 동안 갱신되지 않은 대기 중, 처리 중 작업을 실패로 표시")
+
+    def handle(self, *args, **options):
+        count = fail_stale_jobs(options["stale_after"])
+        self.stdout.write(self.style.SUCCESS(f"끝나지 않은 작업 {count}개를 실패로 표시했습니다."))
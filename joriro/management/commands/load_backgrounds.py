@@ -0,0 +1,53 @@
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection
+
+import os
+
+from joriro.backgrounds import generate_variants
+from joriro.models import Background
+
+
+# 이전에 코드에 있던 여행지 (번호, 이름, 파일)
+DEFAULT_BACKGROUNDS = [
+    (1, "6.25", "625.jpg"),
+    (2, "해운대", "haeundae.jpg"),
+    (3, "한라산", "hanra.png"),
+    (4, "판문점", "panmunjeom.JPG"),
+    (5, "석굴암", "seokguram.jpeg"),
+]
+
+
+class Command(BaseCommand):
+    help = "기본 여행지 배경을 등록하고 크기별 배경을 생성합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="background_image", help="기본 배경 이미지 폴더")
+        parser.add_argument("--regenerate", action="store_true", help="등록된 모든 배경의 크기별 배경을 다시 생성")
+
+    def handle(self, *args, **options):
+        for place, name, filename in DEFAULT_BACKGROUNDS:
+            if Background.objects.filter(id=place).exists():
+                continue
+
+            path = os.path.join(options["path"], filename)
+            if not os.path.exists(path):
+                self.stderr.write(f"{name}: {path} 가 없어 건너뜁니다.")
+                continue
+
+            # 저장하면 크기별 배경이 생성됨
+            with open(path, "rb") as f:
+                Background.objects.create(id=place, name=name, image=File(f, name=filename))
+            self.stdout.write(f"{name}: 등록")
+
+        # 번호를 지정해서 넣었으므로 PostgreSQL 시퀀스를 맞춤
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Background]):
+                cursor.execute(sql)
+
+        if options["regenerate"]:
+            for background in Background.objects.all():
+                background.variants = generate_variants(background)
+                Background.objects.filter(id=background.id).update(variants=background.variants)
+                self.stdout.write(f"{background.name}: 크기별 배경 {len(background.variants['items'])}개 생성")
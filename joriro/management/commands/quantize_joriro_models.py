@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+import numpy as np
+import os
+import time
+
+from joriro.ai import predict_batch
+from joriro.backends import TorchScriptModel, quantized_path
+from joriro.quantization import load_images, mask_iou, quantize_static, to_batch
+from joriro.registry import MODEL_SPECS, load_eager_model
+
+
+class Command(BaseCommand):
+    help = "보정용 사람 사진으로 조리로 모델을 int8 정적 양자화하고 float 모델과 속도, 크기, 마스크 IoU를 비교합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("calibration", help="보정용 사람 사진 폴더")
+        parser.add_argument("--eval", help="비교용 사진 폴더 (없으면 보정용 사진 사용)")
+        parser.add_argument("--limit", type=int, default=32, help="사용할 최대 사진 수")
+        parser.add_argument("--models", nargs="+", type=int, choices=list(MODEL_SPECS), default=list(MODEL_SPECS),
+                            help="양자화할 모델 번호 (Joriro.MODEL_CHOICE)")
+
+    def measure(self, model, weights, imgs, max_side):
+        masks = []
+        elapsed = []
+        for img in imgs:
+            start = time.perf_counter()
+            masks.append(predict_batch(model, weights, [img], max_side)[0])
+            elapsed.append(time.perf_counter() - start)
+        return masks, elapsed
+
+    def handle(self, *args, **options):
+        calibration_imgs = load_images(options["calibration"], options["limit"])
+        if not calibration_imgs:
+            raise CommandError(f"{options['calibration']} 에 사진이 없습니다.")
+        eval_imgs = load_images(options["eval"], options["limit"]) if options["eval"] else calibration_imgs
+
+        os.makedirs(settings.JORIRO_EXPORT_PATH, exist_ok=True)
+
+        for choice in options["models"]:
+            builder_name = MODEL_SPECS[choice][0]
+            max_side = settings.JORIRO_INFERENCE_MAX_SIDE.get(choice)
+            model, weights = load_eager_model(choice)
+
+            # 양자화 후 저장
+            calibration = [to_batch(img, weights, max_side) for img in calibration_imgs]
+            path = quantized_path(builder_name)
+            quantize_static(model, calibration, calibration[0]).save(path)
+            quantized = TorchScriptModel(path)
+
+            # 첫 실행 비용은 제외하고 측정
+            predict_batch(model, weights, eval_imgs[:1], max_side)
+            predict_batch(quantized, weights, eval_imgs[:1], max_side)
+            float_masks, float_elapsed = self.measure(model, weights, eval_imgs, max_side)
+            int8_masks, int8_elapsed = self.measure(quantized, weights, eval_imgs, max_side)
+
+            float_size = sum(t.numel() * t.element_size() for t in model.state_dict().values())
+            int8_size = os.path.getsize(path)
+            iou = np.mean([mask_iou(a, b) for a, b in zip(float_masks, int8_masks)])
+
+            self.stdout.write(f"{builder_name} -> {path}")
+            self.stdout.write(
+                f"  float: {np.mean(float_elapsed) * 1000:8.1f} ms, p95 {np.percentile(float_elapsed, 95) * 1000:8.1f} ms, "
+                f"{float_size / 1e6:7.1f} MB")
+            self.stdout.write(
+                f"  int8 : {np.mean(int8_elapsed) * 1000:8.1f} ms, p95 {np.percentile(int8_elapsed, 95) * 1000:8.1f} ms, "
+                f"{int8_size / 1e6:7.1f} MB, 마스크 IoU {iou:.3f}")
@@ -0,0 +1,45 @@
+import os
+
+
+# smaps에서 합산할 항목 (kB)
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def read_smaps(pid, paths):
+    # /proc/<pid>/smaps에서 paths 파일을 매핑한 영역의 메모리 사용량을 파일별로 합산 (Linux 전용)
+    paths = {os.path.realpath(path) for path in paths}
+    usage = {path: dict.fromkeys(FIELDS, 0) for path in paths}
+
+    current = None
+    with open(f"/proc/{pid}/smaps") as f:
+        for line in f:
+            fields = line.split()
+            if not fields:
+                continue
+            if not fields[0].endswith(":"):
+                # 매핑 영역 헤더: 주소 권한 오프셋 장치 inode [경로]
+                current = usage.get(fields[5]) if len(fields) > 5 else None
+            elif current is not None and fields[0][:-1] in FIELDS:
+                current[fields[0][:-1]] += int(fields[1])
+
+    return usage
+
+
+def read_rollup(pid):
+    # 프로세스 전체 메모리 사용량 (kB)
+    usage = dict.fromkeys(FIELDS, 0)
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            fields = line.split()
+            if fields and fields[0][:-1] in FIELDS:
+                usage[fields[0][:-1]] = int(fields[1])
+    return usage
+
+
+def exercise(choice):
+    # 워커에서 모델을 로드하고 한 번 추론한 뒤 워커 pid 반환
+    from .registry import registry, warm_up
+
+    model, weights = registry.get(choice)
+    warm_up(model, weights, choice)
+    return os.getpid()
@@ -0,0 +1,99 @@
+from contextlib import contextmanager
+import bisect
+import threading
+import time
+
+
+# 히스토그램 구간 상한 (초)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+@contextmanager
+def span(timings, stage):
+    # 블록 실행 시간을 timings[stage]에 더함 (timings가 None이면 측정하지 않음)
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0) + time.perf_counter() - start
+
+
+class StageMetrics:
+    # 단계, 모델, 여행지별 처리 시간 히스토그램 (프로세스마다 따로 집계)
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, stage, model_choice, place, seconds):
+        key = (stage, model_choice, place)
+        with self.lock:
+            entry = self.series.get(key)
+            if entry is None:
+                entry = self.series[key] = {"counts": [0] * (len(self.buckets) + 1), "count": 0, "sum": 0.0}
+            entry["counts"][bisect.bisect_left(self.buckets, seconds)] += 1
+            entry["count"] += 1
+            entry["sum"] += seconds
+
+    def record(self, model_choice, place, timings):
+        for stage, seconds in timings.items():
+            self.observe(stage, model_choice, place, seconds)
+
+    def quantile(self, counts, count, q):
+        # 구간 상한으로 분위수 추정 (마지막 구간이면 None)
+        rank = q * count
+        total = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            total += bucket_count
+            if total >= rank:
+                return bound
+        return None
+
+    def snapshot(self):
+        with self.lock:
+            series = {key: {"counts": list(entry["counts"]), "count": entry["count"], "sum": entry["sum"]}
+                      for key, entry in self.series.items()}
+
+        result = []
+        for (stage, model_choice, place), entry in sorted(series.items()):
+            cumulative = 0
+            buckets = {}
+            for bound, bucket_count in zip(self.buckets, entry["counts"]):
+                cumulative += bucket_count
+                buckets[str(bound)] = cumulative
+            buckets["+Inf"] = entry["count"]
+
+            result.append({
+                "stage": stage,
+                "model": model_choice,
+                "place": place,
+                "count": entry["count"],
+                "sum": round(entry["sum"], 6),
+                "p50": self.quantile(entry["counts"], entry["count"], 0.5),
+                "p95": self.quantile(entry["counts"], entry["count"], 0.95),
+                "buckets": buckets,
+            })
+        return result
+
+    def clear(self):
+        with self.lock:
+            self.series.clear()
+
+
+stage_metrics = StageMetrics()
+
+
+def stored_snapshot(since):
+    # 행에 저장한 처리 시간(JORIRO_STORE_TIMINGS)으로 모든 프로세스의 요청을 합쳐서 집계
+    from .models import Joriro
+
+    metrics = StageMetrics()
+    rows = Joriro.objects.filter(status="done", finished_at__gte=since, timings__isnull=False).values_list(
+        "model", "place_id", "timings")
+    for model_choice, place, timings in rows.iterator():
+        metrics.record(model_choice, place, timings)
+    return metrics.snapshot()
@@ -1,7 +1,21 @@
 from django.db import models
+from django.urls import reverse
 from users.models import User
 
 
+class Background(models.Model):
+    name = models.CharField("이름", max_length=50)
+    image = models.ImageField("배경 이미지", upload_to="joriro/background/")
+    is_active = models.BooleanField("사용 여부", default=True)
+    # 업로드할 때 만든 크기별 배경 {"source": 원본 경로, "items": [{"width", "height", "path"}]}
+    variants = models.JSONField("크기별 배경", default=dict, blank=True)
+    created_at = models.DateTimeField("작성일", auto_now_add=True)
+    updated_at = models.DateTimeField("수정일", auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
 class Joriro(models.Model):
     MODEL_CHOICE = [
         (1, "품질"),
@@ -9,19 +23,29 @@ class Joriro(models.Model):
         (3, "성능"),
     ]
 
-    PLACE_CHOICE = [
-        (1, "6.25"),
-        (2, "해운대"),
-        (3, "한라산"),
-        (4, "판문점"),
-        (5, "석굴암"),
+    STATUS_CHOICE = [
+        ("queued", "대기중"),
+        ("running", "처리중"),
+        ("done", "완료"),
+        ("failed", "실패"),
     ]
 
     user = models.ForeignKey(User, verbose_name="작성자",
                              on_delete=models.SET_NULL, related_name="joriros", null=True)
     image = models.ImageField("이미지", upload_to="joriro/%Y/%m/")
+    image_hash = models.CharField("이미지 해시", max_length=64, blank=True, db_index=True)
     model = models.PositiveIntegerField("모델", choices=MODEL_CHOICE, default=2)
-    place = models.PositiveIntegerField("여행지", choices=PLACE_CHOICE)
+    place = models.ForeignKey(Background, verbose_name="여행지",
+                              on_delete=models.PROTECT, related_name="joriros")
     result = models.CharField("결과", max_length=250, null=True, blank=True)
+    thumbnail = models.CharField("미리보기", max_length=250, null=True, blank=True)
+    status = models.CharField("상태", max_length=10, choices=STATUS_CHOICE, default="queued")
+    error = models.TextField("오류", blank=True)
+    started_at = models.DateTimeField("처리 시작일", null=True, blank=True)
+    finished_at = models.DateTimeField("처리 완료일", null=True, blank=True)
+    timings = models.JSONField("단계별 처리 시간", null=True, blank=True)
     created_at = models.DateTimeField("작성일", auto_now_add=True)
     updated_at = models.DateTimeField("수정일", auto_now=True)
+
+    def get_absolute_url(self):
+        return reverse("joriro_detail_view", kwargs={"joriro_id": self.id})
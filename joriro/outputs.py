@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+import cv2
+import os
+import tempfile
+
+
+# 결과물 형식별 확장자
+EXTENSIONS = {"jpeg": ".jpg", "webp": ".webp"}
+
+
+def extension():
+    output_format = settings.JORIRO_OUTPUT_FORMAT
+    if output_format not in EXTENSIONS:
+        raise ImproperlyConfigured(f"알 수 없는 JORIRO_OUTPUT_FORMAT 입니다: {output_format}")
+    return EXTENSIONS[output_format]
+
+
+def variants():
+    # 만들 결과물 종류별 긴 변 길이 (0이면 원본 크기)
+    sizes = {"result": 0}
+    if settings.JORIRO_THUMBNAIL_SIDE > 0:
+        sizes["thumbnail"] = settings.JORIRO_THUMBNAIL_SIDE
+    return sizes
+
+
+def encode(result, max_side=0):
+    # 합성한 BGR 버퍼를 설정한 형식으로 인코딩 (max_side가 있으면 같은 버퍼를 줄여서 인코딩)
+    height, width = result.shape[:2]
+    if max_side and max(height, width) > max_side:
+        scale = max_side / max(height, width)
+        size = (max(round(width * scale), 1), max(round(height * scale), 1))
+        result = cv2.resize(result, size, interpolation=cv2.INTER_AREA)
+
+    if settings.JORIRO_OUTPUT_FORMAT == "webp":
+        params = [cv2.IMWRITE_WEBP_QUALITY, settings.JORIRO_OUTPUT_QUALITY]
+    else:
+        params = [cv2.IMWRITE_JPEG_QUALITY, settings.JORIRO_OUTPUT_QUALITY,
+                  cv2.IMWRITE_JPEG_PROGRESSIVE, int(settings.JORIRO_OUTPUT_PROGRESSIVE)]
+
+    ok, data = cv2.imencode(extension(), result, params)
+    if not ok:
+        raise ValueError("결과물을 인코딩하지 못했습니다.")
+    return data.tobytes()
+
+
+def write_file(path, data):
+    # 임시 파일에 쓴 뒤 교체해서 쓰다 만 결과물을 내보내지 않게 함
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
@@ -0,0 +1,198 @@
+from django.conf import settings
+from django.utils import timezone
+
+from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import logging
+import os
+
+from .ai import predict_batch, refine_mask, upsample_mask, blend
+from .backgrounds import backgrounds
+from .cache import result_cache
+from .ingest import decode_image, get_writer
+from .metrics import span
+from .models import Joriro
+from .outputs import encode, extension, variants, write_file
+from .registry import registry
+from .runtime import available_cpus
+
+
+logger = logging.getLogger(__name__)
+
+# 저장 경로
+RESULT_PATH = "media/joriro/result/"
+
+
+def result_file(name, variant="result"):
+    # 저장 경로에 폴더가 없으면 생성
+    if not os.path.exists(RESULT_PATH):
+        os.makedirs(RESULT_PATH, exist_ok=True)
+
+    return RESULT_PATH + str(name) + "_" + variant + extension()
+
+
+def composite_version(place, variant):
+    # 관리자가 배경을 바꾸거나 결과물, 마스크 후처리 설정이 바뀌면 이전 합성 결과를 캐시에서 쓰지 않도록 버전에 포함
+    # (형식은 확장자로 구분)
+    key = [
+        backgrounds.version(place),
+        variants()[variant],
+        settings.JORIRO_OUTPUT_QUALITY,
+        settings.JORIRO_OUTPUT_PROGRESSIVE,
+        settings.JORIRO_MASK_REFINE,
+        settings.JORIRO_EDGE_AWARE_UPSAMPLE,
+    ]
+    return hashlib.sha256(repr(key).encode()).hexdigest()[:12]
+
+
+def save_outputs(encoded, name, model_choice, place, image_hash=None):
+    # 인코딩한 결과물을 저장한 뒤 캐시에도 보관
+    for variant, data in encoded.items():
+        write_file(result_file(name, variant), data)
+        if image_hash:
+            result_cache.put_composite(image_hash, model_choice, place, data, variant,
+                                       composite_version(place, variant))
+
+
+def mark_started(names):
+    # 대기 중인 행은 워커가 작업을 실제로 꺼냈을 때 처리 중으로 표시 (행 번호가 아닌 이름은 건너뜀)
+    ids = [name for name in names if isinstance(name, int)]
+    if ids:
+        now = timezone.now()
+        Joriro.objects.filter(id__in=ids, status="queued").update(status="running", started_at=now, updated_at=now)
+
+
+def composite(data, name, model_choice, place, image_hash=None):
+    result = composite_batch([(data, name, model_choice, place, image_hash)])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def predict_masks(images, model_choice, image_hashes, timings):
+    # 같은 모델로 여러 이미지의 마스크를 한 번의 추론으로 예측 (이미지는 디코딩된 RGB numpy array)
+    max_side = settings.JORIRO_INFERENCE_MAX_SIDE.get(model_choice)
+
+    # 같은 이미지로 예측한 마스크가 캐시에 있으면 재사용
+    masks = []
+    for image_hash, job_timings in zip(image_hashes, timings):
+        with span(job_timings, "mask_cache"):
+            masks.append(result_cache.get_mask(image_hash, model_choice))
+    missing = [i for i, mask in enumerate(masks) if mask is None]
+
+    # 캐시에 없는 이미지만 모델로 마스크 예측
+    if missing:
+        model, weights = registry.get(model_choice)
+        imgs = [Image.fromarray(images[i]) for i in missing]
+        batch_timings = {}
+        predicted = predict_batch(model, weights, imgs, max_side, batch_timings)
+
+        # 배치 단위로 잰 시간은 이미지 수로 나눠서 기록
+        for i, mask in zip(missing, predicted):
+            masks[i] = mask
+            for stage, seconds in batch_timings.items():
+                timings[i][stage] = seconds / len(missing)
+            with span(timings[i], "mask_cache"):
+                result_cache.put_mask(image_hashes[i], model_choice, mask)
+
+    # 설정하면 경계 띠를 원본 해상도에서 다시 계산, 아니면 줄여서 예측한 마스크를 경계를 따라 원본 크기로 키움
+    if settings.JORIRO_MASK_REFINE:
+        for i, (img, job_timings) in enumerate(zip(images, timings)):
+            with span(job_timings, "refine"):
+                masks[i] = refine_mask(masks[i], img)
+    elif settings.JORIRO_EDGE_AWARE_UPSAMPLE:
+        for i, (img, job_timings) in enumerate(zip(images, timings)):
+            with span(job_timings, "upsample"):
+                masks[i] = upsample_mask(masks[i], img)
+
+    return masks
+
+
+def render(img, mask, name, model_choice, place, image_hash, timings):
+    # 마스크로 여행지 배경에 합성해서 결과물을 저장하고 {결과물 종류: 경로} 반환
+    # 이미지 크기에 맞춘 배경을 캐시에서 가져옴
+    with span(timings, "background"):
+        background = backgrounds.get(place, img.shape[0], img.shape[1])
+
+    # 이미지, 마스크, 배경 합성
+    with span(timings, "blend"):
+        result = blend(img, mask, background)
+
+    # 같은 합성 버퍼로 원본 크기와 미리보기 결과물을 인코딩
+    with span(timings, "encode"):
+        encoded = {variant: encode(result, max_side) for variant, max_side in variants().items()}
+
+    # 파일 쓰기는 설정하면 I/O 스레드에서 처리하고 다음 작업의 합성과 겹치게 함 (끝났는지는 wait_written에서 확인)
+    written = None
+    with span(timings, "write"):
+        if settings.JORIRO_BACKGROUND_WRITE:
+            written = get_writer().submit(save_outputs, encoded, name, model_choice, place, image_hash, block=True)
+        else:
+            save_outputs(encoded, name, model_choice, place, image_hash)
+
+    return {variant: "/" + result_file(name, variant) for variant in encoded}, written
+
+
+def wait_written(outputs, timings, written):
+    # 파일이 실제로 저장된 뒤에만 결과물 경로 반환 (저장에 실패하면 그 작업은 예외를 반환)
+    if written is not None:
+        with span(timings, "write_wait"):
+            try:
+                written.result()
+            except Exception as e:
+                logger.exception("조리로 결과물을 저장하지 못했습니다: %s", outputs["result"])
+                return e
+    return outputs, timings
+
+
+def decode(data, timings):
+    # 업로드한 그대로의 이미지를 워커에서 한 번만 디코딩 (요청 프로세스에서 디코딩한 배열을 넘기면 복사, 직렬화 비용이 듦)
+    with span(timings, "decode"):
+        return decode_image(data, settings.JORIRO_MAX_IMAGE_SIDE)
+
+
+def composite_batch(jobs):
+    # 같은 모델을 쓰는 작업들을 한 번의 추론으로 처리 (작업은 (업로드한 이미지, 이름, 모델, 여행지, 해시))
+    # 작업마다 ({결과물 종류: 경로}, 단계별 처리 시간)을 반환 (결과물을 저장하지 못한 작업은 예외)
+    mark_started([job[1] for job in jobs])
+    model_choice = jobs[0][2]
+    timings = [{} for _ in jobs]
+    images = [decode(job[0], job_timings) for job, job_timings in zip(jobs, timings)]
+    masks = predict_masks(images, model_choice, [job[4] for job in jobs], timings)
+
+    rendered = []
+    for img, (_, name, _, place, image_hash), mask, job_timings in zip(images, jobs, masks, timings):
+        outputs, written = render(img, mask, name, model_choice, place, image_hash, job_timings)
+        rendered.append((outputs, job_timings, written))
+
+    # 파일 쓰기가 끝난 뒤 결과물 경로와 처리 시간 반환
+    return [wait_written(*item) for item in rendered]
+
+
+def composite_places(data, names, model_choice, places, image_hash=None):
+    # 사진 한 장을 여러 여행지에 합성 (마스크는 한 번만 예측하고 여행지별 합성은 병렬로 처리)
+    # 여행지마다 ({결과물 종류: 경로}, 단계별 처리 시간)을 반환
+    shared_timings = {}
+    image = decode(data, shared_timings)
+    mask = predict_masks([image], model_choice, [image_hash], [shared_timings])[0]
+
+    # 배경 정보는 DB 조회가 필요하므로 스레드를 나누기 전에 미리 읽어 둠
+    for place in places:
+        backgrounds.variants(place)
+
+    # 합성, 인코딩은 numpy, OpenCV가 GIL을 놓으므로 스레드로 나눠서 실행
+    timings = [dict(shared_timings) for _ in places]
+    threads = max(min(len(places), len(available_cpus())), 1)
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="joriro-render") as executor:
+        rendered = list(executor.map(
+            lambda args: render(image, mask, args[0], model_choice, args[1], image_hash, args[2]),
+            zip(names, places, timings)))
+
+    # 한 여행지라도 저장하지 못하면 요청 전체를 실패로 처리
+    results = [wait_written(outputs, place_timings, written)
+               for (outputs, written), place_timings in zip(rendered, timings)]
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    return results
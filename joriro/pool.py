@@ -0,0 +1,184 @@
+from django.conf import settings
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import logging
+import multiprocessing
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+class PoolBusy(Exception):
+    pass
+
+
+class PoolUnavailable(Exception):
+    # 작업 도중 워커 프로세스가 종료됨 (메모리 부족 등), 다음 제출 때 워커 풀을 다시 만듦
+    def __init__(self, message="추론 워커가 종료되었습니다. 잠시 후 다시 시도해주세요."):
+        super().__init__(message)
+
+
+def init_worker(counter, workers, ready):
+    # 워커 번호를 받아 CPU를 나눈 뒤 Django 설정 (JoriroConfig.ready에서 모델 미리 로드, 워밍업)
+    import django
+
+    from .runtime import assign_worker
+
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    assign_worker(index, workers)
+
+    django.setup()
+
+    # 워밍업까지 끝난 워커 수
+    with ready.get_lock():
+        ready.value += 1
+
+
+class BoundedExecutor:
+    def __init__(self, executor, slots, timeout=None):
+        # executor가 없으면 호출한 스레드에서 바로 실행
+        self.executor = executor
+        self.timeout = timeout
+
+        # 실행 중 + 대기 중인 작업 수 제한
+        self.slots = threading.BoundedSemaphore(slots)
+
+    def submit(self, fn, *args, block=False):
+        # 대기열이 가득 차면 거절 (block이면 자리가 날 때까지 대기)
+        if not self.slots.acquire(blocking=block):
+            raise PoolBusy()
+
+        if self.executor is None:
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            try:
+                future = self.executor.submit(fn, *args)
+            except Exception:
+                self.slots.release()
+                raise
+
+        # 작업이 실제로 끝나야 자리를 반납 (시간 초과된 작업도 끝날 때까지 자리를 차지)
+        future.add_done_callback(lambda f: self.slots.release())
+        return future
+
+    def run(self, fn, *args, block=False):
+        future = self.submit(fn, *args, block=block)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # 아직 시작하지 않은 작업이면 취소
+            future.cancel()
+            raise
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class SegmentationPool(BoundedExecutor):
+    def __init__(self, workers, max_queue, timeout, start_method="spawn"):
+        self.workers = workers
+        self.start_method = start_method
+        self.rebuild_lock = threading.Lock()
+
+        # 워커가 0이면 요청 스레드에서 바로 실행
+        executor, self.ready = self.create_executor() if workers > 0 else (None, None)
+
+        super().__init__(executor, max(workers, 1) + max_queue, timeout)
+        self.started = False
+
+    def create_executor(self):
+        # (워커 풀, 준비된 워커 수) 반환 (다시 만들 때마다 워커 번호와 준비된 워커 수를 0부터 셈)
+        context = multiprocessing.get_context(self.start_method)
+        ready = context.Value("i", 0)
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=init_worker,
+            initargs=(context.Value("i", 0), self.workers, ready),
+        )
+        return executor, ready
+
+    def broken(self):
+        # 워커가 하나라도 종료되면 ProcessPoolExecutor는 다시 쓸 수 없음 (BrokenProcessPool)
+        executor = self.executor
+        if executor is None:
+            return False
+        if getattr(executor, "_broken", False):
+            return True
+        processes = getattr(executor, "_processes", None) or {}
+        return any(not process.is_alive() for process in list(processes.values()))
+
+    def rebuild(self):
+        # 망가진 워커 풀을 새로 만듦 (여러 요청이 동시에 발견해도 한 번만)
+        with self.rebuild_lock:
+            if not self.broken():
+                return
+            old = self.executor
+            self.executor, self.ready = self.create_executor()
+            self.started = False
+        logger.warning("추론 워커가 종료되어 워커 풀을 다시 만들었습니다.")
+        old.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, fn, *args, block=False):
+        if self.broken():
+            self.rebuild()
+        try:
+            return super().submit(fn, *args, block=block)
+        except BrokenProcessPool:
+            # 제출하는 사이에 워커가 종료되면 한 번만 다시 만들어서 제출
+            self.rebuild()
+            try:
+                return super().submit(fn, *args, block=block)
+            except BrokenProcessPool:
+                raise PoolUnavailable()
+
+    def run(self, fn, *args, block=False):
+        try:
+            return super().run(fn, *args, block=block)
+        except BrokenProcessPool:
+            raise PoolUnavailable()
+
+    def start(self):
+        # 워커 프로세스는 작업을 제출할 때 필요한 만큼 시작되므로 워커 수만큼 빈 작업을 보내 미리 시작
+        if self.broken():
+            self.rebuild()
+        if self.executor is not None and not self.started:
+            for _ in range(self.workers):
+                self.executor.submit(int)
+            self.started = True
+
+    def ready_workers(self):
+        # 모델 로드와 워밍업이 끝난 워커 수 (워커가 0이면 이 프로세스 기준, 워커 풀이 망가졌으면 0)
+        if self.ready is None:
+            from .registry import registry
+
+            return int(registry.warmed_all())
+        if self.broken():
+            return 0
+        return self.ready.value
+
+
+pool = None
+pool_lock = threading.Lock()
+
+
+def get_pool():
+    global pool
+
+    with pool_lock:
+        if pool is None:
+            pool = SegmentationPool(
+                workers=settings.JORIRO_POOL_WORKERS,
+                max_queue=settings.JORIRO_POOL_MAX_QUEUE,
+                timeout=settings.JORIRO_JOB_TIMEOUT,
+            )
+        return pool
@@ -0,0 +1,54 @@
+from PIL import Image
+import numpy as np
+import os
+
+from .ai import shrink
+from .backends import output_only
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def load_images(path, limit=None):
+    # 폴더 안의 사람 사진을 RGB로 불러옴
+    names = sorted(name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+    if limit:
+        names = names[:limit]
+    return [Image.open(os.path.join(path, name)).convert("RGB") for name in names]
+
+
+def to_batch(img, weights, max_side=None):
+    # predict_batch와 같은 전처리로 배치 크기 1의 입력 생성
+    if max_side:
+        return weights.transforms(antialias=True, resize_size=None)(shrink(img, max_side)).unsqueeze(0)
+    return weights.transforms(antialias=True)(img).unsqueeze(0)
+
+
+def quantize_static(model, calibration, sample):
+    # FX 그래프 모드 정적 양자화 (합성곱 위주 모델이라 Linear만 바꾸는 동적 양자화는 효과가 없음)
+    import torch
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    qconfig_mapping = get_default_qconfig_mapping(torch.backends.quantized.engine)
+    prepared = prepare_fx(output_only(model), qconfig_mapping, example_inputs=(sample,))
+
+    # 보정용 사진으로 활성값 범위 측정
+    with torch.no_grad():
+        for batch in calibration:
+            prepared(batch)
+
+    quantized = convert_fx(prepared)
+    with torch.no_grad():
+        traced = torch.jit.trace(quantized, sample).eval()
+        return torch.jit.freeze(traced)
+
+
+def mask_iou(a, b, threshold=0.5):
+    a = a > threshold
+    b = b > threshold
+    union = np.logical_or(a, b).sum()
+    # 둘 다 사람이 없으면 완전히 일치
+    if union == 0:
+        return 1.0
+    return float(np.logical_and(a, b).sum() / union)
@@ -0,0 +1,140 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+import threading
+import time
+
+from .backends import BACKENDS, load_exported, load_mapped, load_quantized
+from .runtime import configure
+
+
+# 모델 선택지별 torchvision 생성 함수와 가중치 이름
+# torchvision은 실제로 모델이 필요할 때만 import 합니다.
+MODEL_SPECS = {
+    1: ("fcn_resnet50", "FCN_ResNet50_Weights"),
+    2: ("deeplabv3_mobilenet_v3_large", "DeepLabV3_MobileNet_V3_Large_Weights"),
+    3: ("lraspp_mobilenet_v3_large", "LRASPP_MobileNet_V3_Large_Weights"),
+}
+
+
+def load_weights(choice):
+    from torchvision.models import segmentation
+
+    _, weights_name = MODEL_SPECS[choice]
+    return getattr(segmentation, weights_name).DEFAULT
+
+
+def load_eager_model(choice):
+    from torchvision.models import segmentation
+
+    weights = load_weights(choice)
+    model = getattr(segmentation, MODEL_SPECS[choice][0])(weights=weights).eval()
+    return model, weights
+
+
+def load_model(choice):
+    # 모델을 로드하기 전에 추론 스레드 수 설정
+    configure()
+
+    backend = getattr(settings, "JORIRO_BACKEND", "eager")
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(f"알 수 없는 JORIRO_BACKEND 입니다: {backend}")
+
+    # 양자화하기로 한 모델은 int8 TorchScript 그래프 사용
+    if choice in getattr(settings, "JORIRO_QUANTIZED_MODELS", []):
+        return load_quantized(MODEL_SPECS[choice][0]), load_weights(choice)
+
+    if backend == "eager":
+        # 설정하면 내보낸 가중치 파일을 메모리 매핑해서 워커끼리 공유
+        if getattr(settings, "JORIRO_MMAP_WEIGHTS", False):
+            return load_mapped(MODEL_SPECS[choice][0], load_weights(choice)), load_weights(choice)
+        return load_eager_model(choice)
+
+    # 내보낸 모델을 쓰더라도 전처리와 클래스 목록은 가중치 정보에서 가져옴
+    return load_exported(MODEL_SPECS[choice][0], backend), load_weights(choice)
+
+
+def warm_up(model, weights, choice):
+    # 실제 요청과 같은 크기로 한 번 실행해서 첫 실행 초기화, 메모리 할당 비용을 미리 치름
+    from PIL import Image
+
+    from .ai import predict_batch
+
+    max_side = settings.JORIRO_INFERENCE_MAX_SIDE.get(choice) or 520
+    img = Image.new("RGB", (max_side, max_side * 3 // 4))
+    predict_batch(model, weights, [img] * max(settings.JORIRO_BATCH_MAX_SIZE, 1), max_side)
+
+
+class ModelRegistry:
+    def __init__(self, loader=load_model, warmer=warm_up):
+        self.loader = loader
+        self.warmer = warmer
+        self.entries = {}
+        self.lock = threading.RLock()
+
+    @property
+    def preload(self):
+        return getattr(settings, "JORIRO_PRELOAD_MODELS", [])
+
+    @property
+    def idle_timeout(self):
+        return getattr(settings, "JORIRO_MODEL_IDLE_TIMEOUT", 0)
+
+    def get(self, choice):
+        with self.lock:
+            now = time.monotonic()
+            self.evict_idle(now)
+
+            # 처음 요청된 모델이면 이 시점에 로드
+            if choice not in self.entries:
+                model, weights = self.loader(choice)
+                self.entries[choice] = {"model": model, "weights": weights}
+
+            entry = self.entries[choice]
+            entry["last_used"] = now
+            return entry["model"], entry["weights"]
+
+    def load_preloaded(self):
+        # 미리 로드할 모델은 설정하면 워밍업까지 실행
+        for choice in self.preload:
+            self.get(choice)
+            if getattr(settings, "JORIRO_WARMUP", False):
+                self.warm(choice)
+
+    def warm(self, choice):
+        model, weights = self.get(choice)
+        with self.lock:
+            entry = self.entries[choice]
+            if entry.get("warmed"):
+                return
+            self.warmer(model, weights, choice)
+            entry["warmed"] = True
+
+    def warmed(self):
+        return sorted(choice for choice, entry in self.entries.items() if entry.get("warmed"))
+
+    def warmed_all(self):
+        # 미리 로드할 모델이 모두 로드되고 (설정하면) 워밍업까지 끝났는지
+        done = self.warmed() if getattr(settings, "JORIRO_WARMUP", False) else self.loaded()
+        return all(choice in done for choice in self.preload)
+
+    def evict_idle(self, now=None):
+        # 0 이하이면 한 번 로드한 모델은 해제하지 않음
+        if self.idle_timeout <= 0:
+            return
+
+        if now is None:
+            now = time.monotonic()
+
+        with self.lock:
+            for choice in list(self.entries):
+                if choice in self.preload:
+                    continue
+                if now - self.entries[choice]["last_used"] > self.idle_timeout:
+                    del self.entries[choice]
+
+    def loaded(self):
+        return sorted(self.entries)
+
+
+registry = ModelRegistry()
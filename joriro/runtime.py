@@ -0,0 +1,79 @@
+from django.conf import settings
+
+import logging
+import os
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+# 이 프로세스의 추론 스레드 설정 상태
+state = {"configured": False, "share": None}
+lock = threading.Lock()
+
+
+def available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def inference_processes():
+    # 이 호스트에서 추론하는 프로세스 수 (웹 프로세스마다 워커 풀이 따로 있고, 워커가 0이면 웹 프로세스에서 추론)
+    return max(settings.JORIRO_WEB_PROCESSES, 1) * max(settings.JORIRO_POOL_WORKERS, 1)
+
+
+def assign_worker(index, count, pin=None, web_processes=None):
+    # 워커 풀의 index번째 워커에게 CPU를 나눠서 고정 (지원하지 않는 OS에서는 나누기만 함)
+    if pin is None:
+        pin = settings.JORIRO_CPU_AFFINITY
+    if web_processes is None:
+        web_processes = max(settings.JORIRO_WEB_PROCESSES, 1)
+
+    # 워커 번호는 워커 풀 안에서만 유일하므로 웹 프로세스가 여럿이면 고정하지 않음
+    # (고정하면 웹 프로세스마다 0번 워커가 같은 CPU에 몰림)
+    if pin and web_processes > 1:
+        logger.warning("JORIRO_WEB_PROCESSES가 %s이라 추론 워커를 CPU에 고정하지 않습니다.", web_processes)
+        pin = False
+
+    if pin and hasattr(os, "sched_setaffinity"):
+        cpus = available_cpus()
+        per_worker = max(len(cpus) // count, 1)
+        start = (index * per_worker) % len(cpus)
+        os.sched_setaffinity(0, cpus[start:start + per_worker])
+        state["share"] = 1
+    else:
+        state["share"] = count * web_processes
+
+
+def intra_op_threads():
+    if settings.JORIRO_INTRA_OP_THREADS > 0:
+        return settings.JORIRO_INTRA_OP_THREADS
+
+    # 0이면 이 프로세스가 쓸 수 있는 CPU를 같은 CPU를 나눠 쓰는 호스트 전체의 추론 프로세스 수로 나눔
+    share = state["share"] or inference_processes()
+    return max(len(available_cpus()) // share, 1)
+
+
+def inter_op_threads():
+    return settings.JORIRO_INTER_OP_THREADS
+
+
+def configure():
+    # 모델을 처음 로드할 때 한 번만 torch 스레드 수 설정
+    with lock:
+        if state["configured"]:
+            return
+
+        import torch
+
+        torch.set_num_threads(intra_op_threads())
+        if inter_op_threads() > 0:
+            try:
+                torch.set_interop_threads(inter_op_threads())
+            except RuntimeError:
+                # 이미 병렬 작업이 시작된 프로세스에서는 바꿀 수 없음
+                pass
+
+        state["configured"] = True
@@ -1,8 +1,58 @@
 from rest_framework import serializers
-from .models import Joriro
+from .models import Joriro, Background
 
 
 class JoriroSerializer(serializers.ModelSerializer):
     class Meta:
         model = Joriro
         fields = "__all__"
+        # 사용 중인 배경만 선택 가능
+        extra_kwargs = {"place": {"queryset": Background.objects.filter(is_active=True)}}
+        read_only_fields = ("thumbnail", "image_hash", "status", "error", "started_at", "finished_at", "timings")
+
+
+# 작업 상태 조회
+class JoriroStatusSerializer(serializers.ModelSerializer):
+    queued_seconds = serializers.SerializerMethodField()
+    running_seconds = serializers.SerializerMethodField()
+
+    # 요청부터 처리 시작까지 걸린 시간
+    def get_queued_seconds(self, obj):
+        if obj.started_at is None:
+            return None
+        return round((obj.started_at - obj.created_at).total_seconds(), 3)
+
+    # 처리 시작부터 완료까지 걸린 시간
+    def get_running_seconds(self, obj):
+        if obj.started_at is None or obj.finished_at is None:
+            return None
+        return round((obj.finished_at - obj.started_at).total_seconds(), 3)
+
+    class Meta:
+        model = Joriro
+        fields = ("id", "model", "place", "status", "result", "thumbnail", "error", "created_at",
+                  "started_at", "finished_at", "queued_seconds", "running_seconds", "timings")
+
+
+# 사진 한 장을 여러 여행지에 합성
+class JoriroBulkSerializer(serializers.Serializer):
+    image = serializers.ImageField()
+    model = serializers.ChoiceField(choices=Joriro.MODEL_CHOICE, default=2)
+    places = serializers.CharField()
+
+    # "all" 또는 쉼표로 구분한 여행지 번호 목록
+    def validate_places(self, value):
+        choices = list(Background.objects.filter(is_active=True).order_by("id").values_list("id", flat=True))
+        if value.strip() == "all":
+            return choices
+
+        try:
+            places = [int(place) for place in value.split(",")]
+        except ValueError:
+            raise serializers.ValidationError("여행지 번호를 쉼표로 구분하거나 all을 입력해주세요.")
+
+        if any(place not in choices for place in places):
+            raise serializers.ValidationError("없는 여행지입니다.")
+
+        # 중복은 한 번만 합성
+        return list(dict.fromkeys(places))
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Background
+from .backgrounds import backgrounds, generate_variants
+
+
+@receiver(post_save, sender=Background)
+def background_saved(sender, instance, **kwargs):
+    # 배경 이미지가 바뀌었으면 크기별 배경을 다시 생성 (다시 save하지 않도록 update 사용)
+    if instance.image and instance.variants.get("source") != instance.image.name:
+        instance.variants = generate_variants(instance)
+        Background.objects.filter(id=instance.id).update(variants=instance.variants)
+    # 사용 여부가 바뀐 경우도 이 프로세스에는 바로 반영 (다른 프로세스는 JORIRO_BACKGROUND_REFRESH 안에 반영)
+    backgrounds.forget(instance.id)
+
+
+@receiver(post_delete, sender=Background)
+def background_deleted(sender, instance, **kwargs):
+    backgrounds.forget(instance.id)
@@ -2,12 +2,52 @@ from rest_framework.test import APITestCase
 from rest_framework import status
 
 from django.test.client import MULTIPART_CONTENT, encode_multipart, BOUNDARY
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.core.files import File
+from django.core.files.storage import InMemoryStorage, default_storage
 from django.urls import reverse
+from django.utils import timezone
 
 from PIL import Image
+from datetime import datetime, timedelta
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from importlib.util import find_spec
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+import json
+import numpy as np
+import cv2
 import tempfile
+import threading
+import os
+import time
+import torch
+from torchvision.models.segmentation import lraspp_mobilenet_v3_large
 
 from users.models import User
+from joriro import jobs, ingest
+from joriro import pool as pool_module
+from joriro import backends
+from joriro import pipeline
+from joriro.jobs import JobQueue, mark_done
+from joriro.metrics import StageMetrics, span, stage_metrics
+from joriro.ingest import StorageWriter, decode_image
+from joriro.models import Background, Joriro
+from joriro.ai import predict_batch, shrink, upsample_mask, refine_mask, blend
+from joriro.management.commands.benchmark_blend import blend_float64
+from joriro.backgrounds import BackgroundCache, backgrounds
+from joriro.checks import check_backgrounds
+from joriro.cache import ResultCache
+from joriro.outputs import encode
+from joriro.pipeline import composite, composite_batch, composite_places, composite_version, mark_started
+from joriro.backends import OnnxModel, TorchScriptModel, export_onnx, export_state, export_torchscript, load_mapped
+from joriro.memory import read_smaps
+from joriro.quantization import mask_iou, quantize_static
+from joriro.registry import ModelRegistry, registry, load_weights
+from joriro.pool import PoolBusy, PoolUnavailable, SegmentationPool
+from joriro import runtime
+from joriro.batcher import MicroBatcher
 
 
 def get_temporary_image(temp_file):
@@ -18,14 +58,74 @@ def get_temporary_image(temp_file):
     return temp_file
 
 
-class JoriroCreateTest(APITestCase):
+def create_background(place, name="hanra.png"):
+    # 저장하면 크기별 배경도 함께 생성됨
+    with open(os.path.join("background_image", name), "rb") as f:
+        return Background.objects.create(id=place, name=name, image=File(f, name=name))
+
+
+class BackgroundMixin:
+    # 여행지 배경과 결과물을 임시 미디어 폴더에 저장
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.TemporaryDirectory()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root.name,
+                                               JORIRO_BACKGROUND_VARIANT_SIDES=[320, 640])
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        cls.media_root.cleanup()
+
+    def setUp(self):
+        super().setUp()
+        backgrounds.clear()
+
+
+class InlinePoolMixin:
+    # 워커 프로세스(가중치 다운로드, 테스트 DB가 아닌 DB 사용) 대신 요청 스레드에서 학습하지 않은 작은 모델로 추론
+    def setUp(self):
+        super().setUp()
+        self.saved_pool, self.saved_writer = pool_module.pool, ingest.writer
+        pool_module.pool = SegmentationPool(workers=0, max_queue=0, timeout=None)
+        ingest.writer = StorageWriter(threads=0, max_pending=0)
+
+        model = lraspp_mobilenet_v3_large(weights=None, weights_backbone=None, num_classes=21).eval()
+        self.saved_registry = registry.loader, registry.warmer, registry.entries
+        registry.loader = lambda choice: (model, load_weights(choice))
+        registry.warmer = lambda model, weights, choice: None
+        registry.entries = {}
+
+        # 배치로 묶으면 배치 스레드에서 DB를 조회하므로 요청 스레드에서 바로 실행
+        self.pool_settings = override_settings(JORIRO_BATCH_MAX_SIZE=1, JORIRO_RESULT_CACHE_MAX_BYTES=0)
+        self.pool_settings.enable()
+
+    def tearDown(self):
+        self.pool_settings.disable()
+        pool_module.pool, ingest.writer = self.saved_pool, self.saved_writer
+        registry.loader, registry.warmer, registry.entries = self.saved_registry
+
+        # 결과물은 미디어 폴더가 아닌 고정 경로에 저장됨
+        for joriro in Joriro.objects.all():
+            for path in (joriro.result, joriro.thumbnail):
+                if path and os.path.exists(path.lstrip("/")):
+                    os.remove(path.lstrip("/"))
+        super().tearDown()
+
+
+class JoriroCreateTest(InlinePoolMixin, BackgroundMixin, APITestCase):
     @classmethod
     def setUpTestData(cls):
+        create_background(3)
         cls.user_data = {"email": "aaa@aaa.com",
                          "nickname": "aaa", "password": "password"}
         cls.user = User.objects.create_user("aaa@aaa.com", "aaa", "password")
 
     def setUp(self):
+        super().setUp()
         self.access_token = self.client.post(
             reverse('token_obtain_pair'), self.user_data).data['access']
 
@@ -50,6 +150,12 @@ class JoriroCreateTest(APITestCase):
             HTTP_AUTHORIZATION=f"Bearer {self.access_token}",
         )
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # 원본 경로는 합성하는 동안 저장한 뒤 응답
+        self.assertIsNotNone(response.data["image"])
+        joriro = Joriro.objects.get()
+        self.assertEqual(joriro.status, "done")
+        self.assertIsNotNone(joriro.started_at)
+        self.assertTrue(os.path.exists(joriro.result.lstrip("/")))
 
     # 모델 없이 테스트
     def test_pass_joriro_create_without_model(self):
@@ -127,3 +233,831 @@ class JoriroCreateTest(APITestCase):
             content_type=MULTIPART_CONTENT,
         )
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+def segment_in_worker(data, model_choice):
+    # 워커 프로세스에서 업로드를 디코딩하고 마스크만 예측 (워커의 DB는 테스트 DB가 아니므로 조회하지 않음)
+    timings = [{}]
+    image = pipeline.decode(data, timings[0])
+    return image.shape[:2], pipeline.predict_masks([image], model_choice, [None], timings)[0].shape
+
+
+@skipUnless(os.environ.get("JORIRO_TEST_REAL_POOL") == "1",
+            "실제 워커 풀은 JORIRO_TEST_REAL_POOL=1일 때만 테스트 (모델 가중치 다운로드 필요)")
+class RealPoolTest(TestCase):
+    # spawn 워커 프로세스에서 실제 모델로 추론
+    def test_pass_real_pool(self):
+        pool = SegmentationPool(workers=1, max_queue=0, timeout=600)
+        try:
+            data = cv2.imencode(".png", np.zeros((120, 160, 3), dtype=np.uint8))[1].tobytes()
+            image_shape, mask_shape = pool.run(segment_in_worker, data, 3)
+        finally:
+            pool.shutdown()
+        self.assertEqual(image_shape, (120, 160))
+        self.assertEqual(mask_shape, (120, 160))
+        self.assertEqual(pool.ready_workers(), 1)
+
+
+class ModelRegistryTest(TestCase):
+    def setUp(self):
+        self.loaded = []
+
+        def loader(choice):
+            self.loaded.append(choice)
+            return f"model{choice}", f"weights{choice}"
+
+        self.warmed = []
+        self.registry = ModelRegistry(loader=loader, warmer=lambda model, weights, choice: self.warmed.append(choice))
+
+    # 요청이 오기 전에는 모델을 로드하지 않음
+    def test_pass_lazy_load(self):
+        self.assertEqual(self.registry.loaded(), [])
+        self.assertEqual(self.registry.get(3), ("model3", "weights3"))
+        self.registry.get(3)
+        self.assertEqual(self.loaded, [3])
+
+    # 설정된 모델만 미리 로드
+    @override_settings(JORIRO_PRELOAD_MODELS=[2])
+    def test_pass_preload(self):
+        self.registry.load_preloaded()
+        self.assertEqual(self.registry.loaded(), [2])
+
+    # 미리 로드한 모델은 한 번만 워밍업
+    @override_settings(JORIRO_PRELOAD_MODELS=[2, 3], JORIRO_WARMUP=True)
+    def test_pass_warmup(self):
+        self.assertFalse(self.registry.warmed_all())
+        self.registry.load_preloaded()
+        self.registry.load_preloaded()
+        self.assertEqual(self.warmed, [2, 3])
+        self.assertTrue(self.registry.warmed_all())
+
+    # 유휴 시간이 지난 모델은 해제, 미리 로드한 모델은 유지
+    @override_settings(JORIRO_PRELOAD_MODELS=[2], JORIRO_MODEL_IDLE_TIMEOUT=10)
+    def test_pass_evict_idle(self):
+        self.registry.get(2)
+        self.registry.get(3)
+        self.registry.evict_idle(now=time.monotonic() + 60)
+        self.assertEqual(self.registry.loaded(), [2])
+
+
+class RuntimeTest(TestCase):
+    def setUp(self):
+        self.share = runtime.state["share"]
+
+    def tearDown(self):
+        runtime.state["share"] = self.share
+
+    # 지정한 스레드 수를 그대로 사용
+    @override_settings(JORIRO_INTRA_OP_THREADS=3)
+    def test_pass_fixed_threads(self):
+        self.assertEqual(runtime.intra_op_threads(), 3)
+
+    # 자동이면 CPU를 워커 수로 나눠서 과다 구독하지 않음
+    @override_settings(JORIRO_INTRA_OP_THREADS=0, JORIRO_CPU_AFFINITY=False)
+    def test_pass_auto_threads(self):
+        cpus = len(runtime.available_cpus())
+        runtime.assign_worker(0, 2)
+        self.assertEqual(runtime.intra_op_threads(), max(cpus // 2, 1))
+        runtime.assign_worker(0, cpus * 2)
+        self.assertEqual(runtime.intra_op_threads(), 1)
+
+    # 웹 프로세스마다 워커 풀이 있으면 호스트 전체의 추론 프로세스 수로 나눔
+    @override_settings(JORIRO_INTRA_OP_THREADS=0, JORIRO_CPU_AFFINITY=False, JORIRO_WEB_PROCESSES=3,
+                       JORIRO_POOL_WORKERS=2)
+    def test_pass_threads_across_web_processes(self):
+        self.assertEqual(runtime.inference_processes(), 6)
+        runtime.assign_worker(1, 2)
+        self.assertEqual(runtime.state["share"], 6)
+
+    # 웹 프로세스가 여럿이면 워커 번호가 겹치므로 CPU에 고정하지 않음
+    @override_settings(JORIRO_CPU_AFFINITY=True, JORIRO_WEB_PROCESSES=2)
+    def test_pass_no_affinity_across_web_processes(self):
+        cpus = runtime.available_cpus()
+        with self.assertLogs("joriro.runtime", "WARNING"):
+            runtime.assign_worker(0, 2)
+        self.assertEqual(runtime.available_cpus(), cpus)
+        self.assertEqual(runtime.state["share"], 4)
+
+
+class SegmentationPoolTest(TestCase):
+    # 워커가 0이면 요청 스레드에서 바로 실행
+    def test_pass_inline_run(self):
+        pool = SegmentationPool(workers=0, max_queue=0, timeout=1)
+        self.assertEqual(pool.run(abs, -3), 3)
+        self.assertEqual(pool.run(abs, -4), 4)
+
+    # 자리가 없으면 기다리지 않고 거절
+    def test_fail_pool_busy(self):
+        pool = SegmentationPool(workers=0, max_queue=0, timeout=1)
+        with self.assertRaises(PoolBusy):
+            pool.run(pool.run, abs, -3)
+
+
+class MicroBatcherTest(TestCase):
+    def setUp(self):
+        self.batcher = MicroBatcher(max_size=4, max_wait=60, max_pending=4)
+
+    # 시간 초과로 포기한 작업은 배치에서 빠짐
+    def test_pass_cancel_pending(self):
+        future = self.batcher.submit(b"", "name", 3, 3)
+        self.batcher.cancel(future)
+        self.assertTrue(future.cancelled())
+        self.assertEqual(self.batcher.pending, {})
+
+    # 제출한 배치의 작업을 모두 포기하면 시작 전인 배치를 취소해서 워커 풀 자리를 쓰지 않음
+    def test_pass_cancel_dispatched(self):
+        pool = SegmentationPool(workers=0, max_queue=1, timeout=5)
+        pool.executor = ThreadPoolExecutor(max_workers=1)
+        release = threading.Event()
+        pool.executor.submit(release.wait)
+
+        saved_pool, pool_module.pool = pool_module.pool, pool
+        try:
+            future = Future()
+            self.batcher.dispatch([((b"", "name", 3, 3, None), future, time.monotonic())])
+            pool_future = self.batcher.running[future][0]
+            self.batcher.cancel(future)
+        finally:
+            release.set()
+            pool_module.pool = saved_pool
+            pool.executor.shutdown()
+
+        self.assertTrue(pool_future.cancelled())
+        self.assertIsInstance(future.exception(timeout=1), CancelledError)
+        self.assertEqual(self.batcher.running, {})
+
+
+class WorkerRestartTest(TestCase):
+    # 워커가 종료되면 그 작업은 실패하고, 준비 안 됨으로 보고한 뒤 다음 제출 때 워커 풀을 다시 만듦
+    def test_pass_rebuild_broken_pool(self):
+        pool = SegmentationPool(workers=1, max_queue=0, timeout=120)
+        try:
+            self.assertEqual(pool.run(abs, -3), 3)
+            self.assertEqual(pool.ready_workers(), 1)
+            broken = pool.executor
+
+            with self.assertRaises(PoolUnavailable):
+                pool.run(os._exit, 1)
+            self.assertTrue(pool.broken())
+            self.assertEqual(pool.ready_workers(), 0)
+
+            # 로드 밸런서에는 준비 안 됨으로 응답하고 워커 풀을 다시 만듦
+            saved_pool, pool_module.pool = pool_module.pool, pool
+            try:
+                response = self.client.get(reverse("joriro_ready_view"))
+            finally:
+                pool_module.pool = saved_pool
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertIsNot(pool.executor, broken)
+
+            self.assertEqual(pool.run(abs, -4), 4)
+            self.assertIsNot(pool.executor, broken)
+            self.assertFalse(pool.broken())
+            self.assertEqual(pool.ready_workers(), 1)
+        finally:
+            pool.shutdown()
+
+
+class JoriroReadyTest(InlinePoolMixin, APITestCase):
+
+    # 미리 로드할 모델의 워밍업이 끝나야 준비 완료
+    @override_settings(JORIRO_PRELOAD_MODELS=[3], JORIRO_WARMUP=True)
+    def test_pass_joriro_ready(self):
+        response = self.client.get(reverse("joriro_ready_view"))
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(response.data["ready"])
+
+        registry.load_preloaded()
+        response = self.client.get(reverse("joriro_ready_view"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["warmed"], [3])
+
+
+class JoriroJobTest(InlinePoolMixin, BackgroundMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_background(3)
+        cls.user_data = {"email": "aaa@aaa.com", "password": "password"}
+        cls.user = User.objects.create_user("aaa@aaa.com", "aaa", "password")
+        cls.other_data = {"email": "bbb@bbb.com", "password": "password"}
+        cls.other = User.objects.create_user("bbb@bbb.com", "bbb", "password")
+
+    def setUp(self):
+        super().setUp()
+        self.access_token = self.client.post(
+            reverse('token_obtain_pair'), self.user_data).data['access']
+        self.other_token = self.client.post(
+            reverse('token_obtain_pair'), self.other_data).data['access']
+
+        # 백그라운드 스레드 대신 요청 스레드에서 작업 실행
+        self.saved_queue = jobs.queue
+        jobs.queue = JobQueue(threads=0, max_pending=0)
+
+    def tearDown(self):
+        jobs.queue = self.saved_queue
+        for joriro in Joriro.objects.all():
+            joriro.image.delete()
+        super().tearDown()
+
+    # 비동기 작업 등록
+    def test_pass_joriro_create_async(self):
+        temp_file = tempfile.NamedTemporaryFile()
+        temp_file.name = "image.png"
+        image_file = get_temporary_image(temp_file)
+        image_file.seek(0)
+
+        data = {"image": image_file, "model": 3, "place": 3}
+
+        response = self.client.post(
+            path=reverse("joriro_view") + "?async=1",
+            data=encode_multipart(data=data, boundary=BOUNDARY),
+            content_type=MULTIPART_CONTENT,
+            HTTP_AUTHORIZATION=f"Bearer {self.access_token}",
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        joriro = Joriro.objects.get()
+        self.assertEqual(response["Location"], joriro.get_absolute_url())
+        # 원본 이미지는 요청 버퍼에서 따로 저장
+        self.assertTrue(joriro.image.name.startswith("joriro/"))
+        self.assertEqual(joriro.status, "done")
+
+    # 작업 상태 조회
+    def test_pass_joriro_status(self):
+        joriro = Joriro.objects.create(user=self.user, image="joriro/image.png", place_id=3, status="done",
+                                       started_at=datetime(2023, 7, 1, 12, 0, 0),
+                                       finished_at=datetime(2023, 7, 1, 12, 0, 3))
+
+        response = self.client.get(
+            path=joriro.get_absolute_url(),
+            HTTP_AUTHORIZATION=f"Bearer {self.access_token}",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "done")
+        self.assertEqual(response.data["running_seconds"], 3)
+
+    # 완료할 때 단계별 처리 시간을 히스토그램과 행에 기록
+    @override_settings(JORIRO_STORE_TIMINGS=True)
+    def test_pass_joriro_timings(self):
+        stage_metrics.clear()
+        joriro = Joriro.objects.create(user=self.user, image="joriro/image.png", model=3, place_id=3)
+        mark_done(joriro, {"result": "/result.jpg"}, {"forward": 0.12345, "blend": 0.002})
+
+        joriro.refresh_from_db()
+        self.assertEqual(joriro.timings, {"forward": 0.1235, "blend": 0.002})
+        self.assertEqual({(row["stage"], row["model"], row["place"]) for row in stage_metrics.snapshot()},
+                         {("forward", 3, 3), ("blend", 3, 3)})
+
+    # 재시작으로 사라져 오래 끝나지 않은 작업은 조회할 때 실패로 표시
+    def test_pass_fail_stale_jobs(self):
+        stale = Joriro.objects.create(user=self.user, image="joriro/image.png", model=3, place_id=3, status="running")
+        fresh = Joriro.objects.create(user=self.user, image="joriro/image.png", model=3, place_id=3)
+        Joriro.objects.filter(id=stale.id).update(updated_at=timezone.now() - timedelta(hours=1))
+        jobs.sweep_state["at"] = None
+
+        response = self.client.get(stale.get_absolute_url(), HTTP_AUTHORIZATION=f"Bearer {self.access_token}")
+        self.assertEqual(response.data["status"], "failed")
+        self.assertEqual(response.data["error"], jobs.STALE_ERROR)
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, "queued")
+
+        # 주기적으로 실행하는 명령어
+        Joriro.objects.filter(id=fresh.id).update(updated_at=timezone.now() - timedelta(hours=1))
+        out = StringIO()
+        call_command("fail_stale_joriro_jobs", stdout=out)
+        self.assertIn("1개", out.getvalue())
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, "failed")
+
+    # 대기 중인 행만 워커가 작업을 꺼낼 때 처리 중으로 표시
+    def test_pass_joriro_mark_started(self):
+        queued = Joriro.objects.create(user=self.user, image="joriro/image.png", model=3, place_id=3)
+        done = Joriro.objects.create(user=self.user, image="joriro/image.png", model=3, place_id=3, status="done")
+        mark_started([queued.id, done.id, "benchmark"])
+
+        queued.refresh_from_db()
+        done.refresh_from_db()
+        self.assertEqual(queued.status, "running")
+        self.assertIsNotNone(queued.started_at)
+        self.assertEqual(done.status, "done")
+        self.assertIsNone(done.started_at)
+
+    # 없는 여행지가 있으면 합성하지 않음
+    def test_fail_joriro_bulk_invalid_place(self):
+        temp_file = tempfile.NamedTemporaryFile()
+        temp_file.name = "image.png"
+        image_file = get_temporary_image(temp_file)
+        image_file.seek(0)
+
+        response = self.client.post(
+            path=reverse("joriro_bulk_view"),
+            data=encode_multipart(data={"image": image_file, "model": 3, "places": "1,9"}, boundary=BOUNDARY),
+            content_type=MULTIPART_CONTENT,
+            HTTP_AUTHORIZATION=f"Bearer {self.access_token}",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Joriro.objects.exists())
+
+    # 처리 시간 지표는 관리자만 조회 가능
+    def test_fail_joriro_metrics_not_admin(self):
+        response = self.client.get(
+            path=reverse("joriro_metrics_view"),
+            HTTP_AUTHORIZATION=f"Bearer {self.access_token}",
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    # 기본은 응답한 프로세스의 값, scope=service 이면 저장한 처리 시간으로 모든 프로세스를 합쳐서 집계
+    @override_settings(JORIRO_STORE_TIMINGS=True)
+    def test_pass_joriro_metrics_scope(self):
+        admin = User.objects.create_superuser("admin@aaa.com", "admin", "password")
+        self.client.force_authenticate(admin)
+        stage_metrics.clear()
+        for seconds in (0.2, 0.4):
+            joriro = Joriro.objects.create(user=self.user, image="joriro/image.png", model=3, place_id=3)
+            mark_done(joriro, {"result": "/result.jpg"}, {"forward": seconds})
+        Joriro.objects.create(user=self.user, image="joriro/image.png", model=3, place_id=3, status="done",
+                              finished_at=timezone.now() - timedelta(hours=2), timings={"forward": 9})
+
+        response = self.client.get(reverse("joriro_metrics_view"))
+        self.assertEqual((response.data["scope"], response.data["pid"]), ("process", os.getpid()))
+
+        response = self.client.get(reverse("joriro_metrics_view"), {"scope": "service", "minutes": 60})
+        self.assertEqual(response.data["scope"], "service")
+        self.assertEqual([(row["stage"], row["count"], row["sum"]) for row in response.data["stages"]],
+                         [("forward", 2, 0.6)])
+
+    # 다른 사람의 작업 상태 조회
+    def test_fail_joriro_status_other_user(self):
+        joriro = Joriro.objects.create(user=self.user, image="joriro/image.png", place_id=3)
+
+        response = self.client.get(
+            path=joriro.get_absolute_url(),
+            HTTP_AUTHORIZATION=f"Bearer {self.other_token}",
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class StageMetricsTest(TestCase):
+    # 블록 실행 시간을 단계별로 누적
+    def test_pass_span(self):
+        timings = {}
+        with span(timings, "blend"):
+            pass
+        with span(timings, "blend"):
+            pass
+        self.assertEqual(list(timings), ["blend"])
+        with span(None, "blend"):
+            pass
+
+    # 구간별 누적 개수와 분위수 추정
+    def test_pass_histogram(self):
+        metrics = StageMetrics(buckets=(0.1, 1))
+        for seconds in (0.05, 0.05, 0.5, 5):
+            metrics.observe("forward", 1, 2, seconds)
+
+        row = metrics.snapshot()[0]
+        self.assertEqual(row["count"], 4)
+        self.assertEqual(row["buckets"], {"0.1": 2, "1": 3, "+Inf": 4})
+        self.assertEqual(row["p50"], 0.1)
+        self.assertIsNone(row["p95"])
+
+
+class PredictBatchTest(TestCase):
+    # 크기가 다른 이미지를 패딩해 한 번에 추론하고 각자의 크기로 마스크를 돌려줌
+    def test_pass_predict_batch(self):
+        class Weights:
+            meta = {"categories": ["__background__", "person"]}
+
+            def transforms(self, antialias):
+                return lambda img: torch.ones((3, img.height, img.width))
+
+        calls = []
+
+        def model(batch):
+            calls.append(tuple(batch.shape))
+            return {"out": batch[:, :2]}
+
+        imgs = [Image.new("RGB", (30, 20)), Image.new("RGB", (20, 40))]
+        masks = predict_batch(model, Weights(), imgs)
+
+        self.assertEqual(calls, [(2, 3, 40, 30)])
+        self.assertEqual([mask.shape for mask in masks], [(20, 30), (40, 20)])
+
+
+class BackgroundCacheTest(BackgroundMixin, TestCase):
+    # 파일을 지우는 테스트가 있어서 테스트마다 새로 생성
+    def setUp(self):
+        super().setUp()
+        self.background = create_background(3)
+
+    # 저장할 때 긴 변 기준 크기별 배경 생성 (원본보다 큰 크기는 만들지 않음)
+    def test_pass_generate_variants(self):
+        items = self.background.variants["items"]
+        self.assertEqual([(item["width"], item["height"]) for item in items],
+                         [(320, 213), (640, 426), (1800, 1197)])
+        for item in items:
+            self.assertEqual(np.load(default_storage.path(item["path"])).shape, (item["height"], item["width"], 3))
+
+    # 배경 이미지를 바꾸면 다시 생성하고 이전 파일은 삭제
+    def test_pass_regenerate_variants(self):
+        before = [item["path"] for item in self.background.variants["items"]]
+        version = composite_version(3, "result")
+        with open("background_image/seokguram.jpeg", "rb") as f:
+            self.background.image = File(f, name="seokguram.jpeg")
+            self.background.save()
+
+        self.background.refresh_from_db()
+        self.assertEqual(self.background.variants["source"], self.background.image.name)
+        self.assertFalse(any(default_storage.exists(path) for path in before))
+        # 이전 배경이나 다른 설정으로 합성해서 캐시한 결과는 쓰지 않음
+        self.assertNotEqual(composite_version(3, "result"), version)
+        version = composite_version(3, "result")
+        self.assertNotEqual(version, composite_version(3, "thumbnail"))
+        with override_settings(JORIRO_OUTPUT_QUALITY=50):
+            self.assertNotEqual(composite_version(3, "result"), version)
+
+    # 필요한 높이 이상인 가장 작은 배경 선택 (없으면 가장 큰 배경)
+    def test_pass_background_pick(self):
+        cache = BackgroundCache()
+        self.assertEqual(cache.pick(3, 100)["height"], 213)
+        self.assertEqual(cache.pick(3, 300)["height"], 426)
+        self.assertEqual(cache.pick(3, 2000)["height"], 1197)
+
+    # 같은 여행지, 같은 크기의 배경은 한 번만 만들어 재사용
+    def test_pass_background_reuse(self):
+        cache = BackgroundCache()
+        plate = cache.get(3, 120, 80)
+        self.assertEqual(plate.shape, (120, 80, 3))
+        self.assertIs(cache.get(3, 120, 80), plate)
+        self.assertFalse(plate.flags.writeable)
+
+    # 로컬 경로가 없는 저장소(S3 등)는 파일을 열어서 읽음
+    def test_pass_background_remote_storage(self):
+        storage = InMemoryStorage(location=tempfile.mkdtemp())
+        for item in self.background.variants["items"]:
+            with default_storage.open(item["path"], "rb") as f:
+                storage.save(item["path"], f)
+
+        cache = BackgroundCache()
+        with mock.patch("joriro.backgrounds.default_storage", storage):
+            plate = cache.get(3, 120, 80)
+        self.assertEqual(plate.shape, (120, 80, 3))
+        source = next(iter(cache.sources.values()))
+        self.assertNotIsInstance(source, np.memmap)
+        self.assertFalse(source.flags.writeable)
+
+    # 최대 개수를 넘으면 가장 오래 안 쓴 배경부터 제거
+    @override_settings(JORIRO_BACKGROUND_CACHE_SIZE=1)
+    def test_pass_background_evict(self):
+        cache = BackgroundCache()
+        cache.get(3, 120, 80)
+        cache.get(3, 60, 40)
+        self.assertEqual([key[1:] for key in cache.plates], [(60, 40)])
+
+    # 사용하지 않는 여행지는 합성하지 않음
+    def test_fail_background_inactive(self):
+        Background.objects.filter(id=3).update(is_active=False)
+        with self.assertRaises(ValueError):
+            BackgroundCache().get(3, 120, 80)
+
+    # 크기별 배경 파일이 없으면 DB 검사(migrate, check --database) 때 경고
+    def test_fail_background_check_missing(self):
+        default_storage.delete(self.background.variants["items"][0]["path"])
+        self.assertEqual([error.id for error in check_backgrounds(None, databases=["default"])], ["joriro.W002"])
+
+        # DB 검사가 아니면 조회하지 않음
+        with self.assertNumQueries(0):
+            self.assertEqual(check_backgrounds(None), [])
+            call_command("check", stdout=StringIO())
+
+
+class BlendTest(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.img = rng.integers(0, 256, (60, 80, 3), dtype=np.uint8)
+        self.background = rng.integers(0, 256, (60, 80, 3), dtype=np.uint8)
+        self.mask = rng.random((30, 40), dtype=np.float32)
+
+    # 고정소수점 합성 결과가 이전 float64 합성과 반올림 오차 이내로 같음
+    def test_pass_blend_matches_float64(self):
+        expected = blend_float64(self.img, self.mask.copy(), self.background)
+        result = blend(self.img, self.mask.copy(), self.background)
+        self.assertEqual(result.dtype, np.uint8)
+        self.assertLessEqual(np.abs(result.astype(int) - expected).max(), 1)
+
+    # 미리 만든 버퍼에 BGR 순서로 결과 저장
+    def test_pass_blend_into_buffer(self):
+        out = np.empty_like(self.img)
+        mask = np.ones((30, 40), dtype=np.float32)
+        result = blend(self.img, mask, self.background, out=out)
+        self.assertIs(result, out)
+        self.assertTrue(np.array_equal(out, self.img[..., ::-1]))
+
+
+class InferenceResolutionTest(TestCase):
+    # 긴 변 기준으로 줄인 이미지로 추론
+    def test_pass_shrink(self):
+        self.assertEqual(shrink(Image.new("RGB", (4000, 3000)), 640).size, (640, 480))
+        # 작은 이미지는 확대하지 않음
+        small = Image.new("RGB", (300, 600))
+        self.assertIs(shrink(small, 640), small)
+        self.assertIs(shrink(small, 600), small)
+
+    # 작은 마스크를 원본 크기로 업샘플링하고 0~1 범위를 유지
+    def test_pass_upsample_mask(self):
+        img = np.zeros((300, 400, 3), dtype=np.uint8)
+        img[:, 200:] = 255
+        mask = np.zeros((30, 40), dtype=np.float32)
+        mask[:, 20:] = 1
+
+        result = upsample_mask(mask, img)
+        self.assertEqual(result.shape, (300, 400))
+        self.assertGreaterEqual(result.min(), 0)
+        self.assertLessEqual(result.max(), 1)
+        self.assertGreater(result[:, 250:].mean(), 0.9)
+        self.assertLess(result[:, :150].mean(), 0.1)
+
+    # 흐릿한 마스크의 경계를 이미지 색 경계에 맞춤 (경계 띠 밖은 확실한 전경/배경)
+    def test_pass_refine_mask(self):
+        img = np.zeros((300, 400, 3), dtype=np.uint8)
+        img[:, 210:] = (200, 80, 30)
+        truth = np.zeros((300, 400), dtype=np.float32)
+        truth[:, 210:] = 1
+        mask = np.zeros((30, 40), dtype=np.float32)
+        mask[:, 20:] = 1
+        mask = cv2.GaussianBlur(mask, (0, 0), 2)
+
+        result = refine_mask(mask, img)
+        self.assertEqual(result.shape, (300, 400))
+        self.assertEqual(set(np.unique(result[:, :150])), {0})
+        self.assertEqual(set(np.unique(result[:, 270:])), {1})
+        self.assertLess(np.abs(result - truth).mean(), np.abs(cv2.resize(mask, (400, 300)) - truth).mean())
+
+
+class ResultCacheTest(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(path=self.temp_dir.name, max_bytes=10 * 1024 * 1024)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    # 같은 이미지, 같은 모델의 마스크 재사용
+    def test_pass_mask_cache(self):
+        mask = np.full((20, 30), 0.25, dtype=np.float32)
+        self.assertIsNone(self.cache.get_mask("hash", 3))
+        self.cache.put_mask("hash", 3, mask)
+        self.assertTrue(np.array_equal(self.cache.get_mask("hash", 3), mask))
+        self.assertIsNone(self.cache.get_mask("hash", 2))
+
+    # 여행지, 결과물 종류까지 같은 합성 결과를 복사
+    def test_pass_composite_cache(self):
+        dest = os.path.join(self.temp_dir.name, "dest.jpg")
+
+        self.cache.put_composite("hash", 3, 1, b"composite")
+        self.assertFalse(self.cache.get_composite("hash", 3, 2, dest))
+        self.assertFalse(self.cache.get_composite("hash", 3, 1, dest, "thumbnail"))
+        self.assertTrue(self.cache.get_composite("hash", 3, 1, dest))
+        # 배경이나 결과물 설정의 버전이 다르면 쓰지 않음
+        self.assertFalse(self.cache.get_composite("hash", 3, 1, dest, "result", "v2"))
+        with open(dest, "rb") as f:
+            self.assertEqual(f.read(), b"composite")
+
+    # 최대 크기를 넘으면 가장 오래 안 쓴 파일부터 삭제
+    def test_pass_cache_evict(self):
+        self.cache.max_bytes = 5000
+        mask = np.zeros((40, 40), dtype=np.float32)
+        self.cache.put_mask("old", 3, mask)
+        os.utime(self.cache.mask_path("old", 3), (0, 0))
+        self.cache.put_mask("new", 3, mask)
+        self.assertIsNone(self.cache.get_mask("old", 3))
+        self.assertIsNotNone(self.cache.get_mask("new", 3))
+
+
+class OutputTest(TestCase):
+    def setUp(self):
+        self.result = np.random.default_rng(0).integers(0, 256, (300, 400, 3), dtype=np.uint8)
+
+    # 같은 합성 버퍼로 원본 크기와 미리보기 인코딩
+    @override_settings(JORIRO_OUTPUT_FORMAT="jpeg", JORIRO_OUTPUT_QUALITY=80, JORIRO_OUTPUT_PROGRESSIVE=True)
+    def test_pass_encode_jpeg(self):
+        full = Image.open(BytesIO(encode(self.result)))
+        thumbnail = Image.open(BytesIO(encode(self.result, 100)))
+        self.assertEqual((full.format, full.size), ("JPEG", (400, 300)))
+        self.assertEqual(thumbnail.size, (100, 75))
+        self.assertTrue(full.info.get("progressive"))
+
+    @override_settings(JORIRO_OUTPUT_FORMAT="webp", JORIRO_OUTPUT_QUALITY=80)
+    def test_pass_encode_webp(self):
+        self.assertEqual(Image.open(BytesIO(encode(self.result))).format, "WEBP")
+
+
+class ExportParityTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # 가중치 다운로드 없이 같은 구조의 모델로 비교
+        cls.model = lraspp_mobilenet_v3_large(weights=None, weights_backbone=None, num_classes=21).eval()
+        cls.sample = torch.randn(1, 3, 160, 200)
+        cls.batch = torch.randn(2, 3, 120, 240)
+        with torch.no_grad():
+            cls.expected = cls.model(cls.batch)["out"]
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    # TorchScript 그래프 결과가 eager 모델과 같음
+    def test_pass_torchscript_parity(self):
+        path = os.path.join(self.temp_dir.name, "model.pt")
+        export_torchscript(self.model, path, self.sample)
+        out = TorchScriptModel(path)(self.batch)["out"]
+        self.assertTrue(torch.allclose(out, self.expected, atol=1e-4))
+
+    # ONNX Runtime 결과가 eager 모델과 같음
+    @skipUnless(find_spec("onnxruntime") and find_spec("onnx"), "onnxruntime이 설치되어 있지 않습니다.")
+    def test_pass_onnx_parity(self):
+        path = os.path.join(self.temp_dir.name, "model.onnx")
+        export_onnx(self.model, path, self.sample)
+        out = OnnxModel(path)(self.batch)["out"]
+        self.assertTrue(torch.allclose(out, self.expected, atol=1e-4))
+
+    # 메모리 매핑한 가중치로 같은 결과를 내고, 추론해도 가중치 페이지에 쓰지 않음
+    def test_pass_mapped_weights(self):
+        with override_settings(JORIRO_EXPORT_PATH=self.temp_dir.name):
+            path = os.path.join(self.temp_dir.name, "lraspp_mobilenet_v3_large_state.pt")
+            export_state(self.model, path)
+            model = load_mapped("lraspp_mobilenet_v3_large", load_weights(3))
+
+        with torch.no_grad():
+            out = model(self.batch)["out"]
+        self.assertTrue(torch.allclose(out, self.expected, atol=1e-5))
+
+        if os.path.exists(f"/proc/{os.getpid()}/smaps"):
+            usage = read_smaps(os.getpid(), [path])[os.path.realpath(path)]
+            self.assertGreater(usage["Rss"], 0)
+            self.assertEqual(usage["Private_Dirty"], 0)
+
+    # 메모리 매핑을 지원하지 않는 torch(2.0)에서는 경고 후 일반 로드
+    def test_pass_mapped_weights_fallback(self):
+        saved = backends.supports_mapped_load
+        backends.supports_mapped_load = lambda: False
+        try:
+            with override_settings(JORIRO_EXPORT_PATH=self.temp_dir.name):
+                export_state(self.model, os.path.join(self.temp_dir.name, "lraspp_mobilenet_v3_large_state.pt"))
+                with self.assertLogs("joriro.backends", "WARNING"):
+                    model = load_mapped("lraspp_mobilenet_v3_large", load_weights(3))
+        finally:
+            backends.supports_mapped_load = saved
+
+        with torch.no_grad():
+            out = model(self.batch)["out"]
+        self.assertTrue(torch.allclose(out, self.expected, atol=1e-5))
+
+
+class QuantizationTest(TestCase):
+    # 보정 후 int8 그래프로 저장하고 다시 불러와 같은 형태의 결과를 냄
+    def test_pass_quantize_static(self):
+        model = lraspp_mobilenet_v3_large(weights=None, weights_backbone=None, num_classes=21).eval()
+        sample = torch.randn(1, 3, 96, 128)
+        quantized = quantize_static(model, [torch.randn(1, 3, 96, 128) for _ in range(2)], sample)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "model_int8.pt")
+            quantized.save(path)
+            out = TorchScriptModel(path)(torch.randn(2, 3, 64, 96))["out"]
+        self.assertEqual(tuple(out.shape), (2, 21, 64, 96))
+
+    # 사람 마스크 IoU
+    def test_pass_mask_iou(self):
+        a = np.zeros((10, 10), dtype=np.float32)
+        b = np.zeros((10, 10), dtype=np.float32)
+        self.assertEqual(mask_iou(a, b), 1.0)
+        a[:, :4] = 1
+        b[:, 2:6] = 1
+        self.assertAlmostEqual(mask_iou(a, b), 1 / 3)
+
+
+class DecodeImageTest(TestCase):
+    def encode(self, size, format):
+        buffer = BytesIO()
+        Image.new("RGB", size, (255, 0, 0)).save(buffer, format)
+        return buffer.getvalue()
+
+    # 요청 버퍼에서 바로 연속된 RGB 배열로 디코딩
+    def test_pass_decode_image(self):
+        image = decode_image(self.encode((120, 80), "png"))
+        self.assertEqual(image.shape, (80, 120, 3))
+        self.assertTrue(image.flags.c_contiguous)
+
+    # 최대 크기보다 큰 JPEG는 축소 디코딩 후 최대 크기로 맞춤
+    def test_pass_decode_image_max_side(self):
+        image = decode_image(self.encode((1600, 1200), "jpeg"), max_side=400)
+        self.assertEqual(image.shape, (300, 400, 3))
+
+
+class BenchmarkTest(BackgroundMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_background(3)
+
+    def setUp(self):
+        super().setUp()
+        # 학습되지 않은 모델로 대신 측정
+        model = lraspp_mobilenet_v3_large(weights=None, weights_backbone=None, num_classes=21).eval()
+        self.saved = registry.loader, registry.entries
+        registry.loader = lambda choice: (model, load_weights(choice))
+        registry.entries = {}
+
+    def tearDown(self):
+        registry.loader, registry.entries = self.saved
+
+    # 모델, 해상도별 결과를 JSON으로 저장
+    def test_pass_benchmark_output(self):
+        with tempfile.TemporaryDirectory() as path:
+            output = os.path.join(path, "result.json")
+            call_command("benchmark_joriro", count=1, sizes=[128], models=[3], output=output, stdout=StringIO())
+            with open(output) as f:
+                report = json.load(f)
+
+        row = report["results"][0]
+        self.assertEqual((row["model"], row["size"], row["images"]), (3, 128, 1))
+        self.assertIn("forward", row["stages_ms"])
+        self.assertGreater(row["peak_rss_mb"], 0)
+        self.assertGreaterEqual(row["rss_delta_mb"], 0)
+        self.assertEqual((row["rss_scope"], row["iou_reference"]), ("config", "source_resolution"))
+
+
+class CompositePlacesTest(BackgroundMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_background(1, "seokguram.jpeg")
+        create_background(3)
+
+    def setUp(self):
+        super().setUp()
+        model = lraspp_mobilenet_v3_large(weights=None, weights_backbone=None, num_classes=21).eval()
+        self.calls = []
+
+        def loader(choice):
+            self.calls.append(choice)
+            return model, load_weights(choice)
+
+        self.saved = registry.loader, registry.entries
+        registry.loader = loader
+        registry.entries = {}
+
+    def tearDown(self):
+        registry.loader, registry.entries = self.saved
+
+    # 마스크는 한 번만 예측하고 여행지마다 결과물 생성
+    @override_settings(JORIRO_RESULT_CACHE_MAX_BYTES=0, JORIRO_BACKGROUND_WRITE=False)
+    def test_pass_composite_places(self):
+        image = np.random.default_rng(0).integers(0, 256, (60, 80, 3), dtype=np.uint8)
+        data = cv2.imencode(".png", image)[1].tobytes()
+        results = composite_places(data, ["bulk_a", "bulk_b"], 3, [1, 3])
+
+        self.assertEqual(self.calls, [3])
+        self.assertEqual(len(results), 2)
+        for outputs, timings in results:
+            self.assertTrue(os.path.exists(outputs["result"].lstrip("/")))
+            self.assertIn("decode", timings)
+            self.assertIn("forward", timings)
+            self.assertIn("blend", timings)
+            for path in outputs.values():
+                os.remove(path.lstrip("/"))
+
+    # I/O 스레드에서 결과물 저장에 실패하면 경로를 반환하지 않고 그 작업만 실패
+    @override_settings(JORIRO_RESULT_CACHE_MAX_BYTES=0, JORIRO_BACKGROUND_WRITE=True)
+    def test_fail_composite_write(self):
+        saved_writer, saved_save = ingest.writer, pipeline.save_outputs
+        ingest.writer = StorageWriter(threads=1, max_pending=2)
+
+        def save_outputs(encoded, name, *args):
+            if name == "write_fail":
+                raise OSError("No space left on device")
+            saved_save(encoded, name, *args)
+
+        pipeline.save_outputs = save_outputs
+        try:
+            image = np.random.default_rng(0).integers(0, 256, (60, 80, 3), dtype=np.uint8)
+            data = cv2.imencode(".png", image)[1].tobytes()
+            results = composite_batch([(data, "write_ok", 3, 3, None), (data, "write_fail", 3, 3, None)])
+            with self.assertRaises(OSError):
+                composite(data, "write_fail", 3, 3)
+            with self.assertRaises(OSError):
+                composite_places(data, ["write_ok_1", "write_fail"], 3, [1, 3])
+        finally:
+            ingest.writer.shutdown()
+            ingest.writer, pipeline.save_outputs = saved_writer, saved_save
+
+        outputs, timings = results[0]
+        self.assertTrue(os.path.exists(outputs["result"].lstrip("/")))
+        self.assertIn("write_wait", timings)
+        self.assertIsInstance(results[1], OSError)
+        for name in ["write_ok", "write_ok_1"]:
+            for variant in ["result", "thumbnail"]:
+                path = pipeline.result_file(name, variant)
+                if os.path.exists(path):
+                    os.remove(path)
@@ -3,4 +3,8 @@ from joriro import views
 
 urlpatterns = [
     path("", views.JoriroView.as_view(), name="joriro_view"),
+    path("bulk/", views.JoriroBulkView.as_view(), name="joriro_bulk_view"),
+    path("ready/", views.JoriroReadyView.as_view(), name="joriro_ready_view"),
+    path("metrics/", views.JoriroMetricsView.as_view(), name="joriro_metrics_view"),
+    path("<int:joriro_id>/", views.JoriroDetailView.as_view(), name="joriro_detail_view"),
 ]
@@ -1,15 +1,33 @@
+from django.conf import settings
+from django.utils import timezone
+
 from rest_framework.views import APIView
 from rest_framework import status, permissions
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 
-from .serializers import JoriroSerializer
-from .ai import predict, fit_background, blend
-from .apps import JoriroConfig
-
-from PIL import Image
-import numpy as np
-import cv2
+from datetime import timedelta
 import os
+import time
+
+from .models import Joriro
+from .serializers import JoriroSerializer, JoriroStatusSerializer, JoriroBulkSerializer
+from .batcher import run_composite, run_composite_places
+from .cache import hash_image
+from .ingest import get_writer
+from .metrics import span, stage_metrics, stored_snapshot
+from .pool import PoolBusy, PoolUnavailable, get_pool
+from .registry import registry
+from .jobs import get_queue, mark_done, mark_failed, sweep_stale_jobs
+
+
+def read_upload(upload, timings):
+    # 업로드를 한 번만 읽어서 해시 계산, 원본 저장, 워커에 넘기는 데 같이 사용 (디코딩은 워커에서)
+    with span(timings, "upload"):
+        data = upload.read()
+    with span(timings, "hash"):
+        image_hash = hash_image(data)
+    return data, image_hash
 
 
 class JoriroView(APIView):
@@ -19,47 +37,195 @@ class JoriroView(APIView):
         # 시리얼라이저 초기화 및 request.data 저장
         serializer = JoriroSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        instance = serializer.save(user=request.user)
-
-        # 이미지, 배경, 모델 로드
-        img = Image.open(instance.image)
-        # 3 채널로 변환
-        img = img.convert("RGB")
-        background = np.array(Image.open(
-            JoriroConfig.backgrounds[instance.place]))
-        model = JoriroConfig.models[instance.model]
-        weights = JoriroConfig.weights[instance.model]
-
-        # 모델과 이미지로 마스크 예측
-        mask = predict(model, weights, img)
-
-        # 이미지 numpy array로 변환
-        img = np.array(img)
-
-        # 배경 크기 이미지와 맞춤
-        background = fit_background(img, background)
-
-        # 이미지, 마스크, 배경 합성
-        result = blend(img, mask, background)
 
-        # 저장 경로 초기화
-        save_path = "media/joriro/result/"
+        # 업로드 읽기, 해시 계산
+        timings = {}
+        upload = serializer.validated_data.pop("image")
+        data, image_hash = read_upload(upload, timings)
+
+        # 원본 이미지는 백그라운드에서 저장하고 행만 먼저 생성
+        instance = serializer.save(user=request.user, image_hash=image_hash)
+
+        # ?async=1 이면 작업만 등록하고 바로 응답
+        if request.query_params.get("async") == "1":
+            try:
+                get_queue().enqueue(instance.id, data, timings)
+            except PoolBusy:
+                instance.delete()
+                return Response({"message": "요청이 많습니다. 잠시 후 다시 시도해주세요."}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
+            get_writer().save_original([instance.id], upload.name, data)
+            instance.refresh_from_db()
+            return Response(JoriroStatusSerializer(instance).data, status=status.HTTP_202_ACCEPTED,
+                            headers={"Location": instance.get_absolute_url()})
+
+        # 원본은 합성하는 동안 백그라운드에서 저장 (응답에 경로를 넣기 전에 끝났는지 확인)
+        saved = get_writer().save_original([instance.id], upload.name, data)
+
+        # 추론은 워커 풀에서 인코딩된 업로드를 디코딩해서 실행하고 결과물 경로를 받아옴
+        start = time.perf_counter()
+        try:
+            outputs, composite_timings = run_composite(
+                data, instance.id, instance.model, instance.place_id, instance.image_hash)
+        except PoolBusy:
+            saved.result()
+            instance.refresh_from_db(fields=["image"])
+            instance.image.delete(save=False)
+            instance.delete()
+            return Response({"message": "요청이 많습니다. 잠시 후 다시 시도해주세요."}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        except PoolUnavailable as e:
+            mark_failed(instance, str(e))
+            return Response({"message": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except TimeoutError:
+            mark_failed(instance, "처리 시간이 초과되었습니다.")
+            return Response({"message": "처리 시간이 초과되었습니다."}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+        except Exception as e:
+            mark_failed(instance, str(e) or e.__class__.__name__)
+            raise
+
+        # 워커 풀 대기 시간을 포함한 전체 합성 시간
+        timings.update(composite_timings)
+        timings["composite"] = time.perf_counter() - start
+
+        # 저장한 원본 경로와 워커가 기록한 처리 시작 시각을 응답에 포함
+        saved.result()
+        instance.refresh_from_db(fields=["image", "started_at"])
+
+        # 모델에 결과물, 미리보기 경로와 처리 시간 저장
+        mark_done(instance, outputs, timings)
 
-        # 저장 경로에 폴더가 없으면 생성
-        if not os.path.exists(save_path):
-            os.makedirs(save_path)
+        # 새 시리얼라이저 초기화
+        new_serializer = JoriroSerializer(instance)
 
-        # 업로드한 파일에서 이름을 가져옴
-        file_name = str(instance.image).split("/")[-1].split(".")[0]
+        return Response(new_serializer.data, status=status.HTTP_201_CREATED)
 
-        # 결과물 저장
-        cv2.imwrite(save_path + file_name + "_result.jpg", result)
 
-        # 모델에 결과물 경로 저장
-        instance.result = "/" + save_path + file_name + "_result.jpg"
-        instance.save()
+class JoriroBulkView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
 
-        # 새 시리얼라이저 초기화
-        new_serializer = JoriroSerializer(instance)
+    # 사진 한 장으로 여러 여행지 합성 (마스크는 한 번만 예측)
+    def post(self, request):
+        serializer = JoriroBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        model_choice = serializer.validated_data["model"]
+        places = serializer.validated_data["places"]
+
+        # 업로드 읽기, 해시 계산
+        timings = {}
+        upload = serializer.validated_data["image"]
+        data, image_hash = read_upload(upload, timings)
+
+        # 여행지마다 행 생성 (원본 이미지는 한 번만 저장해서 같이 사용)
+        started_at = timezone.now()
+        instances = [Joriro.objects.create(user=request.user, model=model_choice, place_id=place,
+                                           image_hash=image_hash, status="running", started_at=started_at)
+                     for place in places]
+        ids = [instance.id for instance in instances]
+
+        # 원본은 합성하는 동안 백그라운드에서 저장
+        saved = get_writer().save_original(ids, upload.name, data)
+
+        start = time.perf_counter()
+        try:
+            results = run_composite_places(data, ids, model_choice, places, image_hash)
+        except PoolBusy:
+            saved.result()
+            instances[0].refresh_from_db(fields=["image"])
+            instances[0].image.delete(save=False)
+            Joriro.objects.filter(id__in=ids).delete()
+            return Response({"message": "요청이 많습니다. 잠시 후 다시 시도해주세요."}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        except PoolUnavailable as e:
+            for instance in instances:
+                mark_failed(instance, str(e))
+            return Response({"message": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except TimeoutError:
+            for instance in instances:
+                mark_failed(instance, "처리 시간이 초과되었습니다.")
+            return Response({"message": "처리 시간이 초과되었습니다."}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+        except Exception as e:
+            for instance in instances:
+                mark_failed(instance, str(e) or e.__class__.__name__)
+            raise
+        timings["composite"] = time.perf_counter() - start
+
+        # 저장한 원본 경로를 응답에 포함
+        saved.result()
+
+        # 여행지별 결과물 경로와 처리 시간 저장
+        for instance, (outputs, place_timings) in zip(instances, results):
+            instance.refresh_from_db(fields=["image"])
+            mark_done(instance, outputs, {**timings, **place_timings})
+
+        return Response(JoriroSerializer(instances, many=True).data, status=status.HTTP_201_CREATED)
+
+
+class JoriroDetailView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
 
-        return Response(new_serializer.data, status=status.HTTP_201_CREATED)
+    # 작업 상태 조회 (재시작으로 사라진 작업은 실패로 표시한 뒤 조회)
+    def get(self, request, joriro_id):
+        sweep_stale_jobs()
+        joriro = get_object_or_404(Joriro, id=joriro_id)
+
+        # 본인 작업만 조회 가능
+        if joriro.user != request.user:
+            return Response({"message": "권한이 없습니다."}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = JoriroStatusSerializer(joriro)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class JoriroMetricsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    # 단계, 모델, 여행지별 처리 시간 히스토그램 조회
+    # 기본은 응답한 웹 프로세스의 메모리에 모은 값 (웹 프로세스마다 다르므로 pid와 웹 프로세스 수를 같이 반환)
+    # ?scope=service 이면 행에 저장한 처리 시간으로 최근 minutes분 동안 모든 프로세스의 요청을 집계
+    def get(self, request):
+        if request.query_params.get("scope") != "service":
+            return Response({
+                "scope": "process",
+                "pid": os.getpid(),
+                "web_processes": settings.JORIRO_WEB_PROCESSES,
+                "stages": stage_metrics.snapshot(),
+            }, status=status.HTTP_200_OK)
+
+        if not settings.JORIRO_STORE_TIMINGS:
+            return Response({"message": "JORIRO_STORE_TIMINGS를 켜야 전체 처리 시간을 집계할 수 있습니다."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            minutes = int(request.query_params.get("minutes", 60))
+        except ValueError:
+            return Response({"message": "minutes는 숫자여야 합니다."}, status=status.HTTP_400_BAD_REQUEST)
+
+        since = timezone.now() - timedelta(minutes=minutes)
+        return Response({"scope": "service", "minutes": minutes, "stages": stored_snapshot(since)},
+                        status=status.HTTP_200_OK)
+
+
+class JoriroReadyView(APIView):
+    # 로드 밸런서가 토큰 없이 호출
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    # 추론 워커가 모두 모델 로드와 워밍업을 마쳤는지 조회 (아직이면 503)
+    def get(self, request):
+        pool = get_pool()
+        pool.start()
+
+        workers = max(pool.workers, 1)
+        ready_workers = pool.ready_workers()
+        data = {
+            "ready": ready_workers >= workers,
+            "workers": workers,
+            "ready_workers": ready_workers,
+            "preload": registry.preload,
+            "warmup": settings.JORIRO_WARMUP,
+        }
+
+        # 요청 스레드에서 추론하면 이 프로세스의 모델 상태도 함께 반환
+        if pool.executor is None:
+            data["loaded"] = registry.loaded()
+            data["warmed"] = registry.warmed()
+
+        return Response(data, status=status.HTTP_200_OK if data["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE)
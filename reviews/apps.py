@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ReviewsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "reviews"
+
+    def ready(self):
+        # 리뷰가 바뀔 때 스팟 평점 갱신
+        from reviews import signals  # noqa: F401
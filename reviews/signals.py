@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from reviews.models import Review
+from spots.ratings import add_rate
+
+
+@receiver(pre_save, sender=Review)
+def review_saving(sender, instance, **kwargs):
+    # 수정이면 저장 전 스팟과 평점을 기억해서 차이만 반영
+    instance._previous_rate = None
+    if instance.pk:
+        instance._previous_rate = Review.objects.filter(pk=instance.pk).values_list("spot_id", "rate").first()
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, "_previous_rate", None)
+    if previous is None:
+        add_rate(instance.spot_id, 1, instance.rate)
+    elif previous != (instance.spot_id, instance.rate):
+        spot_id, rate = previous
+        if spot_id == instance.spot_id:
+            add_rate(spot_id, 0, instance.rate - rate)
+        else:
+            add_rate(spot_id, -1, -rate)
+            add_rate(instance.spot_id, 1, instance.rate)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    add_rate(instance.spot_id, -1, -instance.rate)
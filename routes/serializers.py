@@ -81,7 +81,7 @@ class RouteCreateSerializer(serializers.ModelSerializer):
         # instance의 모든 필드를 기본형식으로 변환 -> 결과를 data라는 딕셔너리로 저장
         data = super().to_representation(instance)
         # Route에 연결된 모든 RouteSpot 객체를 찾음
-        route_spots = RouteSpot.objects.filter(route=instance)
+        route_spots = RouteSpot.objects.filter(route=instance).select_related("spot")
         
         # data에 areas의 값을 바꿔줍니다.
         # RouteAreaSerializer의 instance는 RouteArea인데 areas로 엮인 모든 객체를 직렬화
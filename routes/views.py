@@ -3,7 +3,9 @@ from rest_framework.generics import get_object_or_404, ListAPIView
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
-from routes.models import Route, Comment, RouteRate
+from django.db.models import Prefetch
+
+from routes.models import Route, Comment, RouteRate, RouteSpot
 from routes.serializers import (
     RouteSerializer,
     RouteCreateSerializer,
@@ -65,7 +67,9 @@ class RouteDetailView(APIView):
 
     # 여행루트 상세보기
     def get(self, request, route_id):
-        route = get_object_or_404(Route, id=route_id)
+        # 목적지의 스팟은 한 번에 조회
+        route = get_object_or_404(Route.objects.prefetch_related(
+            Prefetch("route_spots", queryset=RouteSpot.objects.select_related("spot"))), id=route_id)
         serializer = RouteDetailSerializer(route)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
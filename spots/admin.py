@@ -3,4 +3,9 @@ from spots.models import Area, Sigungu, Spot
 
 admin.site.register(Area)
 admin.site.register(Sigungu)
-admin.site.register(Spot)
+
+
+@admin.register(Spot)
+class SpotAdmin(admin.ModelAdmin):
+    # 평점은 리뷰에서 계산 (틀리면 python manage.py repair_spot_ratings)
+    readonly_fields = ("rate_count", "rate_sum", "rate_avg")
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SpotsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "spots"
+
+    def ready(self):
+        # 스팟을 저장할 때 주변 검색용 격자 칸 계산
+        from spots import signals  # noqa: F401
@@ -0,0 +1,88 @@
+from django.db.models import Q
+
+import heapq
+import math
+
+
+# 위경도 격자 한 칸의 크기 (도, 위도 방향 약 5.5km), 바꾸면 rebuild_spot_cells 필요
+CELL_DEGREES = 0.05
+# 경도 방향 칸 수 (360 / CELL_DEGREES 보다 커야 함)
+CELL_COLUMNS = 1 << 13
+EARTH_RADIUS = 6371.0088
+
+
+def cell_index(lat, lng):
+    # 같은 위도 줄의 칸이 연속된 번호를 갖도록 (위도 줄, 경도 칸) 순서로 번호 부여
+    # (저장 전에는 Decimal, 문자열일 수 있음)
+    lat, lng = float(lat), float(lng)
+    row = math.floor((lat + 90) / CELL_DEGREES)
+    column = math.floor((lng + 180) / CELL_DEGREES)
+    return row * CELL_COLUMNS + column
+
+
+def bounding_box(lat, lng, radius):
+    # 반경(km)을 감싸는 (최소 위도, 최대 위도, 최소 경도, 최대 경도)
+    dlat = math.degrees(radius / EARTH_RADIUS)
+    # 극 근처에서는 경도 전체
+    cos = math.cos(math.radians(min(abs(lat) + dlat, 90)))
+    dlng = 180 if cos < 1e-9 else min(math.degrees(radius / (EARTH_RADIUS * cos)), 180)
+    return max(lat - dlat, -90), min(lat + dlat, 90), max(lng - dlng, -180), min(lng + dlng, 180)
+
+
+def cell_filter(min_lat, max_lat, min_lng, max_lng):
+    # 위도 줄마다 연속된 칸 번호 범위로 조회 (격자 칸 인덱스만 사용)
+    first, last = cell_index(min_lat, min_lng), cell_index(max_lat, max_lng)
+    first_row, last_row = first // CELL_COLUMNS, last // CELL_COLUMNS
+    first_column, last_column = first % CELL_COLUMNS, last % CELL_COLUMNS
+
+    query = Q()
+    for row in range(first_row, last_row + 1):
+        query |= Q(cell__range=(row * CELL_COLUMNS + first_column, row * CELL_COLUMNS + last_column))
+    return query
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    # 두 지점 사이의 거리 (km)
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(math.sqrt(a), 1))
+
+
+def rank(spots, lat, lng, radius):
+    # 격자 칸과 위경도 범위로 후보를 줄인 뒤 실제 거리로 거름 (스팟 전체 대신 번호와 좌표만 조회)
+    # [(거리, 번호)] 반환
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius)
+    candidates = spots.filter(cell_filter(min_lat, max_lat, min_lng, max_lng),
+                              mapy__range=(min_lat, max_lat), mapx__range=(min_lng, max_lng))
+
+    ranked = []
+    for id, mapy, mapx in candidates.values_list("id", "mapy", "mapx"):
+        distance = haversine(lat, lng, mapy, mapx)
+        if distance <= radius:
+            ranked.append((distance, id))
+    return ranked
+
+
+def fetch(spots, ranked, k=None):
+    # 가까운 k개만 골라서 그 행만 조회하고 가까운 순서로 정렬
+    ranked = heapq.nsmallest(k, ranked) if k is not None else sorted(ranked)
+    found = spots.in_bulk([id for _, id in ranked])
+    for distance, id in ranked:
+        found[id].distance = distance
+    return [found[id] for _, id in ranked]
+
+
+def within(spots, lat, lng, radius, k=None):
+    # 반경 안의 스팟을 가까운 순서로 (k가 있으면 k개까지)
+    return fetch(spots, rank(spots, lat, lng, radius), k)
+
+
+def nearest(spots, lat, lng, k, max_radius, radius=1.0):
+    # 반경 안의 스팟이 k개 이상이면 그중 가까운 k개가 전체에서도 가장 가까운 k개
+    # 부족하면 반경을 두 배씩 늘려 다시 조회
+    while True:
+        radius = min(radius, max_radius)
+        ranked = rank(spots, lat, lng, radius)
+        if len(ranked) >= k or radius >= max_radius:
+            return fetch(spots, ranked, k)
+        radius *= 2
@@ -0,0 +1,194 @@
+from django.db import transaction
+
+import csv
+import json
+import os
+
+from spots.geo import cell_index
+from spots.models import Area, Spot
+from spots.search import index_spots
+
+
+# 관광 API 필드 이름 -> Spot 필드 이름 (Spot 필드 이름 그대로 써도 됨)
+FIELD_ALIASES = {
+    "contenttypeid": "type",
+    "areacode": "area",
+    "sigungucode": "sigungu",
+}
+# 이미 있는 스팟이면 덮어쓸 필드 (리뷰 평점은 그대로)
+UPDATE_FIELDS = ["type", "title", "area", "sigungu", "addr1", "addr2", "mapx", "mapy", "cell", "firstimage", "tel"]
+FORMATS = {".json": "json", ".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv"}
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"지원하지 않는 형식입니다: {extension} (json, jsonl, csv)")
+    return FORMATS[extension]
+
+
+def iter_json_array(f, chunk_size=1 << 16):
+    # 파일 전체를 읽지 않고 최상위 배열의 항목을 하나씩 디코딩
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    skip(" \t\r\n")
+    if buffer[pos:pos + 1] != "[":
+        raise ValueError("JSON 파일은 스팟 목록(배열)이어야 합니다.")
+    pos += 1
+
+    while True:
+        skip(" \t\r\n,")
+        if pos >= len(buffer):
+            raise ValueError("JSON 배열이 끝나지 않았습니다.")
+        if buffer[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # 항목이 잘렸으면 더 읽고 다시 시도
+            if eof:
+                raise
+            fill()
+            continue
+        pos = end
+        yield item
+
+
+def iter_rows(f, format):
+    if format == "json":
+        yield from iter_json_array(f)
+    elif format == "jsonl":
+        for line in f:
+            if line.strip():
+                # 깨진 줄은 그 행만 잘못된 행으로 처리
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield ValueError(f"JSON 형식이 아닙니다: {e}")
+    else:
+        yield from csv.DictReader(f)
+
+
+def optional_int(value):
+    if value in (None, ""):
+        return None
+    return int(value)
+
+
+def optional_text(value, max_length=None, name=None):
+    if value in (None, ""):
+        return None
+    value = str(value).strip()
+    if max_length and len(value) > max_length:
+        raise ValueError(f"{name}은(는) {max_length}자 이하여야 합니다.")
+    return value or None
+
+
+def clean_row(row, area_ids):
+    # 행 하나를 검사해서 Spot으로 변환 (잘못된 행은 ValueError)
+    if isinstance(row, ValueError):
+        raise row
+    if not isinstance(row, dict):
+        raise ValueError("행이 객체가 아닙니다.")
+
+    # loaddata 형식 ({"model", "pk", "fields"})도 지원 (pk는 Spot 번호라 contentid로 쓰지 않음)
+    if isinstance(row.get("fields"), dict):
+        row = row["fields"]
+    row = {FIELD_ALIASES.get(key, key): value for key, value in row.items()}
+
+    contentid = optional_text(row.get("contentid"), 20, "contentid")
+    if not contentid:
+        raise ValueError("contentid가 없습니다.")
+    title = optional_text(row.get("title"), 200, "title")
+    if not title:
+        raise ValueError("title이 없습니다.")
+
+    try:
+        type = int(row.get("type"))
+        mapx, mapy = float(row.get("mapx")), float(row.get("mapy"))
+        area, sigungu = optional_int(row.get("area")), optional_int(row.get("sigungu"))
+    except (TypeError, ValueError):
+        raise ValueError("type, mapx, mapy, area, sigungu는 숫자여야 합니다.")
+    if not (-180 <= mapx <= 180 and -90 <= mapy <= 90):
+        raise ValueError("mapx(경도), mapy(위도)가 범위를 벗어났습니다.")
+    if area is not None and area not in area_ids:
+        raise ValueError(f"없는 시도입니다: {area}")
+
+    return Spot(
+        contentid=contentid,
+        type=type,
+        title=title,
+        area_id=area,
+        sigungu=sigungu,
+        addr1=optional_text(row.get("addr1"), 200, "addr1"),
+        addr2=optional_text(row.get("addr2"), 200, "addr2"),
+        mapx=mapx,
+        mapy=mapy,
+        cell=cell_index(mapy, mapx),
+        firstimage=optional_text(row.get("firstimage")),
+        tel=optional_text(row.get("tel"), 200, "tel"),
+    )
+
+
+def upsert(spots):
+    # 콘텐츠 ID가 같은 스팟은 덮어쓰고 없으면 생성, 바뀐 스팟은 검색 색인도 갱신
+    # 같은 배치에 같은 콘텐츠 ID가 여러 번 있으면 마지막 행 사용
+    spots = list({spot.contentid: spot for spot in spots}.values())
+    with transaction.atomic():
+        existing = set(Spot.objects.filter(contentid__in=[spot.contentid for spot in spots])
+                       .values_list("contentid", flat=True))
+        Spot.objects.bulk_create(spots, update_conflicts=True, unique_fields=["contentid"],
+                                 update_fields=UPDATE_FIELDS)
+        index_spots(list(Spot.objects.filter(contentid__in=[spot.contentid for spot in spots])
+                         .only("id", "title", "addr1", "addr2")))
+    created = len(spots) - len(existing)
+    return created, len(existing)
+
+
+class Checkpoint:
+    # 마지막으로 저장한 행 번호를 파일에 기록해서 중단된 곳부터 다시 가져오기
+    def __init__(self, path, source):
+        self.path = path
+        stat = os.stat(source)
+        self.source = {"file": os.path.abspath(source), "size": stat.st_size, "mtime": stat.st_mtime}
+
+    def load(self):
+        # 같은 파일의 기록이 아니면 처음부터
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path) as f:
+            state = json.load(f)
+        if {key: state.get(key) for key in self.source} != self.source:
+            raise ValueError(f"{self.path} 는 다른 파일(또는 바뀐 파일)의 진행 기록입니다.")
+        return state["row"]
+
+    def save(self, row):
+        temp = self.path + ".tmp"
+        with open(temp, "w") as f:
+            json.dump({**self.source, "row": row}, f)
+        os.replace(temp, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def area_ids():
+    return set(Area.objects.values_list("id", flat=True))
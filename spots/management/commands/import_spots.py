@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+
+import csv
+import time
+
+from spots.importer import Checkpoint, area_ids, clean_row, detect_format, iter_rows, upsert
+
+
+class Command(BaseCommand):
+    help = "관광 API 형식의 스팟 목록(JSON 배열, JSONL, CSV)을 한 행씩 읽어 콘텐츠 ID 기준으로 배치 단위로 추가, 수정합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="스팟 목록 파일 (.json, .jsonl, .ndjson, .csv)")
+        parser.add_argument("--format", choices=["json", "jsonl", "csv"], help="파일 형식 (없으면 확장자로 판단)")
+        parser.add_argument("--encoding", default="utf-8-sig", help="파일 인코딩 (공공데이터 CSV는 cp949인 경우가 많음)")
+        parser.add_argument("--batch-size", type=int, default=1000, help="한 번에 저장할 행 수")
+        parser.add_argument("--checkpoint", help="진행 기록 파일 (기본값: <path>.progress)")
+        parser.add_argument("--restart", action="store_true", help="진행 기록을 무시하고 처음부터 가져오기")
+        parser.add_argument("--dry-run", action="store_true", help="저장하지 않고 검사만")
+        parser.add_argument("--max-errors", type=int, default=20, help="출력할 잘못된 행 수")
+
+    def handle(self, *args, **options):
+        try:
+            format = options["format"] or detect_format(options["path"])
+            checkpoint = Checkpoint(options["checkpoint"] or options["path"] + ".progress", options["path"])
+            if options["restart"]:
+                checkpoint.clear()
+            # 중단됐던 곳까지는 읽기만 하고 건너뜀
+            start = 0 if options["dry_run"] else checkpoint.load()
+        except (OSError, ValueError) as e:
+            raise CommandError(e)
+        if start:
+            self.stdout.write(f"{start}행까지 가져온 기록이 있어서 다음 행부터 가져옵니다.")
+
+        known_areas = area_ids()
+        totals = {"created": 0, "updated": 0, "invalid": 0}
+        batch = []
+        row_number = start
+        started = time.monotonic()
+
+        def flush():
+            if batch and not options["dry_run"]:
+                created, updated = upsert(batch)
+                totals["created"] += created
+                totals["updated"] += updated
+                checkpoint.save(row_number)
+            batch.clear()
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"{row_number}행 처리 (추가 {totals['created']}, 수정 {totals['updated']}, "
+                f"잘못된 행 {totals['invalid']}) {(row_number - start) / max(elapsed, 1e-9):.0f}행/초")
+
+        with open(options["path"], encoding=options["encoding"], newline="") as f:
+            try:
+                for number, row in enumerate(iter_rows(f, format), 1):
+                    if number <= start:
+                        continue
+                    row_number = number
+                    try:
+                        batch.append(clean_row(row, known_areas))
+                    except ValueError as e:
+                        totals["invalid"] += 1
+                        if totals["invalid"] <= options["max_errors"]:
+                            self.stderr.write(f"{number}행: {e}")
+                    if len(batch) >= options["batch_size"]:
+                        flush()
+            except (ValueError, csv.Error) as e:
+                # 파일 자체가 깨졌으면 마지막으로 저장한 곳까지 기록이 남아 있음
+                raise CommandError(f"{row_number + 1}행을 읽을 수 없습니다: {e}")
+            flush()
+
+        if not options["dry_run"]:
+            checkpoint.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f"완료: 추가 {totals['created']}, 수정 {totals['updated']}, 잘못된 행 {totals['invalid']}"))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from spots.geo import cell_index
+from spots.models import Spot
+
+
+class Command(BaseCommand):
+    help = "주변 스팟 검색용 격자 칸을 다시 계산합니다. (DB에 직접 넣은 스팟이나 격자 크기를 바꾼 경우)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="한 번에 저장할 스팟 수")
+
+    def handle(self, *args, **options):
+        changed = []
+        total = 0
+        for spot in Spot.objects.only("id", "mapx", "mapy", "cell").iterator(chunk_size=options["batch_size"]):
+            cell = cell_index(spot.mapy, spot.mapx)
+            if spot.cell != cell:
+                spot.cell = cell
+                changed.append(spot)
+            if len(changed) >= options["batch_size"]:
+                total += Spot.objects.bulk_update(changed, ["cell"])
+                changed = []
+        if changed:
+            total += Spot.objects.bulk_update(changed, ["cell"])
+
+        self.stdout.write(self.style.SUCCESS(f"스팟 {total}개의 격자 칸을 고쳤습니다."))
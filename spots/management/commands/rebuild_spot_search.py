@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from spots.models import Spot
+from spots.search import index_spots
+
+
+class Command(BaseCommand):
+    help = "스팟 제목, 주소 검색 색인을 다시 생성합니다. (loaddata나 DB에 직접 넣은 스팟)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="한 번에 색인할 스팟 수")
+
+    def handle(self, *args, **options):
+        spots = Spot.objects.only("id", "title", "addr1", "addr2").order_by("id")
+        batch = []
+        count = tokens = 0
+        for spot in spots.iterator(chunk_size=options["batch_size"]):
+            batch.append(spot)
+            if len(batch) >= options["batch_size"]:
+                tokens += index_spots(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            tokens += index_spots(batch)
+            count += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"스팟 {count}개, 토큰 {tokens}개를 색인했습니다."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from spots.models import Spot
+from spots.ratings import recompute, stale_spots
+
+
+class Command(BaseCommand):
+    help = "리뷰에서 스팟별 리뷰 수, 평점 합계, 평균 평점을 다시 계산합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--spots", nargs="+", type=int, help="다시 계산할 스팟 번호 (없으면 전체)")
+        parser.add_argument("--dry-run", action="store_true", help="값이 틀린 스팟만 출력하고 고치지 않음")
+
+    def handle(self, *args, **options):
+        spots = Spot.objects.all()
+        if options["spots"]:
+            spots = spots.filter(id__in=options["spots"])
+
+        stale = list(stale_spots(spots).values_list("id", "rate_count", "rate_sum", "actual_count", "actual_sum"))
+        for spot_id, count, total, actual_count, actual_sum in stale:
+            self.stdout.write(f"스팟 {spot_id}: 리뷰 수 {count} -> {actual_count}, 평점 합계 {total} -> {actual_sum}")
+
+        if options["dry_run"]:
+            self.stdout.write(f"값이 틀린 스팟 {len(stale)}개")
+            return
+
+        # 틀린 스팟만이 아니라 대상 전체의 평균까지 다시 계산
+        recompute(spots)
+        self.stdout.write(self.style.SUCCESS(f"스팟 {len(stale)}개의 평점을 고쳤습니다."))
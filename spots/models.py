@@ -23,6 +23,8 @@ class Sigungu(models.Model):
 
 
 class Spot(models.Model):
+    # 관광 API의 콘텐츠 ID (import_spots로 가져올 때 같은 스팟을 찾는 키)
+    contentid = models.CharField("콘텐츠 ID", max_length=20, unique=True, blank=True, null=True)
     area = models.ForeignKey(Area, verbose_name="시도", on_delete=models.CASCADE,
                              related_name="spots", blank=True, null=True)
     type = models.IntegerField("타입")
@@ -32,11 +34,38 @@ class Spot(models.Model):
     addr2 = models.CharField("상세주소", max_length=200, blank=True, null=True)
     mapx = models.FloatField("x좌표")
     mapy = models.FloatField("y좌표")
+    # 주변 스팟 검색용 위경도 격자 칸 (저장할 때 계산, spots.geo)
+    cell = models.IntegerField("격자 칸", db_index=True, blank=True, null=True, editable=False)
     firstimage = models.TextField("이미지", blank=True, null=True)
     tel = models.CharField("전화번호", max_length=200, blank=True, null=True)
+    # 리뷰를 작성, 수정, 삭제할 때마다 갱신 (spots.ratings)
+    rate_count = models.PositiveIntegerField("리뷰 수", default=0)
+    rate_sum = models.PositiveIntegerField("평점 합계", default=0)
+    rate_avg = models.FloatField("평균 평점", blank=True, null=True)
 
     def get_absolute_url(self):
         return reverse('spot_detail_view', kwargs={"spot_id": self.id})
 
     def __str__(self):
         return self.title
+
+
+class SpotToken(models.Model):
+    # 스팟 검색용 역색인 (spots.search)
+    KIND_CHOICE = (
+        (1, "n-gram"),
+        (2, "접두어"),
+        (3, "초성 접두어"),
+    )
+
+    spot = models.ForeignKey(Spot, verbose_name="스팟", on_delete=models.CASCADE, related_name="search_tokens")
+    kind = models.PositiveSmallIntegerField("종류", choices=KIND_CHOICE)
+    token = models.CharField("토큰", max_length=20)
+    weight = models.PositiveSmallIntegerField("가중치", default=1)
+
+    class Meta:
+        indexes = [models.Index(fields=["kind", "token"])]
+        constraints = [models.UniqueConstraint(fields=["spot", "kind", "token"], name="unique_spot_token")]
+
+    def __str__(self):
+        return self.token
@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, OuterRef, Subquery, Sum, When, Value
+from django.db.models.functions import Cast, Coalesce
+
+from spots.models import Spot
+
+
+# 리뷰 수가 0이면 평균 평점 없음
+AVERAGE = Case(
+    When(rate_count=0, then=None),
+    default=Cast("rate_sum", FloatField()) / F("rate_count"),
+    output_field=FloatField(),
+)
+
+
+def add_rate(spot_id, count, total):
+    # 동시에 작성된 리뷰도 빠지지 않도록 DB에서 바로 더함
+    # (DB마다 한 UPDATE 안에서 바뀐 값을 읽는 순서가 달라서 평균은 따로 계산하고, 두 UPDATE를 한 트랜잭션으로 묶음)
+    spots = Spot.objects.filter(id=spot_id)
+    with transaction.atomic():
+        spots.update(rate_count=F("rate_count") + count, rate_sum=F("rate_sum") + total)
+        spots.update(rate_avg=AVERAGE)
+
+
+def actual_rates(spots):
+    # 리뷰에서 다시 집계한 리뷰 수와 평점 합계
+    return spots.annotate(
+        actual_count=Count("spot_reviews"),
+        actual_sum=Coalesce(Sum("spot_reviews__rate"), Value(0)),
+    )
+
+
+def stale_spots(spots=None):
+    # 저장된 값이 실제 리뷰와 다른 스팟
+    spots = Spot.objects.all() if spots is None else spots
+    return actual_rates(spots).exclude(rate_count=F("actual_count"), rate_sum=F("actual_sum"))
+
+
+def recompute(spots=None):
+    from reviews.models import Review
+
+    spots = Spot.objects.all() if spots is None else spots
+    reviews = Review.objects.filter(spot=OuterRef("pk")).order_by().values("spot")
+    with transaction.atomic():
+        spots.update(
+            rate_count=Coalesce(Subquery(reviews.annotate(count=Count("id")).values("count")), Value(0)),
+            rate_sum=Coalesce(Subquery(reviews.annotate(total=Sum("rate")).values("total")), Value(0)),
+        )
+        return spots.update(rate_avg=AVERAGE)
@@ -0,0 +1,63 @@
+from django.conf import settings
+
+import hashlib
+import json
+import threading
+import time
+
+from spots.models import Area, Sigungu
+from spots.serializers import AreaSerializer, SigunguSerializer
+
+
+class ReferenceCache:
+    # 거의 바뀌지 않는 시도, 시군구 목록을 메모리에 두고 내용 해시를 버전(ETag)으로 사용
+    def __init__(self):
+        self.data = None
+        self.loaded_at = 0
+        self.lock = threading.Lock()
+
+    @property
+    def refresh(self):
+        return getattr(settings, "SPOT_REFERENCE_REFRESH", 60)
+
+    def load(self):
+        areas = [dict(area) for area in AreaSerializer(Area.objects.order_by("id"), many=True).data]
+        sigungus = {}
+        for sigungu in SigunguSerializer(Sigungu.objects.order_by("id"), many=True).data:
+            sigungus.setdefault(sigungu["area"], []).append(dict(sigungu))
+
+        # 시도, 시군구에는 수정 시각이 없으므로 Last-Modified 없이 내용 해시만 사용
+        body = json.dumps([areas, sorted(sigungus.items())], ensure_ascii=False, sort_keys=True)
+        version = hashlib.sha256(body.encode()).hexdigest()[:16]
+        return {"version": version, "areas": areas, "sigungus": sigungus}
+
+    def get(self):
+        with self.lock:
+            if self.data is None or time.monotonic() - self.loaded_at >= self.refresh:
+                self.data = self.load()
+                self.loaded_at = time.monotonic()
+            return self.data
+
+    def invalidate(self):
+        # 다음 조회 때 다시 읽음
+        with self.lock:
+            self.loaded_at = 0
+
+    def clear(self):
+        with self.lock:
+            self.data = None
+            self.loaded_at = 0
+
+
+reference = ReferenceCache()
+
+
+def reference_snapshot(request):
+    # 요청 하나에서는 ETag와 본문이 같은 버전에서 나오도록 처음 읽은 목록을 요청에 보관
+    if not hasattr(request, "spot_reference"):
+        request.spot_reference = reference.get()
+    return request.spot_reference
+
+
+def reference_etag(request, *args, **kwargs):
+    return reference_snapshot(request)["version"]
@@ -0,0 +1,118 @@
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Length
+from rest_framework.filters import BaseFilterBackend
+
+import re
+import unicodedata
+
+from spots.models import Spot, SpotToken
+
+
+NGRAM, PREFIX, CHOSEONG = 1, 2, 3
+# 제목에 나온 글자는 주소보다 높은 점수
+TITLE_WEIGHT, ADDRESS_WEIGHT = 3, 1
+# 자동완성 접두어 최대 길이
+PREFIX_MAX = 10
+
+CHOSEONG_LIST = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+CONSONANTS = set("ㄱㄲㄳㄴㄵㄶㄷㄸㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅃㅄㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ")
+# 한글 음절, 호환용 자모, 영문, 숫자 이외는 구분자로 처리
+SEPARATOR = re.compile(r"[^0-9a-z가-힣ㄱ-ㅣ]+")
+
+
+def words(text):
+    # 전각, 대소문자 차이를 없애고 단어로 나눔
+    # (NFKC는 초성 검색에 쓰는 호환용 자모를 조합용 자모로 바꾸므로 자모는 그대로 둠)
+    text = unicodedata.normalize("NFC", text or "")
+    text = "".join(char if "ㄱ" <= char <= "ㅣ" else unicodedata.normalize("NFKC", char) for char in text).lower()
+    return [word for word in SEPARATOR.split(text) if word]
+
+
+def normalize(text):
+    # 띄어쓰기 없이 검색해도 찾을 수 있도록 공백 제거
+    return "".join(words(text))
+
+
+def choseong(text):
+    # 한글 음절은 초성으로 바꾸고 나머지는 그대로
+    return "".join(
+        CHOSEONG_LIST[(ord(char) - 0xAC00) // 588] if "가" <= char <= "힣" else char for char in text)
+
+
+def ngrams(text):
+    return [text[i:i + 2] for i in range(len(text) - 1)] or ([text] if text else [])
+
+
+def index_grams(text):
+    # 색인에는 두 글자 n-gram과 한 글자를 모두 넣음 (한 글자 단어도 제목, 주소에서 검색)
+    return [text[i:i + 2] for i in range(len(text) - 1)] + list(text)
+
+
+def prefixes(title):
+    # 제목의 각 단어에서 시작하는 접두어 (예: "경복궁 근정전" -> 경, 경복, ..., 근, 근정, 근정전)
+    items = words(title)
+    tokens = set()
+    for i in range(len(items)):
+        rest = "".join(items[i:])[:PREFIX_MAX]
+        tokens.update(rest[:length] for length in range(1, len(rest) + 1))
+    return tokens
+
+
+def spot_tokens(spot):
+    # {(종류, 토큰): 가중치}
+    tokens = {}
+    for text, weight in ((spot.title, TITLE_WEIGHT), (spot.addr1, ADDRESS_WEIGHT), (spot.addr2, ADDRESS_WEIGHT)):
+        for gram in index_grams(normalize(text)):
+            tokens[(NGRAM, gram)] = tokens.get((NGRAM, gram), 0) + weight
+
+    for prefix in prefixes(spot.title):
+        tokens[(PREFIX, prefix)] = 1
+        tokens[(CHOSEONG, choseong(prefix))] = 1
+    return tokens
+
+
+def index_spots(spots):
+    # 스팟별 토큰을 지우고 다시 생성
+    rows = [SpotToken(spot=spot, kind=kind, token=token, weight=min(weight, 32767))
+            for spot in spots for (kind, token), weight in spot_tokens(spot).items()]
+    with transaction.atomic():
+        SpotToken.objects.filter(spot__in=[spot.id for spot in spots]).delete()
+        SpotToken.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def search(spots, query):
+    # 검색어 단어별 n-gram이 모두 제목이나 주소에 있는 스팟을 점수(가중치 합) 순서로 정렬
+    # (n-gram을 단어마다 만들어야 "서울 경복궁"이 어디에도 없는 "울경"을 찾지 않음)
+    grams = {gram for word in words(query) for gram in ngrams(word)}
+    if not grams:
+        return spots
+
+    return spots.filter(search_tokens__kind=NGRAM, search_tokens__token__in=grams).annotate(
+        matched=Count("search_tokens"),
+        score=Sum("search_tokens__weight"),
+    ).filter(matched=len(grams)).order_by("-score", Length("title"), "id")
+
+
+def autocomplete(query, limit=10):
+    # 제목 단어의 접두어로 검색 (자음만 입력하면 초성으로 검색), 리뷰가 많은 스팟 먼저
+    text = normalize(query)[:PREFIX_MAX]
+    if not text:
+        return Spot.objects.none()
+
+    kind = PREFIX
+    if any(char in CONSONANTS for char in text):
+        # 입력 중인 "경ㅂ" 같은 검색어도 초성(ㄱㅂ)으로 검색
+        kind, text = CHOSEONG, choseong(text)
+    return Spot.objects.filter(search_tokens__kind=kind, search_tokens__token=text).order_by(
+        "-rate_count", Length("title"), "id")[:limit]
+
+
+class SpotSearchFilter(BaseFilterBackend):
+    # SearchFilter(LIKE '%검색어%') 대신 역색인으로 검색
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "")
+        return search(queryset, query)
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from django.db.models import Avg
+from django.conf import settings
 from spots.models import Area, Sigungu, Spot
 
 
@@ -21,12 +21,53 @@ class SigunguSerializer(serializers.ModelSerializer):
 class SpotSerializer(serializers.ModelSerializer):
     rate = serializers.SerializerMethodField()
     
+    # 리뷰가 바뀔 때마다 갱신한 평균 평점 사용 (스팟마다 집계 쿼리를 하지 않음)
     def get_rate(self, obj):
-        rate_avg = obj.spot_reviews.aggregate(Avg("rate"))["rate__avg"]
+        rate_avg = obj.rate_avg
         if rate_avg:
             rate_avg = round(rate_avg, 1)
         return rate_avg
     
     class Meta:
         model = Spot
-        fields = "__all__"
+        exclude = ("rate_sum", "rate_avg", "cell")
+
+
+# 자동완성
+class SpotAutocompleteSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Spot
+        fields = ("id", "type", "title", "addr1")
+
+
+# 주변 스팟 (거리 km)
+class NearbySpotSerializer(SpotSerializer):
+    distance = serializers.SerializerMethodField()
+
+    def get_distance(self, obj):
+        return round(obj.distance, 3)
+
+
+# 주변 스팟 검색 조건 (위경도 또는 기준 스팟, 반경이 없으면 가장 가까운 k개)
+class SpotNearbySerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90, required=False)
+    lng = serializers.FloatField(min_value=-180, max_value=180, required=False)
+    spot = serializers.IntegerField(required=False)
+    radius = serializers.FloatField(min_value=0, required=False)
+    k = serializers.IntegerField(min_value=1, required=False)
+    type = serializers.IntegerField(required=False)
+
+    def validate_radius(self, value):
+        if value > settings.SPOT_NEARBY_MAX_RADIUS:
+            raise serializers.ValidationError(f"반경은 {settings.SPOT_NEARBY_MAX_RADIUS}km 이하로 입력해주세요.")
+        return value
+
+    def validate_k(self, value):
+        if value > settings.SPOT_NEARBY_MAX_RESULTS:
+            raise serializers.ValidationError(f"{settings.SPOT_NEARBY_MAX_RESULTS}개 이하로 입력해주세요.")
+        return value
+
+    def validate(self, data):
+        if "spot" not in data and ("lat" not in data or "lng" not in data):
+            raise serializers.ValidationError("위도(lat)와 경도(lng) 또는 기준 스팟(spot)을 입력해주세요.")
+        return data
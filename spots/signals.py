@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from spots.geo import cell_index
+from spots.models import Area, Sigungu, Spot
+from spots.reference import reference
+from spots.search import index_spots
+
+
+@receiver(pre_save, sender=Spot)
+def spot_saving(sender, instance, **kwargs):
+    # loaddata로 넣을 때도 격자 칸 계산 (mapx = 경도, mapy = 위도)
+    instance.cell = cell_index(instance.mapy, instance.mapx)
+
+
+@receiver(post_save, sender=Spot)
+def spot_saved(sender, instance, raw, **kwargs):
+    # 검색 색인 갱신 (loaddata는 끝나고 rebuild_spot_search로 한꺼번에 생성)
+    if not raw:
+        index_spots([instance])
+
+
+@receiver([post_save, post_delete], sender=Area)
+@receiver([post_save, post_delete], sender=Sigungu)
+def reference_changed(sender, **kwargs):
+    # 관리자가 시도, 시군구를 수정하면 캐시한 목록을 다시 읽음
+    reference.invalidate()
@@ -3,10 +3,29 @@ from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 
-from spots.models import Area, Sigungu, Spot
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.exceptions import FieldError
+from django.db.models import F
+
+from spots.geo import haversine, nearest
+from spots.geo import cell_index
+from spots.ratings import add_rate
+from spots.importer import Checkpoint, iter_json_array
+from spots.reference import reference
+from spots.search import choseong, normalize, prefixes
+from spots.models import Area, Sigungu, Spot, SpotToken
+from reviews.models import Review
+from users.models import User
 
 from faker import Faker
+from io import StringIO
+from unittest import mock
+import csv
+import json
+import os
 import random
+import tempfile
 
 
 class SpotsReadTest(APITestCase):
@@ -90,3 +109,381 @@ class SpotsReadTest(APITestCase):
             self.assertEqual(response.data['mapy'], float(spot.mapy))
             self.assertEqual(response.data['firstimage'], spot.firstimage)
             self.assertEqual(response.data['tel'], spot.tel)
+
+
+class SpotRatingTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.faker = Faker()
+        cls.user = User.objects.create_user("aaa@aaa.com", "aaa", "password")
+        cls.spots = []
+        for _ in range(5):
+            cls.spots.append(Spot.objects.create(
+                type=12,
+                title=cls.faker.word(),
+                mapx=cls.faker.longitude(),
+                mapy=cls.faker.latitude(),
+            ))
+
+    def create_review(self, spot, rate):
+        return Review.objects.create(user=self.user, spot=spot, rate=rate, title=self.faker.sentence(),
+                                     content=self.faker.text(), visited_date=self.faker.date())
+
+    def assertRate(self, spot, count, total, rate):
+        spot.refresh_from_db()
+        self.assertEqual((spot.rate_count, spot.rate_sum), (count, total))
+        response = self.client.get(spot.get_absolute_url())
+        self.assertEqual(response.data["rate"], rate)
+
+    # 리뷰 작성, 수정, 삭제할 때 평점 갱신
+    def test_pass_spot_rate_update(self):
+        spot, other = self.spots[0], self.spots[1]
+        self.assertRate(spot, 0, 0, None)
+
+        review = self.create_review(spot, 5)
+        self.create_review(spot, 2)
+        self.assertRate(spot, 2, 7, 3.5)
+
+        review.rate = 4
+        review.save()
+        self.assertRate(spot, 2, 6, 3.0)
+
+        # 다른 스팟으로 옮기면 두 스팟 모두 갱신
+        review.spot = other
+        review.save()
+        self.assertRate(spot, 1, 2, 2.0)
+        self.assertRate(other, 1, 4, 4.0)
+
+        review.delete()
+        self.assertRate(other, 0, 0, None)
+
+    # 평균 계산이 실패하면 리뷰 수와 합계도 되돌림
+    def test_fail_spot_rate_partial_update(self):
+        spot = self.spots[0]
+        with mock.patch("spots.ratings.AVERAGE", F("missing")), self.assertRaises(FieldError):
+            add_rate(spot.id, 1, 5)
+        self.assertRate(spot, 0, 0, None)
+
+    # 스팟 수와 상관없이 같은 수의 쿼리로 목록 조회 (개수, 목록)
+    def test_pass_spot_list_queries(self):
+        for spot in self.spots:
+            self.create_review(spot, random.randint(1, 5))
+
+        with self.assertNumQueries(2):
+            response = self.client.get(path=reverse("spot_view"))
+        self.assertEqual(len(response.data["results"]), len(self.spots))
+        for data, spot in zip(response.data["results"], self.spots):
+            self.assertEqual(data["rate"], float(spot.spot_reviews.get().rate))
+
+    # 시그널을 거치지 않고 바뀐 리뷰는 명령어로 다시 계산
+    def test_pass_repair_spot_ratings(self):
+        spot = self.spots[0]
+        self.create_review(spot, 3)
+        Review.objects.filter(spot=spot).update(rate=5)
+        Spot.objects.filter(id=self.spots[1].id).update(rate_count=3, rate_sum=9, rate_avg=3)
+
+        out = StringIO()
+        call_command("repair_spot_ratings", dry_run=True, stdout=out)
+        self.assertIn("2개", out.getvalue())
+        self.assertRate(spot, 1, 3, 3.0)
+
+        call_command("repair_spot_ratings", stdout=StringIO())
+        self.assertRate(spot, 1, 5, 5.0)
+        self.assertRate(self.spots[1], 0, 0, None)
+
+
+class SpotNearbyTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # 서울시청에서 북쪽으로 0, 1, 2, ... 10km (위도 1도 = 약 111.2km)
+        cls.lat, cls.lng = 37.5665, 126.9780
+        cls.spots = []
+        for i in range(11):
+            cls.spots.append(Spot.objects.create(
+                type=12 if i % 2 == 0 else 39,
+                title=f"spot{i}",
+                mapx=cls.lng,
+                mapy=cls.lat + i / 111.195,
+            ))
+        # 부산
+        cls.busan = Spot.objects.create(type=12, title="busan", mapx=129.0756, mapy=35.1796)
+
+    def get(self, **params):
+        return self.client.get(reverse("spot_nearby_view"), params)
+
+    # 서울시청에서 부산시청까지 약 325km
+    def test_pass_haversine(self):
+        self.assertAlmostEqual(haversine(self.lat, self.lng, 35.1796, 129.0756), 325, delta=2)
+
+    # 격자 칸 경계를 넘어도 반경 안이면 조회
+    def test_pass_nearest_across_cells(self):
+        found = nearest(Spot.objects.all(), 35.1796, 129.0756 + 0.06, 1, 50)
+        self.assertEqual(found, [self.busan])
+
+    # 반경 안의 스팟을 가까운 순서로 조회 (좌표로 순위를 매긴 뒤 결과 행만 조회)
+    def test_pass_spot_nearby_radius(self):
+        with self.assertNumQueries(2):
+            response = self.get(lat=self.lat, lng=self.lng, radius=3.5)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([data["title"] for data in response.data], ["spot0", "spot1", "spot2", "spot3"])
+        self.assertAlmostEqual(response.data[3]["distance"], 3, delta=0.01)
+
+        response = self.get(lat=self.lat, lng=self.lng, radius=10, k=2)
+        self.assertEqual([data["title"] for data in response.data], ["spot0", "spot1"])
+
+    # 반경이 없으면 반경을 늘려가며 가장 가까운 k개 조회
+    def test_pass_spot_nearby_k(self):
+        response = self.get(lat=self.lat + 0.5, lng=self.lng, k=2)
+        self.assertEqual([data["title"] for data in response.data], ["spot10", "spot9"])
+
+        response = self.get(lat=35.1, lng=129.0, k=1)
+        self.assertEqual([data["title"] for data in response.data], ["busan"])
+
+    # 기준 스팟 주변 (기준 스팟 제외), 타입 필터
+    def test_pass_spot_nearby_spot(self):
+        response = self.get(spot=self.spots[5].id, radius=2.5, type=12)
+        self.assertEqual([data["title"] for data in response.data], ["spot4", "spot6"])
+
+    # 위치가 없거나 최대 반경을 넘으면 실패
+    def test_fail_spot_nearby_invalid(self):
+        self.assertEqual(self.get(radius=1).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get(lat=self.lat, lng=self.lng, radius=500).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get(spot=9999).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SpotSearchTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.spots = {}
+        for title, addr1, addr2 in [
+            ("경복궁", "서울특별시 종로구 사직로 161", None),
+            ("경복궁 근정전", "서울특별시 종로구 세종로", "경복궁 안"),
+            ("창덕궁", "서울특별시 종로구 율곡로 99", None),
+            ("부산 해운대 해수욕장", "부산광역시 해운대구 우동", None),
+            ("Seoul Tower", "서울특별시 용산구 남산공원길 105", None),
+        ]:
+            cls.spots[title] = Spot.objects.create(type=12, title=title, addr1=addr1, addr2=addr2,
+                                                   mapx=127.0, mapy=37.5)
+
+    def search(self, query):
+        response = self.client.get(reverse("spot_view"), {"search": query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [data["title"] for data in response.data["results"]]
+
+    def autocomplete(self, query):
+        response = self.client.get(reverse("spot_autocomplete_view"), {"q": query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [data["title"] for data in response.data]
+
+    def test_pass_normalize(self):
+        self.assertEqual(normalize("  Seoul  ＴＯＷＥＲ! "), "seoultower")
+        self.assertEqual(choseong("경복궁 A1"), "ㄱㅂㄱ A1")
+        self.assertEqual(prefixes("경복궁 근정전"),
+                         {"경", "경복", "경복궁", "경복궁근", "경복궁근정", "경복궁근정전", "근", "근정", "근정전"})
+
+    # 제목에 있으면 주소에만 있는 스팟보다 먼저, 점수가 같으면 짧은 제목 먼저
+    def test_pass_spot_search_rank(self):
+        self.assertEqual(self.search("경복궁"), ["경복궁 근정전", "경복궁"])
+        # 한 글자도 제목과 주소에서 검색
+        self.assertEqual(self.search("궁"), ["경복궁 근정전", "경복궁", "창덕궁"])
+        self.assertEqual(self.search("용"), ["Seoul Tower"])
+
+    # 주소, 띄어쓰기 없는 검색어, 영문 대소문자
+    def test_pass_spot_search_address(self):
+        # "서울특별시종로구세종로"는 "종로"가 두 번 나옴
+        self.assertEqual(self.search("종로구"), ["경복궁 근정전", "경복궁", "창덕궁"])
+        self.assertEqual(self.search("해운대해수욕장"), ["부산 해운대 해수욕장"])
+        self.assertEqual(self.search("seoul tower"), ["Seoul Tower"])
+        # 단어마다 제목이나 주소에 있으면 검색 (단어를 이어 붙인 n-gram은 만들지 않음)
+        self.assertEqual(self.search("서울 경복궁"), ["경복궁 근정전", "경복궁"])
+        self.assertEqual(self.search("부산 해수욕장"), ["부산 해운대 해수욕장"])
+        self.assertEqual(self.search("부산 경복궁"), [])
+        self.assertEqual(self.search("종로 창"), ["창덕궁"])
+        self.assertEqual(self.search("없는곳"), [])
+
+    # 스팟을 수정하면 색인도 갱신
+    def test_pass_spot_search_update(self):
+        spot = self.spots["창덕궁"]
+        spot.title = "창경궁"
+        spot.save()
+        self.assertEqual(self.search("창덕"), [])
+        self.assertEqual(self.search("창경"), ["창경궁"])
+
+    # 단어 접두어, 초성 자동완성
+    def test_pass_spot_autocomplete(self):
+        self.assertEqual(self.autocomplete("경복"), ["경복궁", "경복궁 근정전"])
+        self.assertEqual(self.autocomplete("근정"), ["경복궁 근정전"])
+        self.assertEqual(self.autocomplete("ㅎㅇㄷ"), ["부산 해운대 해수욕장"])
+        self.assertEqual(self.autocomplete("해ㅇ"), ["부산 해운대 해수욕장"])
+        self.assertEqual(self.autocomplete("se"), ["Seoul Tower"])
+        self.assertEqual(self.autocomplete(""), [])
+
+    # 역색인을 지워도 명령어로 다시 생성
+    def test_pass_rebuild_spot_search(self):
+        SpotToken.objects.all().delete()
+        self.assertEqual(self.search("경복궁"), [])
+        call_command("rebuild_spot_search", stdout=StringIO())
+        self.assertEqual(self.search("경복궁"), ["경복궁 근정전", "경복궁"])
+
+
+class SpotImportTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.area = Area.objects.create(id=1, name="서울")
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.rows = [
+            {"contentid": "126508", "contenttypeid": "12", "title": "경복궁", "areacode": "1", "sigungucode": "23",
+             "addr1": "서울특별시 종로구 사직로 161", "mapx": "126.9769", "mapy": "37.5788", "tel": ""},
+            {"contentid": "126512", "contenttypeid": "12", "title": "창덕궁", "areacode": "99",
+             "addr1": "서울특별시 종로구 율곡로 99", "mapx": "126.9910", "mapy": "37.5794"},
+            {"contentid": "", "contenttypeid": "12", "title": "콘텐츠 ID 없음", "mapx": "127", "mapy": "37"},
+            {"contentid": "264337", "contenttypeid": "39", "title": "좌표 없음", "mapx": "", "mapy": ""},
+            {"contentid": "2733967", "contenttypeid": "39", "title": "광장시장", "areacode": "1",
+             "addr1": "서울특별시 종로구 창경궁로 88", "mapx": "126.9996", "mapy": "37.5701"},
+        ]
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, name, rows, format):
+        path = os.path.join(self.dir.name, name)
+        with open(path, "w", newline="") as f:
+            if format == "json":
+                json.dump(rows, f, ensure_ascii=False, indent=2)
+            elif format == "jsonl":
+                for row in rows:
+                    f.write(row if isinstance(row, str) else json.dumps(row, ensure_ascii=False))
+                    f.write("\n")
+            else:
+                writer = csv.DictWriter(f, fieldnames=sorted({key for row in rows for key in row}))
+                writer.writeheader()
+                writer.writerows(rows)
+        return path
+
+    def run_import(self, path, **options):
+        out, err = StringIO(), StringIO()
+        call_command("import_spots", path, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    # 작은 단위로 읽어도 배열 항목을 그대로 디코딩
+    def test_pass_iter_json_array(self):
+        text = json.dumps(self.rows, ensure_ascii=False)
+        self.assertEqual(list(iter_json_array(StringIO(text), chunk_size=7)), self.rows)
+        self.assertEqual(list(iter_json_array(StringIO(" [ ] "))), [])
+
+    # 잘못된 행은 건너뛰고 나머지를 추가 (격자 칸, 검색 색인 포함)
+    def test_pass_import_spots_jsonl(self):
+        path = self.write("spots.jsonl", self.rows[:2] + ["{broken"] + self.rows[2:], "jsonl")
+        out, err = self.run_import(path, batch_size=2)
+
+        self.assertIn("추가 2, 수정 0, 잘못된 행 4", out)
+        self.assertEqual(len(err.strip().splitlines()), 4)
+        spot = Spot.objects.get(contentid="126508")
+        self.assertEqual((spot.type, spot.area_id, spot.sigungu, spot.tel), (12, 1, 23, None))
+        self.assertEqual(spot.cell, cell_index(37.5788, 126.9769))
+        # 없는 시도는 잘못된 행
+        self.assertIn("없는 시도입니다: 99", err)
+        self.assertFalse(Spot.objects.filter(contentid="126512").exists())
+        response = self.client.get(reverse("spot_view"), {"search": "광장시장"})
+        self.assertEqual([data["title"] for data in response.data["results"]], ["광장시장"])
+        self.assertFalse(os.path.exists(path + ".progress"))
+
+    # 같은 콘텐츠 ID는 덮어쓰고 평점은 유지
+    def test_pass_import_spots_update(self):
+        self.run_import(self.write("spots.json", self.rows, "json"))
+        Spot.objects.filter(contentid="126508").update(rate_count=2, rate_sum=9, rate_avg=4.5)
+
+        self.rows[0]["title"] = "경복궁 (景福宮)"
+        out, _ = self.run_import(self.write("spots.csv", self.rows, "csv"))
+        self.assertIn("추가 0, 수정 2", out)
+        self.assertEqual(Spot.objects.count(), 2)
+        spot = Spot.objects.get(contentid="126508")
+        self.assertEqual((spot.title, spot.rate_count, spot.rate_avg), ("경복궁 (景福宮)", 2, 4.5))
+
+    # loaddata 형식은 fields의 contentid만 사용 (pk는 Spot 번호)
+    def test_pass_import_spots_loaddata(self):
+        rows = [{"model": "spots.spot", "pk": 7, "fields": self.rows[0]},
+                {"model": "spots.spot", "pk": 8, "fields": {**self.rows[4], "contentid": None}}]
+        out, err = self.run_import(self.write("spots.json", rows, "json"))
+
+        self.assertIn("추가 1, 수정 0, 잘못된 행 1", out)
+        self.assertIn("contentid가 없습니다.", err)
+        self.assertEqual(list(Spot.objects.values_list("contentid", flat=True)), ["126508"])
+
+    # 진행 기록이 있으면 다음 행부터 가져옴
+    def test_pass_import_spots_resume(self):
+        path = self.write("spots.jsonl", self.rows, "jsonl")
+        Checkpoint(path + ".progress", path).save(2)
+
+        out, _ = self.run_import(path)
+        self.assertIn("2행까지", out)
+        self.assertEqual(list(Spot.objects.values_list("contentid", flat=True)), ["2733967"])
+
+        # 파일이 바뀌면 이어서 가져오지 않음
+        Checkpoint(path + ".progress", path).save(2)
+        self.write("spots.jsonl", self.rows[:1], "jsonl")
+        with self.assertRaises(CommandError):
+            self.run_import(path)
+        out, _ = self.run_import(path, restart=True)
+        self.assertIn("추가 1", out)
+
+
+class ReferenceCacheTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.area = Area.objects.create(id=1, name="서울")
+        cls.sigungu = Sigungu.objects.create(area=cls.area, code=1, name="강남구")
+
+    def setUp(self):
+        reference.clear()
+
+    # 한 번 읽은 뒤에는 DB 조회 없이 응답
+    def test_pass_reference_memory(self):
+        self.client.get(reverse("area_view"))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("area_view"))
+            sigungu_response = self.client.get(self.area.get_absolute_url())
+        self.assertEqual(response.data, [{"id": 1, "name": "서울"}])
+        self.assertEqual([data["name"] for data in sigungu_response.data], ["강남구"])
+        self.assertEqual(self.client.get(reverse("sigungu_view", kwargs={"area_id": 99})).data, [])
+
+    # ETag로 다시 확인하면 304 (수정 시각은 보내지 않음)
+    def test_pass_reference_not_modified(self):
+        response = self.client.get(reverse("area_view"))
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertFalse(response.has_header("Last-Modified"))
+
+        response = self.client.get(reverse("area_view"), HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(self.area.get_absolute_url(), HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    # 요청 도중 목록이 바뀌어도 ETag와 본문은 같은 버전
+    def test_pass_reference_snapshot(self):
+        snapshots = [{"version": "old", "areas": [{"id": 1, "name": "서울"}], "sigungus": {}},
+                     {"version": "new", "areas": [], "sigungus": {}}]
+        saved = reference.get
+        reference.get = lambda: snapshots.pop(0)
+        try:
+            response = self.client.get(reverse("area_view"))
+        finally:
+            reference.get = saved
+        self.assertEqual(response["ETag"], '"old"')
+        self.assertEqual(response.data, [{"id": 1, "name": "서울"}])
+
+    # 관리자가 수정하면 새 버전으로 응답
+    def test_pass_reference_invalidate(self):
+        etag = self.client.get(reverse("area_view"))["ETag"]
+        self.sigungu.name = "강동구"
+        self.sigungu.save()
+
+        response = self.client.get(self.area.get_absolute_url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual([data["name"] for data in response.data], ["강동구"])
+
+        Area.objects.create(id=2, name="인천")
+        self.assertEqual(len(self.client.get(reverse("area_view")).data), 2)
@@ -3,6 +3,8 @@ from spots import views
 
 urlpatterns = [
     path("", views.SpotFilterView.as_view(), name="spot_view"),
+    path("autocomplete/", views.SpotAutocompleteView.as_view(), name="spot_autocomplete_view"),
+    path("nearby/", views.SpotNearbyView.as_view(), name="spot_nearby_view"),
     path("<int:spot_id>/", views.SpotDetailView.as_view(), name="spot_detail_view"),
     path("area/", views.AreaView.as_view(), name="area_view"),
     path("area/<int:area_id>/", views.SigunguView.as_view(), name="sigungu_view"),
@@ -1,35 +1,51 @@
 from rest_framework import status
-from rest_framework.filters import SearchFilter
 from rest_framework.generics import get_object_or_404, ListAPIView
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
+from django.conf import settings
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django_filters.rest_framework import DjangoFilterBackend
 
-from spots.models import Area, Sigungu, Spot
-from spots.serializers import AreaSerializer, SigunguSerializer, SpotSerializer
+from spots.geo import nearest, within
+from spots.reference import reference_etag, reference_snapshot
+from spots.search import SpotSearchFilter, autocomplete
+from spots.models import Spot
+from spots.serializers import (
+    SpotSerializer,
+    SpotAutocompleteSerializer,
+    NearbySpotSerializer,
+    SpotNearbySerializer,
+)
+
+
+# 시도, 시군구 목록은 메모리에서 응답하고 브라우저가 ETag로 다시 확인하면 304
+reference_condition = method_decorator([
+    cache_control(no_cache=True),
+    condition(etag_func=reference_etag),
+])
 
 
 class AreaView(APIView):
+    @reference_condition
     def get(self, request):
-        areas = Area.objects.all()
-        serializer = AreaSerializer(areas, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(reference_snapshot(request)["areas"], status=status.HTTP_200_OK)
 
 
 class SigunguView(APIView):
+    @reference_condition
     def get(self, request, area_id):
-        sigungus = Sigungu.objects.filter(area=area_id).all()
-        serializer = SigunguSerializer(sigungus, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(reference_snapshot(request)["sigungus"].get(area_id, []), status=status.HTTP_200_OK)
 
 
 class SpotFilterView(ListAPIView):
     queryset = Spot.objects.all().order_by("id")
     serializer_class = SpotSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    # search는 제목, 주소 역색인으로 검색하고 점수 순서로 정렬
+    filter_backends = [DjangoFilterBackend, SpotSearchFilter]
     filterset_fields = ["type", "area", "sigungu",]
-    search_fields = ['title',]
 
 
 class SpotDetailView(APIView):
@@ -37,3 +53,39 @@ class SpotDetailView(APIView):
         spot = get_object_or_404(Spot, id=spot_id)
         serializer = SpotSerializer(spot)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class SpotNearbyView(APIView):
+    # 반경(km) 안의 스팟 또는 가장 가까운 k개를 가까운 순서로 조회
+    def get(self, request):
+        serializer = SpotNearbySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        spots = Spot.objects.all()
+        if "type" in data:
+            spots = spots.filter(type=data["type"])
+
+        # 기준 스팟 주변이면 기준 스팟은 제외
+        if "spot" in data:
+            spot = get_object_or_404(Spot, id=data["spot"])
+            lat, lng = spot.mapy, spot.mapx
+            spots = spots.exclude(id=spot.id)
+        else:
+            lat, lng = data["lat"], data["lng"]
+
+        k = data.get("k", settings.SPOT_NEARBY_MAX_RESULTS)
+        if "radius" in data:
+            found = within(spots, lat, lng, data["radius"], k)
+        else:
+            found = nearest(spots, lat, lng, k, settings.SPOT_NEARBY_MAX_RADIUS)
+
+        return Response(NearbySpotSerializer(found, many=True).data, status=status.HTTP_200_OK)
+
+
+class SpotAutocompleteView(APIView):
+    # 제목 단어의 접두어, 초성으로 자동완성
+    def get(self, request):
+        spots = autocomplete(request.query_params.get("q", ""))
+        serializer = SpotAutocompleteSerializer(spots, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
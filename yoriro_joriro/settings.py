@@ -169,3 +169,97 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "TOKEN_OBTAIN_SERIALIZER": "users.serializers.LoginSerializer",
 }
+
+
+# 조리로 AI
+# 워커 시작 시 미리 로드할 모델 번호 (예: "2,3"), 나머지는 첫 요청 때 로드
+JORIRO_PRELOAD_MODELS = [
+    int(choice) for choice in os.environ.get("JORIRO_PRELOAD_MODELS", "").split(",") if choice
+]
+# 마지막 사용 후 이 시간(초)이 지난 모델은 메모리에서 해제, 0이면 해제하지 않음
+JORIRO_MODEL_IDLE_TIMEOUT = int(os.environ.get("JORIRO_MODEL_IDLE_TIMEOUT", "0"))
+# 추론 전용 워커 프로세스 수, 0이면 요청 스레드에서 바로 실행
+JORIRO_POOL_WORKERS = int(os.environ.get("JORIRO_POOL_WORKERS", "1"))
+# 실행 중인 작업 외에 대기할 수 있는 작업 수, 넘치면 429 응답
+JORIRO_POOL_MAX_QUEUE = int(os.environ.get("JORIRO_POOL_MAX_QUEUE", "4"))
+# 작업 하나를 기다리는 최대 시간(초), 넘치면 504 응답
+JORIRO_JOB_TIMEOUT = int(os.environ.get("JORIRO_JOB_TIMEOUT", "60"))
+# 비동기 작업(?async=1)을 처리할 백그라운드 스레드 수, 0이면 요청 스레드에서 바로 실행
+JORIRO_JOB_THREADS = int(os.environ.get("JORIRO_JOB_THREADS", "2"))
+# 처리 중인 작업 외에 대기할 수 있는 비동기 작업 수, 넘치면 429 응답
+JORIRO_JOB_MAX_PENDING = int(os.environ.get("JORIRO_JOB_MAX_PENDING", "32"))
+# 이 시간(초) 동안 갱신되지 않은 대기 중, 처리 중 작업은 재시작으로 사라진 것으로 보고 실패로 표시
+# (대기열에서 기다리는 최대 시간 + JORIRO_JOB_TIMEOUT 보다 길어야 함)
+JORIRO_JOB_STALE_AFTER = int(os.environ.get("JORIRO_JOB_STALE_AFTER", "600"))
+# 웹 프로세스마다 끝나지 않은 작업을 정리하는 간격(초), 처음 작업을 등록하거나 조회할 때도 정리
+JORIRO_JOB_SWEEP_INTERVAL = int(os.environ.get("JORIRO_JOB_SWEEP_INTERVAL", "60"))
+# 같은 모델 요청을 한 번의 추론으로 묶을 최대 개수, 1이면 묶지 않음
+# (같은 웹 프로세스에 동시에 들어온 요청만 묶이므로 gunicorn은 gthread 워커(--threads)로 실행해야 효과가 있음)
+JORIRO_BATCH_MAX_SIZE = int(os.environ.get("JORIRO_BATCH_MAX_SIZE", "4"))
+# 배치를 채우기 위해 첫 요청이 기다리는 최대 시간(ms)
+JORIRO_BATCH_MAX_WAIT_MS = int(os.environ.get("JORIRO_BATCH_MAX_WAIT_MS", "20"))
+# 워커마다 (여행지, 크기)별로 보관할 배경 수
+JORIRO_BACKGROUND_CACHE_SIZE = int(os.environ.get("JORIRO_BACKGROUND_CACHE_SIZE", "32"))
+# 모델 번호별 추론 해상도(긴 변 픽셀, 예: "1:520,2:640,3:640"), 없는 모델은 가중치 기본 전처리(짧은 변 520) 사용
+JORIRO_INFERENCE_MAX_SIDE = {
+    int(choice): int(side) for choice, side in (
+        item.split(":") for item in os.environ.get("JORIRO_INFERENCE_MAX_SIDE", "1:520,2:640,3:640").split(",") if item
+    )
+}
+# 줄여서 예측한 마스크를 원본 이미지 경계를 따라 업샘플링할지 여부
+JORIRO_EDGE_AWARE_UPSAMPLE = os.environ.get("JORIRO_EDGE_AWARE_UPSAMPLE", "1") == "1"
+# 이미지 해시별 마스크, 합성 결과를 보관할 디스크 캐시 경로와 최대 크기(바이트), 0이면 사용하지 않음
+JORIRO_RESULT_CACHE_PATH = os.environ.get("JORIRO_RESULT_CACHE_PATH", "media/joriro/cache/")
+JORIRO_RESULT_CACHE_MAX_BYTES = int(os.environ.get("JORIRO_RESULT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# 추론 방식: eager, torchscript, onnx (torchscript, onnx는 export_joriro_models 명령으로 먼저 내보내야 함)
+JORIRO_BACKEND = os.environ.get("JORIRO_BACKEND", "eager")
+# 내보낸 모델 파일 경로
+JORIRO_EXPORT_PATH = os.environ.get("JORIRO_EXPORT_PATH", str(BASE_DIR / "joriro_models"))
+# int8로 양자화한 모델을 쓸 모델 번호 (예: "1"), quantize_joriro_models 명령으로 먼저 양자화해야 함
+JORIRO_QUANTIZED_MODELS = [
+    int(choice) for choice in os.environ.get("JORIRO_QUANTIZED_MODELS", "").split(",") if choice
+]
+# 업로드 이미지의 최대 긴 변(픽셀), 더 크면 JPEG 축소 디코딩 후 이 크기로 합성, 0이면 원본 크기 유지
+JORIRO_MAX_IMAGE_SIDE = int(os.environ.get("JORIRO_MAX_IMAGE_SIDE", "4096"))
+# 원본 이미지를 저장소에 쓰는 백그라운드 스레드 수와 대기 가능한 쓰기 수, 0이면 요청 스레드에서 바로 저장
+JORIRO_IO_THREADS = int(os.environ.get("JORIRO_IO_THREADS", "2"))
+JORIRO_IO_MAX_PENDING = int(os.environ.get("JORIRO_IO_MAX_PENDING", "32"))
+# 이 호스트에서 같이 실행하는 웹 프로세스 수 (gunicorn --workers, 기본값은 gunicorn과 같은 WEB_CONCURRENCY)
+# 웹 프로세스마다 워커 풀이 따로 있으므로 추론 프로세스는 웹 프로세스 수 x 워커 수
+JORIRO_WEB_PROCESSES = int(os.environ.get("JORIRO_WEB_PROCESSES", os.environ.get("WEB_CONCURRENCY", "1")))
+# 추론 하나가 쓰는 torch intra-op 스레드 수, 0이면 쓸 수 있는 CPU를 호스트 전체의 추론 프로세스 수로 나눔
+JORIRO_INTRA_OP_THREADS = int(os.environ.get("JORIRO_INTRA_OP_THREADS", "0"))
+# torch inter-op 스레드 수, 0이면 torch 기본값
+JORIRO_INTER_OP_THREADS = int(os.environ.get("JORIRO_INTER_OP_THREADS", "0"))
+# 추론 워커마다 CPU를 나눠서 고정할지 여부 (Linux, JORIRO_WEB_PROCESSES가 1일 때만)
+JORIRO_CPU_AFFINITY = os.environ.get("JORIRO_CPU_AFFINITY", "0") == "1"
+# 조리로 요청마다 단계별 처리 시간을 Joriro 행에도 저장할지 여부 (히스토그램은 항상 /joriro/metrics/ 에서 조회)
+JORIRO_STORE_TIMINGS = os.environ.get("JORIRO_STORE_TIMINGS", "0") == "1"
+# 조리로 결과물 형식 (jpeg, webp), 품질, JPEG progressive 여부
+JORIRO_OUTPUT_FORMAT = os.environ.get("JORIRO_OUTPUT_FORMAT", "jpeg")
+JORIRO_OUTPUT_QUALITY = int(os.environ.get("JORIRO_OUTPUT_QUALITY", "90"))
+JORIRO_OUTPUT_PROGRESSIVE = os.environ.get("JORIRO_OUTPUT_PROGRESSIVE", "1") == "1"
+# 미리보기 결과물의 긴 변 길이, 0이면 만들지 않음
+JORIRO_THUMBNAIL_SIDE = int(os.environ.get("JORIRO_THUMBNAIL_SIDE", "320"))
+# 결과물 파일을 I/O 스레드에서 써서 배치의 다른 작업 합성과 겹칠지 여부 (응답 전에 쓰기가 끝났는지 확인)
+JORIRO_BACKGROUND_WRITE = os.environ.get("JORIRO_BACKGROUND_WRITE", "1") == "1"
+# 사람 경계 주변의 마스크를 원본 해상도에서 컬러 guided filter로 다시 계산할지 여부
+JORIRO_MASK_REFINE = os.environ.get("JORIRO_MASK_REFINE", "0") == "1"
+# 미리 로드한 모델로 워커 시작 시 한 번 추론해서 첫 요청의 초기화 비용을 없앨지 여부
+JORIRO_WARMUP = os.environ.get("JORIRO_WARMUP", "1") == "1"
+# eager 모델 가중치를 export_joriro_models --backends state 로 내보낸 파일에서 메모리 매핑해서 워커끼리 공유할지 여부
+# (torch 2.1 이상 필요, 그 이전 버전은 경고 후 워커마다 일반 로드)
+JORIRO_MMAP_WEIGHTS = os.environ.get("JORIRO_MMAP_WEIGHTS", "0") == "1"
+# 배경을 업로드할 때 미리 만들 크기별 배경의 긴 변 길이
+JORIRO_BACKGROUND_VARIANT_SIDES = [
+    int(side) for side in os.environ.get("JORIRO_BACKGROUND_VARIANT_SIDES", "640,1280,1920,2560").split(",") if side
+]
+# 배경 정보를 다시 조회하는 주기 (초)
+JORIRO_BACKGROUND_REFRESH = int(os.environ.get("JORIRO_BACKGROUND_REFRESH", "60"))
+
+# 스팟
+# 주변 스팟 검색의 최대 반경 (km), 한 번에 반환할 최대 스팟 수
+SPOT_NEARBY_MAX_RADIUS = float(os.environ.get("SPOT_NEARBY_MAX_RADIUS", "50"))
+SPOT_NEARBY_MAX_RESULTS = int(os.environ.get("SPOT_NEARBY_MAX_RESULTS", "100"))
+# 시도, 시군구 목록을 DB에서 다시 읽는 주기 (초, 같은 프로세스에서 관리자가 수정하면 바로 반영)
+SPOT_REFERENCE_REFRESH = int(os.environ.get("SPOT_REFERENCE_REFRESH", "60"))